@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class CalculadoraConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'calculadora'
+    
+    def ready(self) -> None:
+        # Conecta os receptores dos sinais do histórico.
+        from . import signals, backends, estatisticas, contagens, arquivamento, roteador, tokens, eventos  # noqa: F401
+        
+        # Última app de INSTALLED_APPS: as demais (incluindo o autodiscover do admin)
+        # já estão prontas quando as URLs são montadas.
+        from . import aquecimento
+        if aquecimento.ativo():
+            aquecimento.aquecer()
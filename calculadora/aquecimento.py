@@ -0,0 +1,116 @@
+"""
+Aquecimento do processo antes de receber tráfego.
+
+Várias estruturas são montadas só no primeiro uso e deixam a primeira
+requisição de cada worker lenta: a lista de senhas comuns do
+``CommonPasswordValidator`` (um arquivo gzip com 20 mil linhas), as regexes
+do ``EmailValidator``, os resolvers de URL, os caches de ``_meta`` dos modelos usados pelos
+serializers do DRF, os renderers e o avaliador de expressões. ``aquecer()``
+monta tudo isso a partir de ``CalculadoraConfig.ready()``.
+
+O aquecimento é seguro para servidores que carregam a aplicação e depois
+fazem fork dos workers (``gunicorn --preload``): não abre conexões com o
+banco, não cria threads e não escreve em caches; só preenche memória do
+processo, que os workers herdam prontos. Por garantia, as conexões que algum
+passo tenha aberto são fechadas ao final.
+"""
+import logging
+import time
+from typing import Callable, Dict
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Expressão usada para compilar o avaliador; não é gravada no cache de resultados.
+EXPRESSAO_AQUECIMENTO = '(1 + 2) * 3 - 4 / 5'
+
+
+def ativo() -> bool:
+    return getattr(settings, 'CALCULADORA_AQUECIMENTO', True)
+
+
+def _validadores_de_senha() -> None:
+    from django.contrib.auth.hashers import get_hasher
+    from django.contrib.auth.password_validation import get_default_password_validators
+
+    # Instanciar os validadores carrega a lista de senhas comuns (cache lru do Django).
+    get_default_password_validators()
+    get_hasher('default')
+
+
+def _validador_de_email() -> None:
+    from django.core.validators import validate_email
+
+    # As regexes do EmailValidator são compiladas no primeiro uso; a de domínio,
+    # com classes Unicode, leva dezenas de milissegundos.
+    validate_email('aquecimento@exemplo.com')
+
+
+def _urls() -> None:
+    from django.urls import resolve, reverse
+
+    # Importa as views e monta os dicionários de resolução e de reverse.
+    resolve(reverse('calculadora:api_calcular'))
+
+
+def _serializers() -> None:
+    from . import serializers
+
+    for classe in (
+        serializers.UsuarioSerializer,
+        serializers.UsuarioRegistroSerializer,
+        serializers.LoginSerializer,
+        serializers.OperacaoSerializer,
+        serializers.CalcularSerializer,
+        serializers.CalcularLoteSerializer,
+        serializers.CalcularGradeSerializer,
+        serializers.EstatisticasPeriodoSerializer,
+    ):
+        # Monta os campos; nos ModelSerializers isso preenche os caches de _meta.
+        classe().fields
+
+
+def _renderizacao() -> None:
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.settings import api_settings
+
+    api_settings.DEFAULT_RENDERER_CLASSES
+    api_settings.DEFAULT_PARSER_CLASSES
+    api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    JSONRenderer().render({'aquecimento': True})
+
+
+def _avaliador() -> None:
+    from . import avaliador
+
+    avaliador.avaliar(EXPRESSAO_AQUECIMENTO)
+
+
+PASSOS: Dict[str, Callable[[], None]] = {
+    'validadores_de_senha': _validadores_de_senha,
+    'validador_de_email': _validador_de_email,
+    'urls': _urls,
+    'serializers': _serializers,
+    'renderizacao': _renderizacao,
+    'avaliador': _avaliador,
+}
+
+# Duração de cada passo no último aquecimento, em segundos.
+duracoes: Dict[str, float] = {}
+
+
+def aquecer() -> Dict[str, float]:
+    """Executa todos os passos e retorna a duração de cada um."""
+    for nome, passo in PASSOS.items():
+        inicio = time.perf_counter()
+        try:
+            passo()
+        except Exception:
+            # Aquecer é uma otimização; uma falha não pode impedir o worker de subir.
+            logger.exception('Falha no passo %s do aquecimento', nome)
+        duracoes[nome] = time.perf_counter() - inicio
+
+    connections.close_all()
+    return dict(duracoes)
@@ -0,0 +1,180 @@
+"""
+Retenção do histórico com arquivo frio comprimido.
+
+Operações mais antigas que o prazo de retenção do usuário saem da tabela
+``operacoes`` e vão para arquivos NDJSON comprimidos com gzip, um por usuário
+e mês (``<DIRETORIO>/<usuario_id>/<AAAA-MM>.ndjson.gz``). Cada execução anexa
+um novo membro gzip ao arquivo, que nunca é reescrito; a tabela
+``SegmentoArquivo`` indexa os arquivos e guarda as contagens, de modo que a
+listagem e as estatísticas não precisam abrir os arquivos.
+
+A ordem é gravar o arquivo e só depois apagar as linhas. Se o processo cair
+entre as duas etapas, a próxima execução anexa as mesmas operações de novo e
+a leitura descarta as repetidas pelo ``uuid``.
+"""
+import gzip
+import json
+import logging
+import os
+import shutil
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import estatisticas, shards
+from .models import Operacao, SegmentoArquivo, Usuario
+from .serializers import CAMPOS_OPERACAO
+from .signals import historico_limpo
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACAO_PADRAO = {
+    'DIRETORIO': None,
+    # Dias de retenção por nível; None mantém as operações na tabela para sempre.
+    'DIAS': {'padrao': 365, 'staff': None},
+    'TAMANHO_LOTE': 5000,
+}
+
+
+def config(chave: str):
+    personalizada = getattr(settings, 'CALCULADORA_RETENCAO', {})
+    return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+
+def diretorio() -> Path:
+    return Path(config('DIRETORIO') or Path(settings.BASE_DIR) / 'arquivo_operacoes')
+
+
+def nivel(usuario: Usuario) -> str:
+    return 'staff' if usuario.is_staff else 'padrao'
+
+
+def dias_retencao(usuario: Usuario) -> Optional[int]:
+    """Prazo do usuário, ou o do seu nível quando ele não tem um próprio."""
+    if usuario.dias_retencao is not None:
+        return usuario.dias_retencao
+    dias = config('DIAS')
+    return dias.get(nivel(usuario), dias.get('padrao'))
+
+
+def inicio_mes(valor: datetime) -> date:
+    return timezone.localtime(valor).date().replace(day=1)
+
+
+def caminho_segmento(usuario_id: int, mes: date) -> Path:
+    return diretorio() / str(usuario_id) / f'{mes:%Y-%m}.ndjson.gz'
+
+
+def _registro(linha: dict) -> dict:
+    return {
+        'id': linha['id'],
+        'uuid': str(linha['uuid']),
+        'operacao': linha['operacao'],
+        'resultado': linha['resultado'],
+        'tipo_operacao': linha['tipo_operacao'],
+        'data_inclusao': linha['data_inclusao'].isoformat(),
+    }
+
+
+def _anexar(caminho: Path, linhas: Iterable[dict]) -> int:
+    """Anexa um membro gzip com as linhas e retorna o tamanho final do arquivo."""
+    conteudo = ''.join(
+        json.dumps(_registro(linha), ensure_ascii=False, separators=(',', ':')) + '\n'
+        for linha in linhas
+    )
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'ab') as arquivo:
+        arquivo.write(gzip.compress(conteudo.encode('utf-8')))
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+        return arquivo.tell()
+
+
+def _indexar(usuario_id: int, mes: date, linhas: List[dict], tamanho: int) -> None:
+    segmento, _ = SegmentoArquivo.objects.select_for_update().get_or_create(usuario_id=usuario_id, mes=mes)
+    por_tipo = Counter(segmento.por_tipo)
+    por_tipo.update(linha['tipo_operacao'] for linha in linhas)
+    datas = [linha['data_inclusao'] for linha in linhas]
+
+    segmento.quantidade += len(linhas)
+    segmento.por_tipo = dict(por_tipo)
+    segmento.tamanho_bytes = tamanho
+    segmento.primeira_data = min(filter(None, [segmento.primeira_data, *datas]))
+    segmento.ultima_data = max(filter(None, [segmento.ultima_data, *datas]))
+    segmento.save()
+
+
+def arquivar_usuario(usuario: Usuario, dias: Optional[int] = None, agora: Optional[datetime] = None) -> int:
+    """Move para o arquivo as operações do usuário mais antigas que o prazo de retenção."""
+    dias = dias_retencao(usuario) if dias is None else dias
+    if dias is None:
+        return 0
+
+    corte = (agora or timezone.now()) - timedelta(days=dias)
+    total = 0
+    while True:
+        linhas = list(
+            Operacao.objects.do_usuario(usuario)
+            .filter(data_inclusao__lt=corte)
+            .order_by('data_inclusao', 'id')
+            .values(*CAMPOS_OPERACAO)[:config('TAMANHO_LOTE')]
+        )
+        if not linhas:
+            return total
+
+        por_mes = defaultdict(list)
+        for linha in linhas:
+            por_mes[inicio_mes(linha['data_inclusao'])].append(linha)
+
+        tamanhos = {
+            mes: _anexar(caminho_segmento(usuario.pk, mes), do_mes)
+            for mes, do_mes in por_mes.items()
+        }
+
+        with transaction.atomic(), transaction.atomic(using=shards.banco_do_usuario(usuario.pk)):
+            for mes, do_mes in por_mes.items():
+                _indexar(usuario.pk, mes, do_mes, tamanhos[mes])
+            Operacao.objects.do_shard(usuario.pk).filter(id__in=[linha['id'] for linha in linhas]).delete()
+            # As operações saíram do histórico: as listagens guardadas pelos clientes mudaram.
+            estatisticas.marcar_alteracao(usuario.pk)
+
+        total += len(linhas)
+
+
+def ler_segmento(usuario: Usuario, mes: date) -> List[dict]:
+    """
+    Lê as operações arquivadas de um mês, da mais recente para a mais antiga.
+
+    Retorna linhas no formato de ``values(*CAMPOS_OPERACAO)``, prontas para
+    ``iterar_operacoes``.
+    """
+    caminho = caminho_segmento(usuario.pk, mes)
+    if not caminho.exists():
+        return []
+
+    linhas = {}
+    with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+        for texto in arquivo:
+            dados = json.loads(texto)
+            dados['data_inclusao'] = datetime.fromisoformat(dados['data_inclusao'])
+            linhas[dados['uuid']] = dados
+
+    return sorted(linhas.values(), key=lambda linha: (linha['data_inclusao'], linha['id']), reverse=True)
+
+
+def remover_arquivo(usuario_id: int) -> None:
+    """Apaga o índice e, após o commit, os arquivos do usuário."""
+    SegmentoArquivo.objects.filter(usuario_id=usuario_id).delete()
+    pasta = diretorio() / str(usuario_id)
+    transaction.on_commit(lambda: shutil.rmtree(pasta, ignore_errors=True))
+
+
+@receiver(historico_limpo)
+def _ao_limpar_historico(sender, usuario_id: int, **kwargs) -> None:
+    remover_arquivo(usuario_id)
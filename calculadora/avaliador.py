@@ -0,0 +1,389 @@
+"""
+Avaliador de expressões aritméticas da calculadora.
+
+Substitui o uso de ``eval``: cada expressão é tokenizada, convertida em uma
+árvore sintática e compilada uma única vez em uma árvore de closures. Os
+programas compilados ficam em um cache LRU limitado, de modo que expressões
+repetidas só pagam o custo da execução.
+
+Gramática suportada::
+
+    expressao := termo (('+' | '-') termo)*
+    termo     := unario (('*' | '/') unario)*
+    unario    := ('+' | '-') unario | primario
+    primario  := NUMERO | VARIAVEL | '(' expressao ')'
+
+Variáveis só são aceitas em modelos de expressão (``compilar_vetorizado``),
+que são avaliados coluna a coluna sobre grades de valores.
+"""
+import math
+import operator
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+Numero = Union[int, float]
+Programa = Callable[[], Numero]
+ProgramaVetorial = Callable[[Dict[str, Sequence[Numero]], int], list]
+
+TAMANHO_CACHE_PROGRAMAS = 2048
+
+# Níveis de parênteses aceitos. O parser é recursivo e cada nível custa alguns
+# quadros de pilha; sem o limite, ~240 níveis (menos de 500 caracteres)
+# estourariam a recursão do Python.
+PROFUNDIDADE_MAXIMA = 100
+
+_TOKEN = re.compile(r'(\d+\.?\d*|\.\d+)|([+\-*/()])|([A-Za-z_][A-Za-z0-9_]*)')
+
+_OPERADORES_BINARIOS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+_ERRO_CARACTERES = 'Operação contém caracteres não permitidos'
+_ERRO_PARENTESES = 'Parênteses não balanceados'
+_ERRO_SINTAXE = 'Expressão matemática inválida'
+_ERRO_DIVISAO_ZERO = 'Divisão por zero não é permitida'
+_ERRO_OVERFLOW = 'Resultado muito grande'
+
+# Mensagens que podem aparecer no lugar de um resultado.
+MENSAGENS_ERRO = frozenset({
+    _ERRO_CARACTERES, _ERRO_PARENTESES, _ERRO_SINTAXE, _ERRO_DIVISAO_ZERO, _ERRO_OVERFLOW
+})
+
+
+def normalizar(expressao: str) -> str:
+    """Remove todos os espaços em branco da expressão."""
+    return ''.join(expressao.split())
+
+
+def tokenizar(expressao: str, permitir_variaveis: bool = False) -> List[Tuple[str, object]]:
+    """Converte a expressão normalizada em uma lista de tokens ``(tipo, valor)``."""
+    if not expressao:
+        raise ValueError(_ERRO_CARACTERES)
+
+    tokens = []
+    posicao = 0
+    tamanho = len(expressao)
+    while posicao < tamanho:
+        encontrado = _TOKEN.match(expressao, posicao)
+        if not encontrado:
+            raise ValueError(_ERRO_CARACTERES)
+
+        numero, simbolo, variavel = encontrado.groups()
+        if numero is not None:
+            tokens.append(('num', _converter_numero(numero)))
+        elif simbolo is not None:
+            tokens.append(('op', simbolo))
+        elif permitir_variaveis:
+            tokens.append(('var', variavel))
+        else:
+            raise ValueError(_ERRO_CARACTERES)
+        posicao = encontrado.end()
+
+    if expressao.count('(') != expressao.count(')'):
+        raise ValueError(_ERRO_PARENTESES)
+
+    return tokens
+
+
+def _converter_numero(texto: str) -> Numero:
+    """Converte um literal numérico seguindo as regras de literais do Python."""
+    if '.' in texto:
+        return float(texto)
+
+    # Assim como no Python, inteiros com zeros à esquerda (ex: 007) são inválidos.
+    if len(texto) > 1 and texto[0] == '0' and texto.strip('0'):
+        raise ValueError(_ERRO_SINTAXE)
+
+    return int(texto)
+
+
+class _Parser:
+    """Parser descendente recursivo que produz a árvore sintática em tuplas."""
+
+    def __init__(self, tokens: List[Tuple[str, object]]) -> None:
+        self.tokens = tokens
+        self.posicao = 0
+        self.profundidade = 0
+
+    def _atual(self) -> Tuple[str, object]:
+        if self.posicao < len(self.tokens):
+            return self.tokens[self.posicao]
+        return ('fim', None)
+
+    def _consumir_operador(self, operadores: str) -> Union[str, None]:
+        tipo, valor = self._atual()
+        if tipo == 'op' and valor in operadores:
+            self.posicao += 1
+            return valor
+        return None
+
+    def analisar(self) -> tuple:
+        arvore = self._expressao()
+        if self.posicao != len(self.tokens):
+            raise ValueError(_ERRO_SINTAXE)
+        return arvore
+
+    def _expressao(self) -> tuple:
+        no = self._termo()
+        while True:
+            operador = self._consumir_operador('+-')
+            if operador is None:
+                return no
+            no = ('bin', operador, no, self._termo())
+
+    def _termo(self) -> tuple:
+        no = self._unario()
+        while True:
+            operador = self._consumir_operador('*/')
+            if operador is None:
+                return no
+            no = ('bin', operador, no, self._unario())
+
+    def _unario(self) -> tuple:
+        # Sinais seguidos são lidos em laço e reduzidos a um único nó.
+        sinais = negativos = 0
+        while (operador := self._consumir_operador('+-')) is not None:
+            sinais += 1
+            negativos += operador == '-'
+
+        no = self._primario()
+        if not sinais:
+            return no
+        return ('neg' if negativos % 2 else 'pos', no)
+
+    def _primario(self) -> tuple:
+        tipo, valor = self._atual()
+        if tipo in ('num', 'var'):
+            self.posicao += 1
+            return (tipo, valor)
+
+        if self._consumir_operador('(') is not None:
+            self.profundidade += 1
+            if self.profundidade > PROFUNDIDADE_MAXIMA:
+                raise ValueError(_ERRO_SINTAXE)
+            no = self._expressao()
+            if self._consumir_operador(')') is None:
+                raise ValueError(_ERRO_SINTAXE)
+            self.profundidade -= 1
+            return no
+
+        raise ValueError(_ERRO_SINTAXE)
+
+
+def analisar(expressao: str, permitir_variaveis: bool = False) -> tuple:
+    """Gera a árvore sintática de uma expressão já normalizada."""
+    return _Parser(tokenizar(expressao, permitir_variaveis)).analisar()
+
+
+def _gerar(no: tuple) -> Programa:
+    """Transforma um nó da árvore sintática em uma closure executável."""
+    tipo = no[0]
+
+    if tipo == 'num':
+        valor = no[1]
+        return lambda: valor
+
+    if tipo == 'neg':
+        operando = _gerar(no[1])
+        return lambda: -operando()
+
+    if tipo == 'pos':
+        operando = _gerar(no[1])
+        return lambda: +operando()
+
+    funcao = _OPERADORES_BINARIOS[no[1]]
+    esquerda = _gerar(no[2])
+    direita = _gerar(no[3])
+    return lambda: funcao(esquerda(), direita())
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_PROGRAMAS)
+def _compilar_normalizada(expressao: str) -> Programa:
+    return _gerar(analisar(expressao))
+
+
+def compilar(expressao: str) -> Programa:
+    """Compila a expressão (ou reaproveita o programa do cache LRU)."""
+    try:
+        return _compilar_normalizada(normalizar(expressao))
+    except RecursionError:
+        raise ValueError(_ERRO_SINTAXE)
+
+
+def executar(programa: Programa) -> Numero:
+    """
+    Executa um programa compilado aplicando as regras de arredondamento.
+
+    Toda falha da avaliação vira ``ValueError`` com a mensagem para o cliente.
+    """
+    try:
+        resultado = programa()
+    except ZeroDivisionError:
+        raise ValueError(_ERRO_DIVISAO_ZERO)
+    except ArithmeticError:
+        # OverflowError e qualquer outro erro aritmético além da divisão por zero.
+        raise ValueError(_ERRO_OVERFLOW)
+    except RecursionError:
+        raise ValueError(_ERRO_SINTAXE)
+
+    if isinstance(resultado, float):
+        # Literais enormes e multiplicações de floats dão inf em vez de OverflowError.
+        if not math.isfinite(resultado):
+            raise ValueError(_ERRO_OVERFLOW)
+        resultado = round(resultado, 10)
+
+    return resultado
+
+
+def avaliar(expressao: str) -> Numero:
+    """Calcula uma expressão matemática de forma segura."""
+    return executar(compilar(expressao))
+
+
+class ErroLinha:
+    """Marca uma linha da grade cujo cálculo falhou."""
+    __slots__ = ('mensagem',)
+
+    def __init__(self, mensagem: str) -> None:
+        self.mensagem = mensagem
+
+    def __repr__(self) -> str:
+        return f'ErroLinha({self.mensagem!r})'
+
+
+_LINHA_DIVISAO_ZERO = ErroLinha(_ERRO_DIVISAO_ZERO)
+_LINHA_OVERFLOW = ErroLinha(_ERRO_OVERFLOW)
+
+
+def _aplicar_linha(funcao: Callable, *operandos: object) -> object:
+    """Aplica o operador a uma única linha, convertendo falhas em ErroLinha."""
+    for operando in operandos:
+        if isinstance(operando, ErroLinha):
+            return operando
+    try:
+        return funcao(*operandos)
+    except ZeroDivisionError:
+        return _LINHA_DIVISAO_ZERO
+    except OverflowError:
+        return _LINHA_OVERFLOW
+
+
+def _gerar_vetorial(no: tuple) -> ProgramaVetorial:
+    """
+    Transforma um nó da árvore em uma closure que opera sobre colunas inteiras.
+
+    Cada operador é aplicado à coluna toda de uma vez com ``map``; só quando
+    alguma linha falha (divisão por zero, overflow ou erro propagado) a coluna
+    é refeita linha a linha para isolar o erro.
+    """
+    tipo = no[0]
+
+    if tipo == 'num':
+        valor = no[1]
+        return lambda colunas, linhas: [valor] * linhas
+
+    if tipo == 'var':
+        nome = no[1]
+        return lambda colunas, linhas: colunas[nome]
+
+    if tipo in ('neg', 'pos'):
+        funcao = operator.neg if tipo == 'neg' else operator.pos
+        operando = _gerar_vetorial(no[1])
+
+        def unario(colunas, linhas):
+            valores = operando(colunas, linhas)
+            try:
+                return list(map(funcao, valores))
+            except TypeError:
+                return [_aplicar_linha(funcao, valor) for valor in valores]
+
+        return unario
+
+    funcao = _OPERADORES_BINARIOS[no[1]]
+    esquerda = _gerar_vetorial(no[2])
+    direita = _gerar_vetorial(no[3])
+
+    def binario(colunas, linhas):
+        valores_esquerda = esquerda(colunas, linhas)
+        valores_direita = direita(colunas, linhas)
+        try:
+            return list(map(funcao, valores_esquerda, valores_direita))
+        except (ZeroDivisionError, OverflowError, TypeError):
+            return [
+                _aplicar_linha(funcao, a, b)
+                for a, b in zip(valores_esquerda, valores_direita)
+            ]
+
+    return binario
+
+
+def _variaveis(no: tuple) -> set:
+    if no[0] == 'var':
+        return {no[1]}
+    if no[0] == 'num':
+        return set()
+    return set().union(*(_variaveis(filho) for filho in no[1:] if isinstance(filho, tuple)))
+
+
+@lru_cache(maxsize=TAMANHO_CACHE_PROGRAMAS)
+def _compilar_vetorizado_normalizado(modelo: str) -> Tuple[ProgramaVetorial, Tuple[str, ...]]:
+    arvore = analisar(modelo, permitir_variaveis=True)
+    return _gerar_vetorial(arvore), tuple(sorted(_variaveis(arvore)))
+
+
+def compilar_vetorizado(modelo: str) -> Tuple[ProgramaVetorial, Tuple[str, ...]]:
+    """Compila um modelo com variáveis, retornando o programa e as variáveis usadas."""
+    return _compilar_vetorizado_normalizado(normalizar(modelo))
+
+
+def executar_vetorizado(
+    programa: ProgramaVetorial,
+    colunas: Dict[str, Sequence[Numero]],
+    linhas: int
+) -> Tuple[List[Union[Numero, None]], List[dict]]:
+    """
+    Executa um programa vetorial sobre as colunas de valores.
+
+    Retorna a lista de resultados (``None`` nas linhas com erro) e a lista de
+    erros no formato ``{'linha': indice, 'detalhes': mensagem}``.
+    """
+    if linhas == 0:
+        return [], []
+
+    resultados = []
+    erros = []
+    for indice, valor in enumerate(programa(colunas, linhas)):
+        if isinstance(valor, ErroLinha):
+            resultados.append(None)
+            erros.append({'linha': indice, 'detalhes': valor.mensagem})
+        elif isinstance(valor, float):
+            # Floats não levantam OverflowError na multiplicação: viram inf (ou nan).
+            if not math.isfinite(valor):
+                resultados.append(None)
+                erros.append({'linha': indice, 'detalhes': _ERRO_OVERFLOW})
+                continue
+            resultados.append(round(valor, 10))
+        else:
+            resultados.append(valor)
+
+    return resultados, erros
+
+
+def info_cache() -> dict:
+    """Retorna as métricas do cache de programas compilados."""
+    info = _compilar_normalizada.cache_info()
+    return {
+        'acertos': info.hits,
+        'falhas': info.misses,
+        'tamanho': info.currsize,
+        'capacidade': info.maxsize,
+    }
+
+
+def limpar_cache() -> None:
+    """Descarta todos os programas compilados."""
+    _compilar_normalizada.cache_clear()
@@ -0,0 +1,260 @@
+"""
+Backend de autenticação do projeto.
+
+O login busca o usuário pelo email uma única vez: quem já carregou o usuário
+(como o ``LoginSerializer``) o passa em ``authenticate(usuario=...)`` e a senha
+é conferida nessa mesma instância. ``check_password`` regrava o hash quando
+ele foi gerado com um algoritmo ou número de iterações diferente do primeiro
+de ``PASSWORD_HASHERS``, então os hashes antigos são atualizados no login.
+
+A cada requisição com sessão, o ``AuthenticationMiddleware`` chama
+``get_user`` do backend para carregar o usuário da sessão (``aget_user``,
+via ``request.auser()``, nas views assíncronas). Aqui essa leitura
+passa por duas camadas de cache antes do banco:
+
+* um dicionário do processo, consultado sem rede, com entradas válidas por
+  ``JANELA_LOCAL`` segundos;
+* o alias de cache ``CACHE``, compartilhado entre os workers (Redis,
+  Memcached, arquivo ou banco), com entradas válidas por ``TIMEOUT`` segundos.
+  Um ``LocMemCache`` só existe no processo e não recebe as invalidações dos
+  outros workers, então com ele (o alias ``default`` do projeto) essa camada
+  é ignorada.
+
+Salvar ou remover o usuário, limpar o histórico, fazer logout e excluir a
+conta apagam a cópia do processo atual e a entrada compartilhada. Os outros
+processos podem continuar servindo a cópia local antiga por até
+``JANELA_LOCAL`` segundos; essa é a janela de desatualização reportada nas
+métricas.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Usuario
+from .signals import historico_limpo
+
+CONFIGURACAO_PADRAO = {
+    'CACHE': 'default',
+    'TIMEOUT': 300,
+    'JANELA_LOCAL': 2,
+    'MAXIMO_LOCAL': 10000,
+}
+
+
+def config(chave: str):
+    personalizada = getattr(settings, 'CALCULADORA_CACHE_USUARIOS', {})
+    return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+
+def cache_compartilhado():
+    """O alias ``CACHE``, ou None se não houver um ou se ele for local ao processo."""
+    alias = config('CACHE')
+    if not alias:
+        return None
+    cache = caches[alias]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+class CacheUsuarios:
+    """Cache em duas camadas (processo e compartilhado) dos usuários das sessões."""
+    prefixo = 'usuario:sessao:'
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._locais = OrderedDict()
+        self._zerar()
+
+    def _zerar(self) -> None:
+        self.acertos_locais = 0
+        self.acertos_compartilhados = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.idade_maxima_local = 0.0
+
+    def _chave(self, usuario_id: int) -> str:
+        return f'{self.prefixo}{usuario_id}'
+
+    def _guardar_local(self, usuario_id: int, usuario: Usuario) -> None:
+        with self._lock:
+            self._locais[usuario_id] = (time.monotonic(), usuario)
+            self._locais.move_to_end(usuario_id)
+            while len(self._locais) > config('MAXIMO_LOCAL'):
+                self._locais.popitem(last=False)
+
+    def _obter_local(self, usuario_id: int) -> Optional[Usuario]:
+        with self._lock:
+            item = self._locais.get(usuario_id)
+            if item is None:
+                return None
+            idade = time.monotonic() - item[0]
+            if idade > config('JANELA_LOCAL'):
+                del self._locais[usuario_id]
+                return None
+            self._locais.move_to_end(usuario_id)
+            self.acertos_locais += 1
+            self.idade_maxima_local = max(self.idade_maxima_local, idade)
+            return copy.copy(item[1])
+
+    def _contar_compartilhado(self, acerto: bool) -> None:
+        with self._lock:
+            if acerto:
+                self.acertos_compartilhados += 1
+            else:
+                self.falhas += 1
+
+    def obter(self, usuario_id: int, carregar: Callable[[int], Optional[Usuario]]) -> Optional[Usuario]:
+        """
+        Retorna uma cópia do usuário, consultando as camadas em ordem.
+
+        ``carregar`` lê o usuário do banco na falta; ``None`` não é memorizado.
+        """
+        usuario = self._obter_local(usuario_id)
+        if usuario is not None:
+            return usuario
+
+        cache = cache_compartilhado()
+        usuario = cache.get(self._chave(usuario_id)) if cache is not None else None
+        self._contar_compartilhado(usuario is not None)
+        if usuario is None:
+            usuario = carregar(usuario_id)
+            if usuario is None:
+                return None
+            if cache is not None:
+                cache.set(self._chave(usuario_id), usuario, config('TIMEOUT'))
+
+        self._guardar_local(usuario_id, usuario)
+        return copy.copy(usuario)
+
+    async def aobter(
+        self, usuario_id: int, carregar: Callable[[int], Awaitable[Optional[Usuario]]]
+    ) -> Optional[Usuario]:
+        """Versão assíncrona de ``obter``, para ``request.auser()`` nas views ASGI."""
+        usuario = self._obter_local(usuario_id)
+        if usuario is not None:
+            return usuario
+
+        cache = cache_compartilhado()
+        usuario = await cache.aget(self._chave(usuario_id)) if cache is not None else None
+        self._contar_compartilhado(usuario is not None)
+        if usuario is None:
+            usuario = await carregar(usuario_id)
+            if usuario is None:
+                return None
+            if cache is not None:
+                await cache.aset(self._chave(usuario_id), usuario, config('TIMEOUT'))
+
+        self._guardar_local(usuario_id, usuario)
+        return copy.copy(usuario)
+
+    def _apagar(self, usuario_id: int) -> None:
+        with self._lock:
+            self._locais.pop(usuario_id, None)
+        cache = cache_compartilhado()
+        if cache is not None:
+            cache.delete(self._chave(usuario_id))
+
+    def invalidar(self, usuario_id: int) -> None:
+        """Apaga o usuário das duas camadas agora e de novo após o commit."""
+        with self._lock:
+            self.invalidacoes += 1
+        self._apagar(usuario_id)
+        # Uma requisição concorrente pode ter lido a linha antiga antes do commit.
+        transaction.on_commit(lambda: self._apagar(usuario_id))
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._locais.clear()
+
+    def metricas(self) -> dict:
+        """
+        Contadores do processo atual.
+
+        ``alias`` é None quando a camada compartilhada está desligada;
+        ``janela_local`` é o limite da desatualização entre processos.
+        """
+        compartilhado = cache_compartilhado() is not None
+        with self._lock:
+            acertos = self.acertos_locais + self.acertos_compartilhados
+            total = acertos + self.falhas
+            return {
+                'alias': config('CACHE') if compartilhado else None,
+                'acertos_locais': self.acertos_locais,
+                'acertos_compartilhados': self.acertos_compartilhados,
+                'falhas': self.falhas,
+                'invalidacoes': self.invalidacoes,
+                'taxa_acerto': round(acertos / total, 4) if total else 0.0,
+                'entradas_locais': len(self._locais),
+                'janela_local': config('JANELA_LOCAL'),
+                'idade_maxima_local': round(self.idade_maxima_local, 3),
+            }
+
+    def zerar_metricas(self) -> None:
+        with self._lock:
+            self._zerar()
+
+
+cache_usuarios = CacheUsuarios()
+
+
+class BackendUsuario(ModelBackend):
+    """``ModelBackend`` com login em uma consulta e o usuário da sessão servido pelo ``cache_usuarios``."""
+
+    def authenticate(self, request, username=None, password=None, usuario: Optional[Usuario] = None, **kwargs) -> Optional[Usuario]:
+        if password is None:
+            return None
+        if usuario is None:
+            email = username if username is not None else kwargs.get(Usuario.USERNAME_FIELD)
+            if email is None:
+                return None
+            usuario = Usuario._default_manager.filter(email=email).first()
+            if usuario is None:
+                # Gera um hash mesmo assim, para o tempo de resposta não revelar se o email existe.
+                Usuario().set_password(password)
+                return None
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
+
+    def get_user(self, user_id) -> Optional[Usuario]:
+        try:
+            usuario_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return cache_usuarios.obter(usuario_id, super().get_user)
+
+    async def aget_user(self, user_id) -> Optional[Usuario]:
+        try:
+            usuario_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return await cache_usuarios.aobter(usuario_id, super().aget_user)
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def _usuario_alterado(sender, instance: Usuario, **kwargs) -> None:
+    # Perfil, senha, desativação e remoção da conta.
+    cache_usuarios.invalidar(instance.pk)
+
+
+@receiver(historico_limpo)
+def _ao_limpar_historico(sender, usuario_id: int, **kwargs) -> None:
+    # O corte operacoes_ocultas_ate é gravado com update(), sem post_save.
+    cache_usuarios.invalidar(usuario_id)
+
+
+@receiver(user_logged_out)
+def _ao_sair(sender, request, user, **kwargs) -> None:
+    if user is not None:
+        cache_usuarios.invalidar(user.pk)
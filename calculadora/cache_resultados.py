@@ -0,0 +1,130 @@
+"""
+Cache de resultados de cálculos.
+
+Os resultados são memorizados no framework de cache do Django, usando o alias
+definido em ``CALCULADORA_CACHE_RESULTADOS``. Com ``LocMemCache`` o cache vale
+para um único processo; apontando o alias para um backend compartilhado
+(Redis, Memcached, banco) o cache passa a ser dividido entre os workers.
+A chave é a expressão sem espaços, então ``2 + 2`` e ``2+2`` compartilham o
+mesmo resultado. Tamanho máximo e TTL vêm da configuração do próprio alias
+(``OPTIONS['MAX_ENTRIES']`` e ``TIMEOUT``).
+"""
+import hashlib
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.exceptions import ValidationError
+
+from . import avaliador
+from .avaliador import Numero
+from .serializers import validar_operacao
+
+
+def expressao_candidata(dados) -> Optional[str]:
+    """
+    Expressão do corpo da requisição, já validada, ou ``None``.
+
+    Aplica as regras de ``validar_operacao`` antes de qualquer consulta ao
+    cache: a chave ignora todos os espaços em branco, a validação não, então
+    um acerto não pode dispensá-la. Com ``None`` a view recorre ao
+    ``CalcularSerializer``, que monta as mensagens de erro.
+    """
+    operacao = dados.get('operacao') if hasattr(dados, 'get') else None
+    if not isinstance(operacao, str):
+        return None
+
+    try:
+        return validar_operacao(operacao)
+    except ValidationError:
+        return None
+
+
+class CacheResultados:
+    """Memoização de resultados de expressões com contadores de acerto/falha."""
+    prefixo = 'calc:resultado:'
+
+    def __init__(self, alias: Optional[str] = None) -> None:
+        self._alias = alias
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    @property
+    def alias(self) -> Optional[str]:
+        if self._alias is not None:
+            return self._alias
+        return getattr(settings, 'CALCULADORA_CACHE_RESULTADOS', None)
+
+    def _chave(self, normalizada: str) -> str:
+        # Expressões podem ter até 500 caracteres; o hash mantém a chave
+        # dentro do limite de backends como o Memcached.
+        return self.prefixo + hashlib.sha1(normalizada.encode()).hexdigest()
+
+    def _contar(self, acerto: bool) -> None:
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    def obter(self, expressao: str) -> Optional[Numero]:
+        """Retorna o resultado memorizado da expressão ou ``None``."""
+        alias = self.alias
+        if not alias:
+            return None
+
+        resultado = caches[alias].get(self._chave(avaliador.normalizar(expressao)))
+        self._contar(resultado is not None)
+        return resultado
+
+    def guardar(self, expressao: str, resultado: Numero) -> None:
+        """Memoriza o resultado de uma expressão válida."""
+        alias = self.alias
+        if alias:
+            caches[alias].set(self._chave(avaliador.normalizar(expressao)), resultado)
+
+    async def aobter(self, expressao: str) -> Optional[Numero]:
+        """Versão assíncrona de ``obter``."""
+        alias = self.alias
+        if not alias:
+            return None
+
+        resultado = await caches[alias].aget(self._chave(avaliador.normalizar(expressao)))
+        self._contar(resultado is not None)
+        return resultado
+
+    async def aguardar(self, expressao: str, resultado: Numero) -> None:
+        """Versão assíncrona de ``guardar``."""
+        alias = self.alias
+        if alias:
+            await caches[alias].aset(self._chave(avaliador.normalizar(expressao)), resultado)
+
+    def calcular(self, expressao: str) -> Numero:
+        """Calcula a expressão consultando o cache antes de avaliá-la."""
+        resultado = self.obter(expressao)
+        if resultado is None:
+            resultado = avaliador.avaliar(expressao)
+            self.guardar(expressao, resultado)
+        return resultado
+
+    def metricas(self) -> dict:
+        """Contadores de acerto/falha do processo atual."""
+        with self._lock:
+            acertos, falhas = self.acertos, self.falhas
+        total = acertos + falhas
+        return {
+            'alias': self.alias,
+            'acertos': acertos,
+            'falhas': falhas,
+            'taxa_acerto': round(acertos / total, 4) if total else 0.0,
+        }
+
+    def zerar_metricas(self) -> None:
+        with self._lock:
+            self.acertos = 0
+            self.falhas = 0
+
+
+cache_resultados = CacheResultados()
@@ -0,0 +1,76 @@
+"""
+GET condicional (ETag e Last-Modified) para o histórico e as estatísticas.
+
+Os validadores vêm de ``estatisticas.versao()``: uma leitura de cache, ou uma
+leitura por chave primária na falta. Se o cliente já tem a representação
+atual, a view responde 304 antes de executar a listagem, o COUNT ou a leitura
+das estatísticas.
+
+A versão é lida antes dos dados. Se uma escrita acontecer entre as duas
+leituras, a resposta leva dados novos com a ETag antiga e a próxima
+requisição recebe 200, nunca um 304 com dados antigos. A réplica não muda
+isso: quem acabou de escrever lê do primário (``roteador``), e as versões só
+mudam com escritas do próprio usuário.
+
+O Last-Modified é a data mais recente entre a da versão e as de
+``datas_modificacao``, que cobrem o que mais entra na ETag e muda sem uma
+escrita no histórico (o nome do usuário, a virada do dia). O formato da
+resposta entra no ``Vary: Accept``; URL e página já separam as representações
+por si.
+"""
+import hashlib
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from . import estatisticas
+
+
+def etag(*partes) -> str:
+    """ETag forte a partir das partes que determinam a representação."""
+    resumo = hashlib.md5(':'.join(str(parte) for parte in partes).encode(), usedforsecurity=False)
+    return f'"{resumo.hexdigest()}"'
+
+
+class RespostaCondicionalMixin:
+    """
+    Mixin para APIViews de leitura do histórico: responde 304 quando a versão não mudou.
+
+    O ``get`` da view passa a montagem da resposta para
+    ``resposta_condicional``, que só a executa quando for preciso. As
+    subclasses informam em ``partes_etag`` o que, além da versão, muda a
+    representação (página, formato, nome do usuário...) e, em
+    ``datas_modificacao``, quando essas partes mudaram pela última vez.
+    """
+
+    def partes_etag(self, request) -> tuple:
+        return (request.get_full_path(), request.accepted_media_type)
+
+    def datas_modificacao(self, request) -> tuple:
+        return ()
+
+    def validadores(self, request) -> Tuple[str, Optional[datetime]]:
+        versao, modificado = estatisticas.versao(request.user.pk)
+        datas = [data for data in (modificado, *self.datas_modificacao(request)) if data is not None]
+        valor_etag = etag(type(self).__name__, request.user.pk, versao, *self.partes_etag(request))
+        return valor_etag, max(datas) if datas else None
+
+    def resposta_condicional(self, request, montar: Callable[[], HttpResponseBase]) -> HttpResponseBase:
+        valor_etag, modificado = self.validadores(request)
+        ultima_modificacao = int(modificado.timestamp()) if modificado else None
+
+        resposta = get_conditional_response(request, etag=valor_etag, last_modified=ultima_modificacao)
+        if resposta is None:
+            resposta = montar()
+
+        if resposta.status_code in (200, 304):
+            resposta['ETag'] = valor_etag
+            if ultima_modificacao is not None:
+                resposta['Last-Modified'] = http_date(ultima_modificacao)
+            # O navegador guarda a resposta, mas revalida a cada uso.
+            patch_cache_control(resposta, private=True, no_cache=True)
+            patch_vary_headers(resposta, ['Accept'])
+        return resposta
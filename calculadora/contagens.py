@@ -0,0 +1,162 @@
+"""
+Contagens de operações por período (rollups por hora e por dia).
+
+Cada inserção soma suas operações aos períodos correspondentes na tabela
+``ContagemPeriodo``, dentro da mesma transação. Consultas por intervalo leem
+apenas os períodos do intervalo, então o custo cresce com o número de
+períodos e não com o número de operações. Os limites de hora e dia seguem o
+``TIME_ZONE`` do projeto (America/Sao_Paulo).
+"""
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, List
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import Trunc
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import arquivamento, shards
+from .models import ContagemPeriodo, Operacao, SegmentoArquivo, Usuario
+from .signals import historico_limpo, operacoes_criadas
+
+PASSOS = {
+    'hora': timedelta(hours=1),
+    'dia': timedelta(days=1),
+}
+
+
+def inicio_periodo(valor: datetime, granularidade: str) -> datetime:
+    """Trunca o datetime no início da hora ou do dia no fuso local."""
+    local = timezone.localtime(valor)
+    if granularidade == 'dia':
+        return local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return local.replace(minute=0, second=0, microsecond=0)
+
+
+def proximo_periodo(inicio: datetime, granularidade: str) -> datetime:
+    """Início do período seguinte no fuso local."""
+    if granularidade == 'dia':
+        # Soma em horário de parede, válida também em dias com 23 ou 25 horas.
+        return inicio_periodo(timezone.localtime(inicio) + PASSOS['dia'], 'dia')
+    return timezone.localtime(inicio.astimezone(dt_timezone.utc) + PASSOS['hora'])
+
+
+def _somar(usuario_id: int, granularidade: str, inicio: datetime, tipo: str, quantidade: int) -> None:
+    banco = shards.banco_do_usuario(usuario_id)
+    filtro = ContagemPeriodo.objects.using(banco).filter(
+        usuario_id=usuario_id, granularidade=granularidade, inicio=inicio, tipo_operacao=tipo
+    )
+    if filtro.update(quantidade=F('quantidade') + quantidade):
+        return
+
+    try:
+        with transaction.atomic(using=banco):
+            ContagemPeriodo.objects.using(banco).create(
+                usuario_id=usuario_id,
+                granularidade=granularidade,
+                inicio=inicio,
+                tipo_operacao=tipo,
+                quantidade=quantidade
+            )
+    except IntegrityError:
+        # Outra transação criou o período ao mesmo tempo.
+        filtro.update(quantidade=F('quantidade') + quantidade)
+
+
+def registrar_operacoes(usuario_id: int, operacoes: Iterable[Operacao]) -> None:
+    """Soma as operações inseridas às contagens por hora e por dia."""
+    contagens = Counter()
+    for operacao in operacoes:
+        for granularidade in PASSOS:
+            inicio = inicio_periodo(operacao.data_inclusao, granularidade)
+            contagens[(granularidade, inicio, operacao.tipo_operacao)] += 1
+
+    with transaction.atomic(using=shards.banco_do_usuario(usuario_id)):
+        for (granularidade, inicio, tipo), quantidade in contagens.items():
+            _somar(usuario_id, granularidade, inicio, tipo, quantidade)
+
+
+def reconstruir(usuario_id: int) -> int:
+    """
+    Recalcula todas as contagens do usuário a partir das operações.
+
+    O arquivamento não altera as contagens, então as operações arquivadas
+    também entram: os segmentos do arquivo frio são lidos por inteiro.
+    """
+    fuso = timezone.get_current_timezone()
+    usuario = Usuario.objects.only('id', 'operacoes_ocultas_ate').get(pk=usuario_id)
+    contagens = Counter()
+    for granularidade, tipo_trunc in (('hora', 'hour'), ('dia', 'day')):
+        linhas = (
+            Operacao.objects.do_usuario(usuario)
+            .annotate(periodo=Trunc('data_inclusao', tipo_trunc, tzinfo=fuso))
+            .values_list('periodo', 'tipo_operacao')
+            .annotate(quantidade=Count('id'))
+            .order_by()
+        )
+        for periodo, tipo, quantidade in linhas:
+            contagens[(granularidade, periodo, tipo)] += quantidade
+
+    for mes in SegmentoArquivo.objects.filter(usuario_id=usuario_id).values_list('mes', flat=True):
+        for linha in arquivamento.ler_segmento(usuario, mes):
+            for granularidade in PASSOS:
+                inicio = inicio_periodo(linha['data_inclusao'], granularidade)
+                contagens[(granularidade, inicio, linha['tipo_operacao'])] += 1
+
+    novas = [
+        ContagemPeriodo(
+            usuario_id=usuario_id,
+            granularidade=granularidade,
+            inicio=inicio,
+            tipo_operacao=tipo,
+            quantidade=quantidade
+        )
+        for (granularidade, inicio, tipo), quantidade in contagens.items()
+    ]
+
+    banco = shards.banco_do_usuario(usuario_id)
+    with transaction.atomic(using=banco):
+        ContagemPeriodo.objects.using(banco).filter(usuario_id=usuario_id).delete()
+        ContagemPeriodo.objects.using(banco).bulk_create(novas, batch_size=1000)
+    return len(novas)
+
+
+def consultar(usuario_id: int, inicio: datetime, fim: datetime, granularidade: str) -> List[dict]:
+    """
+    Retorna os períodos de ``[inicio, fim)`` com o total e a divisão por tipo.
+
+    Períodos sem operações aparecem com total zero.
+    """
+    periodos = {}
+    atual = inicio_periodo(inicio, granularidade)
+    while atual < fim:
+        periodos[atual] = {'inicio': atual, 'total': 0, 'por_tipo': {}}
+        atual = proximo_periodo(atual, granularidade)
+
+    linhas = ContagemPeriodo.objects.using(shards.banco_leitura(usuario_id)).filter(
+        usuario_id=usuario_id,
+        granularidade=granularidade,
+        inicio__gte=inicio_periodo(inicio, granularidade),
+        inicio__lt=fim
+    ).values_list('inicio', 'tipo_operacao', 'quantidade')
+
+    for periodo_inicio, tipo, quantidade in linhas:
+        periodo = periodos.get(timezone.localtime(periodo_inicio))
+        if periodo is None:
+            continue
+        periodo['total'] += quantidade
+        periodo['por_tipo'][tipo] = periodo['por_tipo'].get(tipo, 0) + quantidade
+
+    return list(periodos.values())
+
+
+@receiver(operacoes_criadas)
+def _ao_criar_operacoes(sender, usuario_id: int, operacoes: list, **kwargs) -> None:
+    registrar_operacoes(usuario_id, operacoes)
+
+
+@receiver(historico_limpo)
+def _ao_limpar_historico(sender, usuario_id: int, **kwargs) -> None:
+    ContagemPeriodo.objects.using(shards.banco_do_usuario(usuario_id)).filter(usuario_id=usuario_id).delete()
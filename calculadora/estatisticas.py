@@ -0,0 +1,272 @@
+"""
+Estatísticas de uso mantidas de forma incremental.
+
+Em vez de contar as operações a cada acesso, a tabela ``EstatisticasUsuario``
+é atualizada na mesma transação das inserções e limpezas de histórico. O
+endpoint de estatísticas passa a ser uma leitura por chave primária.
+
+A mesma linha guarda a ``versao_historico`` do usuário, incrementada a cada
+inserção, limpeza, arquivamento ou mudança de shard. Ela e a
+``data_atualizacao`` são os validadores (ETag e Last-Modified) do histórico e
+das estatísticas; ``versao()`` os lê do cache, sem consultar o banco, quando
+``CACHE_VERSAO`` é compartilhado entre os workers. Com um ``LocMemCache`` um
+worker não veria as escritas feitas nos outros, então a versão é lida do
+banco a cada vez.
+"""
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import shards
+from .models import EstatisticasUsuario, Operacao, SegmentoArquivo, Usuario
+from .signals import historico_limpo, operacoes_criadas
+
+# Hoje mais os sete dias anteriores, que é a janela de "operações da semana".
+DIAS_MANTIDOS = 8
+
+# Cache da versão do histórico; só é usado se for compartilhado entre os processos.
+CACHE_VERSAO = 'default'
+TIMEOUT_VERSAO = 300
+
+
+def _chave_versao(usuario_id: int) -> str:
+    return f'estatisticas:versao:{usuario_id}'
+
+
+def _cache_versao():
+    """O cache ``CACHE_VERSAO``, ou None se ele for local ao processo."""
+    cache = caches[CACHE_VERSAO]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def _esquecer_versao(usuario_id: int, banco: str) -> None:
+    """Apaga a versão do cache agora e de novo após o commit."""
+    cache = _cache_versao()
+    if cache is None:
+        return
+    cache.delete(_chave_versao(usuario_id))
+    # Uma leitura concorrente pode ter guardado a versão antiga antes do commit.
+    transaction.on_commit(lambda: cache.delete(_chave_versao(usuario_id)), using=banco)
+
+
+def _publicar_versao(usuario_id: int, banco: str, valor: Tuple[int, datetime]) -> None:
+    """
+    Como ``_esquecer_versao``, mas após o commit grava a versão nova no cache.
+
+    Assim a próxima leitura do histórico não paga a consulta da versão logo
+    depois de cada cálculo. Uma versão maior já guardada não é sobrescrita.
+    """
+    cache = _cache_versao()
+    if cache is None:
+        return
+    chave = _chave_versao(usuario_id)
+    cache.delete(chave)
+
+    def gravar() -> None:
+        atual = cache.get(chave)
+        if atual is None or atual[0] < valor[0]:
+            cache.set(chave, valor, TIMEOUT_VERSAO)
+
+    transaction.on_commit(gravar, using=banco)
+
+
+def versao(usuario_id: int) -> Tuple[int, Optional[datetime]]:
+    """
+    ``(versao_historico, data_atualizacao)`` do usuário.
+
+    Um acerto custa uma leitura de cache; na falta, ou sem cache
+    compartilhado, uma leitura por chave primária no primário do shard (a
+    réplica poderia devolver uma versão antiga).
+    """
+    cache = _cache_versao()
+    valor = cache.get(_chave_versao(usuario_id)) if cache is not None else None
+    if valor is None:
+        valor = (
+            EstatisticasUsuario.objects.using(shards.banco_do_usuario(usuario_id)).filter(pk=usuario_id)
+            .values_list('versao_historico', 'data_atualizacao').first()
+        ) or (0, None)
+        if cache is not None:
+            cache.set(_chave_versao(usuario_id), valor, TIMEOUT_VERSAO)
+    return valor
+
+
+def marcar_alteracao(usuario_id: int) -> None:
+    """Incrementa a versão do histórico quando as operações mudam sem passar pelos contadores."""
+    banco = shards.banco_do_usuario(usuario_id)
+    EstatisticasUsuario.objects.using(banco).filter(pk=usuario_id).update(
+        versao_historico=F('versao_historico') + 1, data_atualizacao=timezone.now()
+    )
+    _esquecer_versao(usuario_id, banco)
+
+
+def _data_local(valor: datetime) -> date:
+    return timezone.localtime(valor).date()
+
+
+def _aparar_dias(contagens: dict, hoje: date) -> dict:
+    limite = (hoje - timedelta(days=DIAS_MANTIDOS - 1)).isoformat()
+    return {dia: total for dia, total in contagens.items() if dia >= limite}
+
+
+def na_janela(valores: dict, hoje: Optional[date] = None) -> dict:
+    """
+    Cópia dos contadores com ``contagens_diarias`` restrito à janela atual.
+
+    A linha gravada só é aparada na próxima escrita, então pode guardar dias
+    que já saíram da janela; compare sempre as duas versões por aqui.
+    """
+    return {**valores, 'contagens_diarias': _aparar_dias(valores['contagens_diarias'], hoje or timezone.localdate())}
+
+
+def registrar_operacoes(usuario_id: int, operacoes: Iterable[Operacao]) -> None:
+    """
+    Soma as operações inseridas aos contadores do usuário.
+
+    Se o usuário ainda não tem linha de estatísticas, ela nasce de
+    ``calcular()`` em vez de zero, para não perder o histórico anterior.
+    """
+    por_tipo = Counter()
+    por_dia = Counter()
+    for operacao in operacoes:
+        por_tipo[operacao.tipo_operacao] += 1
+        por_dia[_data_local(operacao.data_inclusao).isoformat()] += 1
+
+    banco = shards.banco_do_usuario(usuario_id)
+    with transaction.atomic(using=banco):
+        estatisticas, criada = (
+            EstatisticasUsuario.objects.using(banco).select_for_update().get_or_create(usuario_id=usuario_id)
+        )
+        if criada:
+            # Primeira escrita desde a criação da tabela: o histórico anterior
+            # também conta. As operações novas já foram inseridas e entram na soma.
+            for campo, valor in calcular(usuario_id).items():
+                setattr(estatisticas, campo, valor)
+        else:
+            estatisticas.total_operacoes += sum(por_tipo.values())
+            for tipo, total in por_tipo.items():
+                campo = EstatisticasUsuario.CAMPOS_POR_TIPO.get(tipo, 'total_mista')
+                setattr(estatisticas, campo, getattr(estatisticas, campo) + total)
+
+            contagens = Counter(estatisticas.contagens_diarias)
+            contagens.update(por_dia)
+            estatisticas.contagens_diarias = _aparar_dias(dict(contagens), timezone.localdate())
+        estatisticas.versao_historico += 1
+        estatisticas.save()
+        _publicar_versao(usuario_id, banco, (estatisticas.versao_historico, estatisticas.data_atualizacao))
+
+
+def zerar(usuario_id: int) -> None:
+    """Zera os contadores do usuário após a limpeza do histórico."""
+    EstatisticasUsuario.objects.using(shards.banco_do_usuario(usuario_id)).update_or_create(
+        usuario_id=usuario_id,
+        defaults={
+            'total_operacoes': 0,
+            'contagens_diarias': {},
+            **{campo: 0 for campo in EstatisticasUsuario.CAMPOS_POR_TIPO.values()},
+        }
+    )
+    marcar_alteracao(usuario_id)
+
+
+def calcular(usuario_id: int) -> dict:
+    """Calcula os contadores a partir da tabela de operações e do índice do arquivo frio."""
+    usuario = Usuario.objects.only('id', 'operacoes_ocultas_ate').get(pk=usuario_id)
+    operacoes = Operacao.objects.do_usuario(usuario)
+    hoje = timezone.localdate()
+    inicio_janela = timezone.make_aware(
+        datetime.combine(hoje - timedelta(days=DIAS_MANTIDOS - 1), time.min)
+    )
+
+    por_tipo = Counter(dict(
+        operacoes.values_list('tipo_operacao').annotate(total=Count('id')).order_by()
+    ))
+    for arquivadas in SegmentoArquivo.objects.filter(usuario_id=usuario_id).values_list('por_tipo', flat=True):
+        por_tipo.update(arquivadas)
+    por_dia = (
+        operacoes.filter(data_inclusao__gte=inicio_janela)
+        .annotate(dia=TruncDate('data_inclusao', tzinfo=timezone.get_current_timezone()))
+        .values_list('dia')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    valores = {
+        'total_operacoes': sum(por_tipo.values()),
+        'contagens_diarias': {dia.isoformat(): total for dia, total in por_dia},
+    }
+    for tipo, campo in EstatisticasUsuario.CAMPOS_POR_TIPO.items():
+        valores[campo] = por_tipo.get(tipo, 0)
+    return valores
+
+
+def reconstruir(usuario_id: int) -> EstatisticasUsuario:
+    """Recalcula e grava os contadores do usuário a partir das operações."""
+    banco = shards.banco_do_usuario(usuario_id)
+    with transaction.atomic(using=banco):
+        estatisticas, _ = EstatisticasUsuario.objects.using(banco).update_or_create(
+            usuario_id=usuario_id, defaults=calcular(usuario_id)
+        )
+        marcar_alteracao(usuario_id)
+    return estatisticas
+
+
+def obter(usuario) -> dict:
+    """Monta a resposta da API de estatísticas com uma leitura por chave primária."""
+    try:
+        estatisticas = EstatisticasUsuario.objects.using(shards.banco_leitura(usuario.pk)).get(pk=usuario.pk)
+    except EstatisticasUsuario.DoesNotExist:
+        # Usuários anteriores à tabela de estatísticas sem nenhuma escrita desde
+        # então são migrados no primeiro acesso (ou no próximo cálculo, em registrar_operacoes).
+        estatisticas = reconstruir(usuario.pk)
+
+    return _resposta(estatisticas, usuario.data_cadastro)
+
+
+async def aobter(usuario) -> dict:
+    """Versão assíncrona de ``obter``, para as views ASGI."""
+    try:
+        estatisticas = await EstatisticasUsuario.objects.using(shards.banco_leitura(usuario.pk)).aget(pk=usuario.pk)
+    except EstatisticasUsuario.DoesNotExist:
+        estatisticas = await sync_to_async(reconstruir)(usuario.pk)
+
+    if 'data_cadastro' in usuario.get_deferred_fields():
+        data_cadastro = await Usuario.objects.filter(pk=usuario.pk).values_list('data_cadastro', flat=True).aget()
+    else:
+        data_cadastro = usuario.data_cadastro
+    return _resposta(estatisticas, data_cadastro)
+
+
+def _resposta(estatisticas: EstatisticasUsuario, data_cadastro: datetime) -> dict:
+    hoje = timezone.localdate()
+    contagens = _aparar_dias(estatisticas.contagens_diarias, hoje)
+
+    return {
+        'total_operacoes': estatisticas.total_operacoes,
+        'operacoes_hoje': contagens.get(hoje.isoformat(), 0),
+        'operacoes_semana': sum(contagens.values()),
+        'operacoes_por_tipo': [
+            {'tipo_operacao': tipo, 'count': getattr(estatisticas, campo)}
+            for tipo, campo in EstatisticasUsuario.CAMPOS_POR_TIPO.items()
+            if getattr(estatisticas, campo)
+        ],
+        'membro_desde': data_cadastro.strftime('%B %Y'),
+    }
+
+
+@receiver(operacoes_criadas)
+def _ao_criar_operacoes(sender, usuario_id: int, operacoes: list, **kwargs) -> None:
+    registrar_operacoes(usuario_id, operacoes)
+
+
+@receiver(historico_limpo)
+def _ao_limpar_historico(sender, usuario_id: int, **kwargs) -> None:
+    zerar(usuario_id)
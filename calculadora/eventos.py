@@ -0,0 +1,278 @@
+"""
+Eventos do histórico em tempo real (Server-Sent Events).
+
+Cada conexão em ``/api/operacoes/eventos/`` assina o canal do seu usuário no
+``Hub`` do processo. Quando operações são gravadas (sinal
+``operacoes_criadas``) ou o histórico é limpo (``historico_limpo``), o evento
+é publicado depois do commit e entregue a todas as abas abertas do usuário,
+que aplicam as linhas recebidas sem consultar o histórico de novo.
+
+Um evento é serializado uma única vez, já no formato SSE, e só quando há
+assinantes. A publicação passa por um transporte: ``TransporteLocal`` entrega
+direto ao hub deste processo e é o substituto local da distribuição entre
+workers. Com vários processos, um transporte com broker (por exemplo Redis
+PUBLISH/SUBSCRIBE) envia o mesmo texto ao broker e o ouvinte de cada worker
+chama ``hub.entregar``; ele é configurado em ``CALCULADORA_EVENTOS['TRANSPORTE']``.
+
+Os eventos das operações levam ``id`` igual ao maior id entregue. Ao
+reconectar, o navegador envia ``Last-Event-ID`` e a view reenvia o que foi
+gravado nesse intervalo.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Set
+
+from django.conf import settings
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import shards
+from .models import Operacao
+from .serializers import CAMPOS_OPERACAO, iterar_operacoes
+from .signals import historico_limpo, operacoes_criadas
+
+CONFIGURACAO_PADRAO = {
+    'TRANSPORTE': 'calculadora.eventos.TransporteLocal',
+    'KEEPALIVE': 15,         # segundos entre comentários que mantêm a conexão aberta
+    'DURACAO_MAXIMA': 300,   # segundos de cada conexão; o navegador reconecta sozinho
+    'RECONEXAO': 1000,       # milissegundos de espera do navegador antes de reconectar
+    'TAMANHO_FILA': 100,     # eventos pendentes por conexão antes de considerá-la atrasada
+    'LIMITE_LOTE': 50,       # acima disso, pede que as abas recarreguem em vez de enviar as linhas
+}
+
+
+def config(chave: str):
+    personalizada = getattr(settings, 'CALCULADORA_EVENTOS', {})
+    return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+
+def quadro(tipo: str, dados, id_evento: Optional[int] = None) -> str:
+    """Evento no formato ``text/event-stream``."""
+    cabecalho = f'id: {id_evento}\n' if id_evento is not None else ''
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(',', ':'))
+    return f'{cabecalho}event: {tipo}\ndata: {corpo}\n\n'
+
+
+def quadro_operacoes(linhas: List[dict], usuario) -> str:
+    """Evento com linhas de ``values(*CAMPOS_OPERACAO)`` no formato do histórico."""
+    return quadro('operacoes', list(iterar_operacoes(linhas, usuario)), max(linha['id'] for linha in linhas))
+
+
+RECARREGAR = quadro('historico_alterado', {})
+KEEPALIVE = ': keepalive\n\n'
+
+
+class Assinatura:
+    """
+    Eventos pendentes de uma conexão.
+
+    Recebe eventos de qualquer thread. É consumida por um gerador síncrono
+    (WSGI) ou assíncrono (ASGI); no segundo caso o loop é associado na
+    primeira espera.
+    """
+
+    def __init__(self, usuario_id: int, tamanho: int) -> None:
+        self.usuario_id = usuario_id
+        self.atrasada = False
+        self._tamanho = tamanho
+        self._pendentes = deque()
+        self._condicao = threading.Condition()
+        self._loop = None
+        self._sinal = None
+
+    def entregar(self, evento: str) -> None:
+        with self._condicao:
+            if len(self._pendentes) >= self._tamanho:
+                # Quem não consome não pode acumular memória; a aba recarrega o histórico.
+                self.atrasada = True
+            else:
+                self._pendentes.append(evento)
+            self._condicao.notify()
+            loop, sinal = self._loop, self._sinal
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(sinal.set)
+            except RuntimeError:
+                pass  # loop encerrado: a conexão já terminou
+
+    def _retirar(self) -> Optional[str]:
+        return self._pendentes.popleft() if self._pendentes else None
+
+    def proximo(self, timeout: float) -> Optional[str]:
+        """Próximo evento, ou ``None`` se nada chegar em ``timeout`` segundos."""
+        with self._condicao:
+            if not self._pendentes and not self.atrasada:
+                self._condicao.wait(timeout)
+            return self._retirar()
+
+    async def aproximo(self, timeout: float) -> Optional[str]:
+        """Versão assíncrona de ``proximo``."""
+        with self._condicao:
+            if self._loop is None:
+                self._loop = asyncio.get_running_loop()
+                self._sinal = asyncio.Event()
+            if self._pendentes or self.atrasada:
+                return self._retirar()
+            self._sinal.clear()
+        try:
+            await asyncio.wait_for(self._sinal.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self._condicao:
+            return self._retirar()
+
+
+class Hub:
+    """Assinaturas deste processo, por usuário."""
+
+    def __init__(self) -> None:
+        self._assinaturas: Dict[int, Set[Assinatura]] = {}
+        self._lock = threading.Lock()
+        self.zerar_metricas()
+
+    def assinar(self, usuario_id: int) -> Assinatura:
+        assinatura = Assinatura(usuario_id, config('TAMANHO_FILA'))
+        with self._lock:
+            self._assinaturas.setdefault(usuario_id, set()).add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura) -> None:
+        with self._lock:
+            do_usuario = self._assinaturas.get(assinatura.usuario_id)
+            if do_usuario is not None:
+                do_usuario.discard(assinatura)
+                if not do_usuario:
+                    del self._assinaturas[assinatura.usuario_id]
+            if assinatura.atrasada:
+                self.atrasadas += 1
+
+    def tem_assinantes(self, usuario_id: int) -> bool:
+        return usuario_id in self._assinaturas
+
+    def entregar(self, usuario_id: int, evento: str) -> None:
+        with self._lock:
+            assinaturas = list(self._assinaturas.get(usuario_id, ()))
+            self.publicados += 1
+            self.entregues += len(assinaturas)
+        for assinatura in assinaturas:
+            assinatura.entregar(evento)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                'usuarios': len(self._assinaturas),
+                'conexoes': sum(len(do_usuario) for do_usuario in self._assinaturas.values()),
+                'publicados': self.publicados,
+                'entregues': self.entregues,
+                'atrasadas': self.atrasadas,
+            }
+
+    def zerar_metricas(self) -> None:
+        self.publicados = 0
+        self.entregues = 0
+        self.atrasadas = 0
+
+
+hub = Hub()
+
+
+class TransporteLocal:
+    """
+    Substituto local da distribuição entre workers: publica no hub deste processo.
+
+    Um transporte entre processos implementa os mesmos dois métodos;
+    ``tem_assinantes`` deve retornar ``True`` quando não souber responder.
+    """
+
+    def __init__(self, hub: Hub) -> None:
+        self.hub = hub
+
+    def tem_assinantes(self, usuario_id: int) -> bool:
+        return self.hub.tem_assinantes(usuario_id)
+
+    def publicar(self, usuario_id: int, evento: str) -> None:
+        self.hub.entregar(usuario_id, evento)
+
+
+_transportes: Dict[str, object] = {}
+
+
+def transporte():
+    caminho = config('TRANSPORTE')
+    if caminho not in _transportes:
+        _transportes[caminho] = import_string(caminho)(hub)
+    return _transportes[caminho]
+
+
+def publicar_operacoes(usuario_id: int, operacoes: List[Operacao]) -> None:
+    canal = transporte()
+    if not canal.tem_assinantes(usuario_id):
+        return
+    if len(operacoes) > config('LIMITE_LOTE'):
+        canal.publicar(usuario_id, RECARREGAR)
+        return
+
+    linhas = [{campo: getattr(operacao, campo) for campo in CAMPOS_OPERACAO} for operacao in operacoes]
+    canal.publicar(usuario_id, quadro_operacoes(linhas, operacoes[0].usuario))
+
+
+def fluxo(usuario_id: int, recuperar: Callable[[], List[str]]) -> Iterator[str]:
+    """
+    Gerador síncrono da resposta SSE.
+
+    A assinatura é feita antes de ``recuperar`` (eventos perdidos desde o
+    ``Last-Event-ID``), para que nada gravado entre os dois passos se perca;
+    a aba descarta as linhas repetidas pelo ``uuid``.
+    """
+    assinatura = hub.assinar(usuario_id)
+    try:
+        yield f'retry: {config("RECONEXAO")}\n\n'
+        yield from recuperar()
+        limite = time.monotonic() + config('DURACAO_MAXIMA')
+        while (restante := limite - time.monotonic()) > 0:
+            evento = assinatura.proximo(min(config('KEEPALIVE'), restante))
+            if assinatura.atrasada:
+                yield RECARREGAR
+                return
+            yield evento or KEEPALIVE
+    finally:
+        hub.cancelar(assinatura)
+
+
+async def afluxo(usuario_id: int, recuperar: Callable[[], Awaitable[List[str]]]):
+    """Versão assíncrona de ``fluxo``, para ASGI."""
+    assinatura = hub.assinar(usuario_id)
+    try:
+        yield f'retry: {config("RECONEXAO")}\n\n'
+        for evento in await recuperar():
+            yield evento
+        limite = time.monotonic() + config('DURACAO_MAXIMA')
+        while (restante := limite - time.monotonic()) > 0:
+            evento = await assinatura.aproximo(min(config('KEEPALIVE'), restante))
+            if assinatura.atrasada:
+                yield RECARREGAR
+                return
+            yield evento or KEEPALIVE
+    finally:
+        hub.cancelar(assinatura)
+
+
+@receiver(operacoes_criadas)
+def _publicar_criadas(sender, usuario_id: int, operacoes: list, **kwargs) -> None:
+    transaction.on_commit(
+        lambda: publicar_operacoes(usuario_id, operacoes), using=shards.banco_do_usuario(usuario_id)
+    )
+
+
+@receiver(historico_limpo)
+def _publicar_limpeza(sender, usuario_id: int, **kwargs) -> None:
+    def publicar():
+        canal = transporte()
+        if canal.tem_assinantes(usuario_id):
+            canal.publicar(usuario_id, quadro('historico_limpo', {}))
+
+    transaction.on_commit(publicar)
@@ -0,0 +1,109 @@
+"""
+Exportação do histórico em fluxo (NDJSON ou CSV).
+
+As operações são lidas com ``QuerySet.iterator(chunk_size=...)`` e escritas
+na resposta à medida que chegam, então a memória usada não depende do tamanho
+do histórico. Opcionalmente o fluxo é comprimido com gzip em tempo real.
+
+Sob ASGI o Django junta um iterador síncrono em uma lista antes de enviá-lo,
+então a view usa ``agerar_exportacao``, que entrega os mesmos blocos um a um.
+"""
+import csv
+import json
+import zlib
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+
+from .serializers import CAMPOS_OPERACAO, iterar_operacoes
+
+TAMANHO_CHUNK = 2000
+
+# Tamanho aproximado de cada pedaço enviado ao cliente.
+TAMANHO_BLOCO = 64 * 1024
+
+COLUNAS_CSV = ['id', 'uuid', 'operacao', 'resultado', 'tipo_operacao', 'data_inclusao']
+
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+}
+
+
+class _Eco:
+    """Pseudo-arquivo que devolve o que o csv.writer escreve."""
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def _linhas_ndjson(operacoes: Iterable[dict]) -> Iterator[str]:
+    for operacao in operacoes:
+        yield json.dumps(operacao, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _linhas_csv(operacoes: Iterable[dict]) -> Iterator[str]:
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(COLUNAS_CSV)
+    for operacao in operacoes:
+        yield escritor.writerow([operacao[coluna] for coluna in COLUNAS_CSV])
+
+
+def _agrupar(linhas: Iterable[str]) -> Iterator[bytes]:
+    """Junta as linhas em blocos para evitar milhares de escritas minúsculas."""
+    bloco = []
+    tamanho = 0
+    for linha in linhas:
+        dados = linha.encode('utf-8')
+        bloco.append(dados)
+        tamanho += len(dados)
+        if tamanho >= TAMANHO_BLOCO:
+            yield b''.join(bloco)
+            bloco = []
+            tamanho = 0
+    if bloco:
+        yield b''.join(bloco)
+
+
+def _comprimir(blocos: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def gerar_exportacao(queryset, usuario, formato: str, comprimir: bool = False) -> Iterator[bytes]:
+    """
+    Gera o conteúdo da exportação do queryset de operações do usuário.
+
+    O queryset é projetado em ``CAMPOS_OPERACAO`` e percorrido em chunks, sem
+    contagem nem paginação.
+    """
+    linhas = queryset.values(*CAMPOS_OPERACAO).iterator(chunk_size=TAMANHO_CHUNK)
+    operacoes = iterar_operacoes(linhas, usuario)
+
+    if formato == 'csv':
+        conteudo = _agrupar(_linhas_csv(operacoes))
+    else:
+        conteudo = _agrupar(_linhas_ndjson(operacoes))
+
+    if comprimir:
+        return _comprimir(conteudo)
+    return conteudo
+
+
+async def agerar_exportacao(queryset, usuario, formato: str, comprimir: bool = False) -> AsyncIterator[bytes]:
+    """Versão assíncrona de ``gerar_exportacao``; cada bloco é lido do banco na thread da requisição."""
+    blocos = gerar_exportacao(queryset, usuario, formato, comprimir)
+    proximo = sync_to_async(next)
+    try:
+        while True:
+            bloco = await proximo(blocos, None)
+            if bloco is None:
+                return
+            yield bloco
+    finally:
+        # Cliente desconectado: fecha o cursor na mesma thread que o abriu.
+        await sync_to_async(blocos.close)()
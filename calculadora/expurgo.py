@@ -0,0 +1,164 @@
+"""
+Expurgo em segundo plano do histórico de operações.
+
+Limpar o histórico ou excluir a conta não apaga mais tudo na requisição. A
+view apenas move o corte ``Usuario.operacoes_ocultas_ate`` para o maior id
+atual, o que esconde as operações imediatamente, e agenda uma
+``TarefaExpurgo``. A tarefa apaga as operações em blocos de chave primária,
+cada um em uma transação curta, liberando o lock de escrita do SQLite entre
+os blocos.
+
+As tarefas do processo rodam em ordem numa única thread de expurgo, que
+fecha as conexões (primário e shards) ao fim de cada tarefa.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import shards
+from .models import ContagemPeriodo, EstatisticasUsuario, Operacao, TarefaExpurgo, Usuario
+from .signals import historico_limpo
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_BLOCO = 1000
+
+# Pausa entre blocos para que outras escritas consigam o lock do banco.
+PAUSA_ENTRE_BLOCOS = 0.01
+
+
+def ocultar_historico(usuario: Usuario) -> tuple:
+    """
+    Esconde todas as operações atuais do usuário.
+
+    Deve ser chamada dentro de uma transação. Retorna ``(limite_id, quantidade)``,
+    onde a quantidade vem das estatísticas incrementais em vez de um COUNT(*).
+    """
+    banco = shards.banco_do_usuario(usuario.pk)
+    limite_id = Operacao.objects.do_shard(usuario.pk).aggregate(maior=Max('id'))['maior'] or 0
+    quantidade = (
+        EstatisticasUsuario.objects.using(banco).filter(pk=usuario.pk)
+        .values_list('total_operacoes', flat=True).first()
+    )
+    if quantidade is None:
+        quantidade = Operacao.objects.do_usuario(usuario).count()
+
+    limite_id = max(limite_id, usuario.operacoes_ocultas_ate)
+    agora = timezone.now()
+    Usuario.objects.filter(pk=usuario.pk).update(operacoes_ocultas_ate=limite_id, historico_limpo_em=agora)
+    usuario.operacoes_ocultas_ate = limite_id
+    usuario.historico_limpo_em = agora
+    historico_limpo.send(sender=Operacao, usuario_id=usuario.pk)
+    return limite_id, quantidade
+
+
+def agendar(usuario: Usuario, tipo: str, limite_id: int, total_estimado: int) -> TarefaExpurgo:
+    """Cria a tarefa e a inicia quando a transação atual for confirmada."""
+    tarefa = TarefaExpurgo.objects.create(
+        usuario=usuario,
+        usuario_alvo=usuario.pk,
+        tipo=tipo,
+        limite_id=limite_id,
+        total_estimado=total_estimado
+    )
+    transaction.on_commit(lambda: iniciar(tarefa.pk))
+    return tarefa
+
+
+class ExecutorExpurgo:
+    """Fila de tarefas de expurgo atendida por uma única thread do processo."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._fila = None
+        self._thread = None
+        self._pid = None
+
+    def enviar(self, tarefa_id) -> None:
+        with self._lock:
+            # Após um fork a thread do processo pai não existe no filho.
+            if self._pid != os.getpid():
+                self._fila = queue.Queue()
+                self._thread = None
+                self._pid = os.getpid()
+            self._fila.put(tarefa_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._executar, args=(self._fila,), name='calculadora-expurgo', daemon=True
+                )
+                self._thread.start()
+
+    def _executar(self, fila: queue.Queue) -> None:
+        while True:
+            tarefa_id = fila.get()
+            try:
+                executar(tarefa_id)
+            except Exception:
+                logger.exception('Falha ao iniciar o expurgo %s.', tarefa_id)
+            finally:
+                # A tarefa usa o primário e o shard do usuário.
+                connections.close_all()
+                fila.task_done()
+
+
+executor = ExecutorExpurgo()
+
+
+def iniciar(tarefa_id) -> None:
+    """Envia a tarefa para a thread de expurgo (padrão) ou a executa na thread atual."""
+    if getattr(settings, 'CALCULADORA_EXPURGO_ASSINCRONO', True):
+        executor.enviar(tarefa_id)
+    else:
+        executar(tarefa_id)
+
+
+def executar(tarefa_id) -> TarefaExpurgo:
+    """Apaga as operações da tarefa em blocos e, para exclusão de conta, o usuário."""
+    tarefa = TarefaExpurgo.objects.get(pk=tarefa_id)
+    if tarefa.status == 'concluida':
+        return tarefa
+
+    TarefaExpurgo.objects.filter(pk=tarefa.pk).update(status='executando', data_atualizacao=timezone.now())
+    banco = shards.banco_do_usuario(tarefa.usuario_alvo)
+
+    try:
+        while True:
+            ids = list(
+                Operacao.objects.do_shard(tarefa.usuario_alvo).filter(id__lte=tarefa.limite_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:TAMANHO_BLOCO]
+            )
+            if not ids:
+                break
+
+            with transaction.atomic(), transaction.atomic(using=banco):
+                Operacao.objects.do_shard(tarefa.usuario_alvo).filter(id__in=ids).delete()
+                TarefaExpurgo.objects.filter(pk=tarefa.pk).update(
+                    removidas=F('removidas') + len(ids), data_atualizacao=timezone.now()
+                )
+            time.sleep(PAUSA_ENTRE_BLOCOS)
+
+        if tarefa.tipo == 'conta':
+            # Estatísticas e contagens podem estar em outro shard, fora do alcance do CASCADE.
+            EstatisticasUsuario.objects.using(banco).filter(pk=tarefa.usuario_alvo).delete()
+            ContagemPeriodo.objects.using(banco).filter(usuario_id=tarefa.usuario_alvo).delete()
+            Usuario.objects.filter(pk=tarefa.usuario_alvo).delete()
+
+        TarefaExpurgo.objects.filter(pk=tarefa.pk).update(
+            status='concluida', data_conclusao=timezone.now(), data_atualizacao=timezone.now()
+        )
+    except Exception as e:
+        logger.exception('Falha no expurgo %s.', tarefa.pk)
+        TarefaExpurgo.objects.filter(pk=tarefa.pk).update(
+            status='falhou', erro=str(e), data_atualizacao=timezone.now()
+        )
+
+    tarefa.refresh_from_db()
+    return tarefa
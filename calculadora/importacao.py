@@ -0,0 +1,225 @@
+"""
+Importação em fluxo de operações históricas (NDJSON ou CSV).
+
+O arquivo é lido linha a linha, validado em lotes e gravado com
+``criar_em_lote`` (um ``bulk_create`` por lote), preservando a
+``data_inclusao`` original. Linhas malformadas são entregues a uma função de
+rejeição e não interrompem a importação. O formato de entrada é o mesmo da
+exportação, então um arquivo exportado pode ser reimportado: operações cujo
+``uuid`` já existe em qualquer shard ou no arquivo frio do usuário são
+rejeitadas como duplicadas.
+
+Cada linha passa pelas mesmas regras de um cálculo ao vivo: a expressão por
+``validar_operacao`` e o resultado precisa ser um número ou uma mensagem de
+erro do avaliador.
+"""
+import csv
+import json
+import re
+import time
+import uuid
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import arquivamento, avaliador, shards
+from .models import Operacao, SegmentoArquivo
+from .serializers import validar_operacao
+
+TAMANHO_LOTE = 1000
+
+RESULTADO_REGEX = re.compile(r'^-?\d+(\.\d+)?([eE][+-]?\d+)?$')
+
+MOTIVO_DUPLICADA = 'Operação já importada (uuid duplicado).'
+
+FORMATOS = ('ndjson', 'csv')
+
+Registro = Tuple[int, object, Optional[dict]]
+Rejeitar = Callable[[int, object, str], None]
+
+
+class ResultadoImportacao:
+    """Totais de uma importação."""
+
+    def __init__(self) -> None:
+        self.importadas = 0
+        self.rejeitadas = 0
+        self.inicio = time.perf_counter()
+        self.duracao = 0.0
+
+    @property
+    def linhas_por_segundo(self) -> float:
+        if not self.duracao:
+            return 0.0
+        return round((self.importadas + self.rejeitadas) / self.duracao, 1)
+
+    def como_dict(self) -> dict:
+        return {
+            'importadas': self.importadas,
+            'rejeitadas': self.rejeitadas,
+            'duracao_segundos': round(self.duracao, 3),
+            'linhas_por_segundo': self.linhas_por_segundo,
+        }
+
+
+def ler_ndjson(linhas: Iterable[str]) -> Iterator[Registro]:
+    """Gera ``(numero_linha, conteudo_bruto, dados)``; ``dados`` é None se a linha não é JSON válido."""
+    for numero, linha in enumerate(linhas, start=1):
+        if not linha.strip():
+            continue
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            yield numero, linha.rstrip('\n'), None
+            continue
+        yield numero, linha.rstrip('\n'), dados if isinstance(dados, dict) else None
+
+
+def ler_csv(linhas: Iterable[str]) -> Iterator[Registro]:
+    """Gera ``(numero_linha, conteudo_bruto, dados)`` a partir de um CSV com cabeçalho."""
+    leitor = csv.DictReader(linhas)
+    for dados in leitor:
+        yield leitor.line_num, dados, dados
+
+
+def ler(formato: str, linhas: Iterable[str]) -> Iterator[Registro]:
+    if formato == 'csv':
+        return ler_csv(linhas)
+    return ler_ndjson(linhas)
+
+
+def validar_linha(dados: Optional[dict], usuario) -> Operacao:
+    """Converte uma linha em uma Operacao não salva, levantando ValueError se inválida."""
+    if dados is None:
+        raise ValueError('Linha malformada.')
+
+    operacao = dados.get('operacao')
+    if not isinstance(operacao, str) or not operacao.strip():
+        raise ValueError('Campo "operacao" ausente ou vazio.')
+    try:
+        operacao = validar_operacao(operacao)
+    except ValidationError as e:
+        raise ValueError(f'Campo "operacao" inválido: {e.detail[0]}')
+
+    resultado = dados.get('resultado')
+    if resultado is None or resultado == '' or isinstance(resultado, (dict, list, bool)):
+        raise ValueError('Campo "resultado" ausente ou inválido.')
+    resultado = str(resultado).strip()
+    if not RESULTADO_REGEX.match(resultado) and resultado not in avaliador.MENSAGENS_ERRO:
+        raise ValueError('Campo "resultado" deve ser um número ou uma mensagem de erro do cálculo.')
+    if len(resultado) > 255:
+        raise ValueError('Campo "resultado" com mais de 255 caracteres.')
+
+    texto_data = dados.get('data_inclusao')
+    data_inclusao = parse_datetime(texto_data) if isinstance(texto_data, str) else None
+    if data_inclusao is None:
+        raise ValueError('Campo "data_inclusao" ausente ou inválido.')
+    if timezone.is_naive(data_inclusao):
+        data_inclusao = timezone.make_aware(data_inclusao)
+
+    nova = Operacao(
+        usuario=usuario,
+        operacao=operacao,
+        resultado=resultado,
+        data_inclusao=data_inclusao
+    )
+
+    identificador = dados.get('uuid')
+    if identificador:
+        try:
+            nova.uuid = uuid.UUID(str(identificador))
+        except ValueError:
+            raise ValueError('Campo "uuid" inválido.')
+
+    return nova
+
+
+def _uuids_existentes(usuario, lote: List[Tuple[int, object, Operacao]]) -> Set[uuid.UUID]:
+    """uuids do lote já gravados, de qualquer usuário, em algum shard ou no arquivo frio do usuário."""
+    uuids = [operacao.uuid for _, _, operacao in lote]
+    existentes = set()
+    for banco in shards.shards():
+        existentes.update(Operacao.objects.using(banco).filter(uuid__in=uuids).values_list('uuid', flat=True))
+
+    meses = {arquivamento.inicio_mes(operacao.data_inclusao) for _, _, operacao in lote}
+    for mes in SegmentoArquivo.objects.filter(usuario_id=usuario.pk, mes__in=meses).values_list('mes', flat=True):
+        existentes.update(uuid.UUID(linha['uuid']) for linha in arquivamento.ler_segmento(usuario, mes))
+    return existentes
+
+
+def _inserir(lote: List[Tuple[int, object, Operacao]], rejeitar: Rejeitar) -> int:
+    """
+    Grava o lote com um bulk_create; se o banco recusar, grava uma a uma.
+
+    Uma operação gravada por outro processo entre a verificação e o insert
+    derruba o lote inteiro, então só nesse caso as linhas são repetidas
+    individualmente e as recusadas vão para ``rejeitar``.
+    """
+    try:
+        Operacao.objects.criar_em_lote([operacao for _, _, operacao in lote])
+        return len(lote)
+    except IntegrityError:
+        pass
+
+    gravadas = 0
+    for numero, bruto, operacao in lote:
+        operacao.pk = None
+        operacao._state.adding = True
+        try:
+            Operacao.objects.criar_em_lote([operacao])
+        except IntegrityError:
+            rejeitar(numero, bruto, MOTIVO_DUPLICADA)
+            continue
+        gravadas += 1
+    return gravadas
+
+
+def _gravar_lote(usuario, lote: List[Tuple[int, object, Operacao]], rejeitar: Rejeitar) -> int:
+    """Descarta duplicadas pelo uuid e grava o restante."""
+    existentes = _uuids_existentes(usuario, lote)
+
+    novas = []
+    vistos = set()
+    for numero, bruto, operacao in lote:
+        if operacao.uuid in existentes or operacao.uuid in vistos:
+            rejeitar(numero, bruto, MOTIVO_DUPLICADA)
+            continue
+        vistos.add(operacao.uuid)
+        novas.append((numero, bruto, operacao))
+
+    return _inserir(novas, rejeitar) if novas else 0
+
+
+def importar(
+    usuario,
+    registros: Iterable[Registro],
+    rejeitar: Rejeitar,
+    tamanho_lote: int = TAMANHO_LOTE
+) -> ResultadoImportacao:
+    """Valida e grava os registros em lotes de ``tamanho_lote`` operações."""
+    resultado = ResultadoImportacao()
+    lote = []
+
+    def rejeitar_e_contar(numero: int, bruto: object, motivo: str) -> None:
+        resultado.rejeitadas += 1
+        rejeitar(numero, bruto, motivo)
+
+    for numero, bruto, dados in registros:
+        try:
+            lote.append((numero, bruto, validar_linha(dados, usuario)))
+        except ValueError as e:
+            rejeitar_e_contar(numero, bruto, str(e))
+            continue
+
+        if len(lote) >= tamanho_lote:
+            resultado.importadas += _gravar_lote(usuario, lote, rejeitar_e_contar)
+            lote = []
+
+    if lote:
+        resultado.importadas += _gravar_lote(usuario, lote, rejeitar_e_contar)
+
+    resultado.duracao = time.perf_counter() - resultado.inicio
+    return resultado
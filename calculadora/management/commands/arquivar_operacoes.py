@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculadora import arquivamento
+from calculadora.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Move para o arquivo frio (gzip por usuário e mês) as operações mais antigas que o '
+        'prazo de retenção. Pode ser agendado no cron; execuções repetidas são seguras.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Email do usuário (padrão: todos os usuários).')
+        parser.add_argument(
+            '--dias', type=int,
+            help='Prazo de retenção em dias, ignorando o configurado para o usuário e o nível.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.order_by('pk')
+        if options['usuario']:
+            usuarios = usuarios.filter(email=options['usuario'])
+            if not usuarios.exists():
+                raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+        if options['dias'] is not None and options['dias'] < 0:
+            raise CommandError('--dias deve ser maior ou igual a zero.')
+
+        inicio = time.perf_counter()
+        total_usuarios = 0
+        total_operacoes = 0
+        for usuario in usuarios.iterator():
+            arquivadas = arquivamento.arquivar_usuario(usuario, dias=options['dias'])
+            if arquivadas:
+                total_usuarios += 1
+                total_operacoes += arquivadas
+                self.stdout.write(f'{usuario.email}: {arquivadas} operações arquivadas.')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_operacoes} operações de {total_usuarios} usuários arquivadas '
+            f'em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,160 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.urls import reverse
+
+from calculadora import shards, tokens
+from calculadora.models import ContagemPeriodo, EstatisticasUsuario, Operacao, Usuario
+
+# Rota DRF síncrona e a versão assíncrona equivalente.
+ROTAS = {
+    'estatisticas': ('calculadora:api_estatisticas', 'calculadora:api_estatisticas_async'),
+    'operacoes': ('calculadora:api_operacoes', 'calculadora:api_operacoes_async'),
+}
+
+HOST = 'localhost'
+
+
+def _percentil(valores, percentil):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * percentil))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara requisições/s e latência p99 das rotas de leitura com alta concorrência: '
+        'WSGI com threads e views DRF, ASGI com as mesmas views e ASGI com as views '
+        'assíncronas. Os handlers do Django são chamados no próprio processo, sem servidor.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rota', choices=sorted(ROTAS), default='estatisticas')
+        parser.add_argument('--concorrencia', type=int, default=64)
+        parser.add_argument('--requisicoes', type=int, default=2000)
+        parser.add_argument('--operacoes', type=int, default=200, help='Tamanho do histórico do usuário.')
+
+    def handle(self, *args, **options):
+        # Os workers leem de outras conexões; os dados precisam estar confirmados.
+        usuario = Usuario.objects.create_user(
+            username='benchmark-asgi@exemplo.com',
+            email='benchmark-asgi@exemplo.com',
+            password=None,
+            nome='Benchmark ASGI'
+        )
+        try:
+            Operacao.objects.criar_em_lote([
+                Operacao(usuario=usuario, operacao=f'{i} + {i}', resultado=str(2 * i))
+                for i in range(options['operacoes'])
+            ])
+            cabecalho = f'Bearer {tokens.emitir(usuario)["acesso"]}'
+            sincrona, assincrona = (reverse(nome) for nome in ROTAS[options['rota']])
+
+            self.stdout.write(f'{"modo":>11} {"req/s":>8} {"p50 (ms)":>9} {"p99 (ms)":>9} {"erros":>6}')
+            for modo, medir, caminho in (
+                ('wsgi', self._medir_wsgi, sincrona),
+                ('asgi-drf', self._medir_asgi, sincrona),
+                ('asgi-async', self._medir_asgi, assincrona),
+            ):
+                duracao, latencias, erros = medir(caminho, cabecalho, options)
+                self.stdout.write(
+                    f'{modo:>11} {len(latencias) / duracao:>8.0f} '
+                    f'{statistics.median(latencias) * 1000:>9.1f} '
+                    f'{_percentil(latencias, 0.99) * 1000:>9.1f} {erros:>6}'
+                )
+        finally:
+            banco = shards.banco_do_usuario(usuario.pk)
+            with transaction.atomic(using=banco):
+                Operacao.objects.do_shard(usuario.pk).delete()
+                EstatisticasUsuario.objects.using(banco).filter(pk=usuario.pk).delete()
+                ContagemPeriodo.objects.using(banco).filter(usuario_id=usuario.pk).delete()
+            usuario.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["requisicoes"]} requisições por modo com concorrência {options["concorrencia"]}.'
+        ))
+
+    def _medir_wsgi(self, caminho, cabecalho, options):
+        handler = WSGIHandler()
+
+        def requisicao(_):
+            ambiente = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': caminho,
+                'SCRIPT_NAME': '',
+                'QUERY_STRING': '',
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'HTTP_HOST': HOST,
+                'HTTP_AUTHORIZATION': cabecalho,
+                'wsgi.input': io.BytesIO(b''),
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': io.StringIO(),
+            }
+            estado = []
+            inicio = time.perf_counter()
+            resposta = handler(ambiente, lambda status, cabecalhos: estado.append(status))
+            b''.join(resposta)
+            resposta.close()
+            return time.perf_counter() - inicio, estado[0].startswith('200')
+
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            resultados = list(executor.map(requisicao, range(options['requisicoes'])))
+            # Cada thread abriu sua própria conexão.
+            list(executor.map(lambda _: connections.close_all(), range(options['concorrencia'])))
+        duracao = time.perf_counter() - inicio
+        return duracao, [latencia for latencia, _ in resultados], sum(not ok for _, ok in resultados)
+
+    def _medir_asgi(self, caminho, cabecalho, options):
+        handler = ASGIHandler()
+        escopo = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': caminho,
+            'raw_path': caminho.encode(),
+            'query_string': b'',
+            'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'authorization', cabecalho.encode())],
+            'client': ('127.0.0.1', 50000),
+            'server': (HOST, 80),
+        }
+
+        async def requisicao(limite):
+            async with limite:
+                corpo_enviado = False
+                estado = []
+
+                async def receber():
+                    nonlocal corpo_enviado
+                    if corpo_enviado:
+                        # O Django espera pela desconexão até a resposta terminar.
+                        await asyncio.Event().wait()
+                    corpo_enviado = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+                async def enviar(mensagem):
+                    if mensagem['type'] == 'http.response.start':
+                        estado.append(mensagem['status'])
+
+                inicio = time.perf_counter()
+                await handler(dict(escopo), receber, enviar)
+                return time.perf_counter() - inicio, estado[0] == 200
+
+        async def executar():
+            limite = asyncio.Semaphore(options['concorrencia'])
+            return await asyncio.gather(*(requisicao(limite) for _ in range(options['requisicoes'])))
+
+        inicio = time.perf_counter()
+        resultados = asyncio.run(executar())
+        duracao = time.perf_counter() - inicio
+        return duracao, [latencia for latencia, _ in resultados], sum(not ok for _, ok in resultados)
@@ -0,0 +1,74 @@
+import re
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from calculadora import avaliador
+
+
+EXPRESSOES_PADRAO = [
+    '2+2',
+    '100/3',
+    '(2 + 3) * 4',
+    '1500 * 0.0725 + 1500',
+    '((10 - 4) * (3 + 7)) / 2 - -5',
+    '(1200 * 1.07) - (1200 * 0.15) / 12',
+]
+
+
+def calcular_com_eval(operacao: str):
+    """Reprodução do caminho antigo baseado em ``eval``, usada como referência."""
+    operacao = operacao.replace(' ', '')
+
+    if not re.match(r'^[0-9+\-*/().]+$', operacao):
+        raise ValueError('Operação contém caracteres não permitidos')
+
+    if operacao.count('(') != operacao.count(')'):
+        raise ValueError('Parênteses não balanceados')
+
+    if '/0' in operacao.replace(' ', ''):
+        raise ValueError('Divisão por zero não é permitida')
+
+    resultado = eval(operacao, {"__builtins__": {}}, {})
+    if isinstance(resultado, float):
+        resultado = round(resultado, 10)
+    return resultado
+
+
+class Command(BaseCommand):
+    help = 'Compara a latência por chamada do avaliador compilado com o caminho antigo via eval.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticoes', type=int, default=20000)
+        parser.add_argument(
+            '--expressao', action='append', dest='expressoes',
+            help='Expressão a medir (pode ser repetido). Usa um conjunto padrão se omitido.'
+        )
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+        expressoes = options['expressoes'] or EXPRESSOES_PADRAO
+
+        self.stdout.write(f'{"expressão":<40} {"eval (µs)":>10} {"frio (µs)":>10} {"cache (µs)":>11}')
+        for expressao in expressoes:
+            if calcular_com_eval(expressao) != avaliador.avaliar(expressao):
+                self.stderr.write(f'Resultados divergentes para {expressao!r}')
+
+            tempo_eval = timeit.timeit(lambda: calcular_com_eval(expressao), number=repeticoes)
+
+            def compilar_a_frio():
+                avaliador.limpar_cache()
+                avaliador.avaliar(expressao)
+
+            tempo_frio = timeit.timeit(compilar_a_frio, number=repeticoes)
+            avaliador.limpar_cache()
+            tempo_cache = timeit.timeit(lambda: avaliador.avaliar(expressao), number=repeticoes)
+
+            self.stdout.write(
+                f'{expressao:<40} '
+                f'{tempo_eval / repeticoes * 1e6:>10.2f} '
+                f'{tempo_frio / repeticoes * 1e6:>10.2f} '
+                f'{tempo_cache / repeticoes * 1e6:>11.2f}'
+            )
+
+        self.stdout.write(str(avaliador.info_cache()))
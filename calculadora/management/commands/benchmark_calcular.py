@@ -0,0 +1,96 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.urls import reverse
+
+from calculadora import avaliador, shards, tokens
+from calculadora.models import Usuario
+from calculadora.persistencia import salvar_operacao
+from calculadora.serializers import validar_operacao
+from calculadora.views import CalcularAPIView
+from calculadora.views_rapidas import calcular_rapido
+
+HOST = 'localhost'
+
+
+class _Reverter(Exception):
+    """Usada para desfazer os dados temporários do benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o custo por requisição do cálculo: o núcleo (validação, avaliação e gravação), '
+        'a view DRF de /api/operacoes/calcular/ e o endpoint rápido sem DRF. As views são '
+        'chamadas diretamente, sem middlewares, para isolar o overhead de cada uma.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=2000)
+        parser.add_argument('--expressao', default='(12 + 30) * 2 - 7 / 7')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                usuario = Usuario.objects.create_user(
+                    username='benchmark-calcular@exemplo.com',
+                    email='benchmark-calcular@exemplo.com',
+                    password=None,
+                    nome='Benchmark Calcular'
+                )
+                with transaction.atomic(using=shards.banco_do_usuario(usuario.pk)):
+                    self._medir(usuario, options)
+                    raise _Reverter
+        except _Reverter:
+            pass
+
+    def _medir(self, usuario, options):
+        expressao = options['expressao']
+        corpo = json.dumps({'operacao': expressao})
+        fabrica = RequestFactory(HTTP_HOST=HOST, HTTP_AUTHORIZATION=f'Bearer {tokens.emitir(usuario)["acesso"]}')
+        view_drf = CalcularAPIView.as_view()
+        url_drf = reverse('calculadora:api_calcular')
+        url_rapido = reverse('calculadora:api_calcular_rapido')
+
+        def nucleo():
+            operacao = validar_operacao(expressao)
+            salvar_operacao(usuario, operacao, str(avaliador.avaliar(operacao)))
+
+        def drf():
+            resposta = view_drf(fabrica.post(url_drf, corpo, content_type='application/json'))
+            resposta.render()
+            return resposta.status_code
+
+        def rapido():
+            return calcular_rapido(
+                fabrica.post(url_rapido, corpo, content_type='application/json')
+            ).status_code
+
+        caminhos = {'nucleo': nucleo, 'drf': drf, 'rapido': rapido}
+        for nome, funcao in caminhos.items():
+            # A primeira chamada monta caches (avaliador, versão do token, URLs).
+            if funcao() not in (None, 200):
+                raise RuntimeError(f'O caminho {nome} não respondeu 200.')
+
+        # Intercalados, para que o crescimento da tabela afete todos os caminhos igualmente.
+        duracoes = {nome: [] for nome in caminhos}
+        for _ in range(options['requisicoes']):
+            for nome, funcao in caminhos.items():
+                inicio = time.perf_counter()
+                funcao()
+                duracoes[nome].append(time.perf_counter() - inicio)
+
+        self.stdout.write(f'{"caminho":>8} {"req/s":>8} {"µs/req":>8} {"overhead (µs)":>14}')
+        base = statistics.median(duracoes['nucleo']) * 1e6
+        for nome, amostras in duracoes.items():
+            mediana = statistics.median(amostras) * 1e6
+            self.stdout.write(
+                f'{nome:>8} {len(amostras) / sum(amostras):>8.0f} {mediana:>8.1f} {mediana - base:>14.1f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Medianas de {options["requisicoes"]} requisições por caminho; overhead em relação ao núcleo.'
+        ))
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from calculadora import shards
+from calculadora.models import Operacao, Usuario
+from calculadora.serializers import CAMPOS_OPERACAO, OperacaoSerializer, serializar_operacoes
+
+
+class _Reverter(Exception):
+    """Usada para desfazer os dados temporários do benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o tempo de serialização de uma página do histórico entre o '
+        'OperacaoSerializer e o caminho enxuto com values().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[20, 200, 2000])
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def handle(self, *args, **options):
+        tamanhos = options['tamanhos']
+        repeticoes = options['repeticoes']
+
+        try:
+            with transaction.atomic():
+                usuario = Usuario.objects.create_user(
+                    username='benchmark-historico@exemplo.com',
+                    email='benchmark-historico@exemplo.com',
+                    password=None,
+                    nome='Benchmark Histórico'
+                )
+                with transaction.atomic(using=shards.banco_do_usuario(usuario.pk)):
+                    Operacao.objects.criar_em_lote([
+                        Operacao(usuario=usuario, operacao=f'{i} + {i}', resultado=str(2 * i))
+                        for i in range(max(tamanhos))
+                    ])
+                    # Relê o usuário para que o cache de relacionamentos comece vazio.
+                    usuario = Usuario.objects.get(pk=usuario.pk)
+                    self._medir(usuario, tamanhos, repeticoes)
+                    raise _Reverter
+        except _Reverter:
+            pass
+
+    def _medir(self, usuario, tamanhos, repeticoes):
+        self.stdout.write(f'{"linhas":>7} {"serializer (ms)":>16} {"enxuto (ms)":>12} {"ganho":>7}')
+        for tamanho in tamanhos:
+            def serializer():
+                queryset = Operacao.objects.do_usuario(usuario)[:tamanho]
+                return OperacaoSerializer(queryset, many=True).data
+
+            def enxuto():
+                linhas = Operacao.objects.do_usuario(usuario).values(*CAMPOS_OPERACAO)[:tamanho]
+                return serializar_operacoes(linhas, usuario)
+
+            tempo_serializer = self._cronometrar(serializer, repeticoes)
+            tempo_enxuto = self._cronometrar(enxuto, repeticoes)
+            self.stdout.write(
+                f'{tamanho:>7} {tempo_serializer * 1000:>16.2f} {tempo_enxuto * 1000:>12.2f} '
+                f'{tempo_serializer / tempo_enxuto:>6.1f}x'
+            )
+
+    def _cronometrar(self, funcao, repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        return (time.perf_counter() - inicio) / repeticoes
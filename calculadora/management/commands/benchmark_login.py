@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from calculadora.models import Usuario
+from calculadora.serializers import LoginSerializer
+
+SENHA = 'senha-benchmark-123'
+
+
+class _Reverter(Exception):
+    """Usada para desfazer os dados temporários do benchmark."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de logins (pico da manhã) comparando a validação antiga, que buscava o '
+        'usuário e depois chamava authenticate(), com o LoginSerializer atual.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=200)
+        parser.add_argument('--logins', type=int, default=20, help='Logins medidos por caminho.')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                # Um único hash para todos: gerar um por usuário levaria minutos.
+                senha = make_password(SENHA)
+                emails = [f'benchmark-login-{i}@exemplo.com' for i in range(options['usuarios'])]
+                Usuario.objects.bulk_create(
+                    [Usuario(username=email, email=email, nome='Benchmark Login', password=senha) for email in emails],
+                    batch_size=500
+                )
+                self._medir(emails, options['logins'])
+                raise _Reverter
+        except _Reverter:
+            pass
+
+    def _medir(self, emails, logins):
+        def antigo(email):
+            Usuario.objects.get(email=email)
+            return authenticate(username=email, password=SENHA)
+
+        def atual(email):
+            serializer = LoginSerializer(data={'email': email, 'senha': SENHA})
+            serializer.is_valid(raise_exception=True)
+            return serializer.validated_data['usuario']
+
+        self.stdout.write(f'{"caminho":>8} {"logins/s":>9} {"ms/login":>9} {"consultas":>10}')
+        for nome, funcao in (('antigo', antigo), ('atual', atual)):
+            with CaptureQueriesContext(connection) as consultas:
+                inicio = time.perf_counter()
+                for indice in range(logins):
+                    if funcao(emails[indice % len(emails)]) is None:
+                        raise RuntimeError('Login do benchmark falhou.')
+                duracao = time.perf_counter() - inicio
+            self.stdout.write(
+                f'{nome:>8} {logins / duracao:>9.1f} {duracao / logins * 1000:>9.1f} '
+                f'{len(consultas) / logins:>10.1f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{logins} logins por caminho entre {len(emails)} usuários. O hash da senha '
+            '(PASSWORD_HASHERS) domina o tempo; o caminho atual faz uma consulta a menos.'
+        ))
@@ -0,0 +1,74 @@
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+# Senha da lista de senhas comuns: o registro é recusado sem gravar nada, depois de
+# passar por URLs, serializer, validadores de email e CommonPasswordValidator.
+REGISTRO = {'nome': 'Primeira Resposta', 'email': 'primeira@exemplo.com', 'senha': 'password123'}
+
+
+def _worker(aquecimento, resultados):
+    """Simula um worker novo: inicia o Django e mede as duas primeiras requisições."""
+    os.environ['CALCULADORA_AQUECIMENTO'] = str(aquecimento)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kogui_calculator.settings')
+    inicio = time.perf_counter()
+
+    import django
+    django.setup()
+    from django.test import Client
+    from django.urls import reverse
+
+    cliente = Client(HTTP_HOST='localhost')
+    # Como get_wsgi_application(), o worker carrega os middlewares antes do tráfego.
+    cliente.handler.load_middleware()
+    inicializacao = time.perf_counter() - inicio
+    logging.getLogger('django.request').setLevel(logging.ERROR)
+    url = reverse('calculadora:api_registro')
+    tempos = []
+    for _ in range(2):
+        comeco = time.perf_counter()
+        resposta = cliente.post(url, json.dumps(REGISTRO), content_type='application/json')
+        tempos.append(time.perf_counter() - comeco)
+    resultados.put((inicializacao, tempos[0], tempos[1], resposta.status_code))
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o tempo até a primeira resposta de um worker recém-iniciado, com e sem o '
+        'aquecimento de calculadora/aquecimento.py. Cada amostra roda em um processo novo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--amostras', type=int, default=5)
+
+    def handle(self, *args, **options):
+        contexto = multiprocessing.get_context('spawn')
+        self.stdout.write(
+            f'{"aquecimento":>11} {"inicio (ms)":>12} {"1a req (ms)":>12} {"2a req (ms)":>12} {"total (ms)":>11}'
+        )
+        for aquecimento in (False, True):
+            amostras = []
+            for _ in range(options['amostras']):
+                resultados = contexto.Queue()
+                processo = contexto.Process(target=_worker, args=(aquecimento, resultados))
+                processo.start()
+                amostras.append(resultados.get())
+                processo.join()
+
+            if any(status != 400 for *_, status in amostras):
+                self.stderr.write('Resposta inesperada do registro; confira ALLOWED_HOSTS e os validadores.')
+
+            inicio, primeira, segunda = (
+                statistics.median(amostra[indice] for amostra in amostras) * 1000 for indice in range(3)
+            )
+            self.stdout.write(
+                f'{"sim" if aquecimento else "não":>11} {inicio:>12.1f} {primeira:>12.1f} '
+                f'{segunda:>12.1f} {inicio + primeira:>11.1f}'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'Medianas de {options["amostras"]} processos por modo.'))
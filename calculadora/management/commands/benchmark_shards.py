@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from calculadora.shards import jump_hash
+from kogui_calculator.backends.sqlite_wal.base import PRAGMAS_PADRAO, aplicar_pragmas
+
+from .benchmark_sqlite import ESQUEMA
+
+USUARIOS = 1000
+
+
+def _escrever(pasta, quantidade_shards, pragmas, indice, segundos, resultados):
+    """Processo de gravação: cada cálculo vai para o arquivo do shard do usuário."""
+    conexoes = []
+    for shard in range(quantidade_shards):
+        conexao = sqlite3.connect(os.path.join(pasta, f'shard_{shard}.sqlite3'), isolation_level=None)
+        aplicar_pragmas(conexao, pragmas)
+        conexoes.append(conexao)
+
+    escritas = 0
+    bloqueios = 0
+    usuario = indice
+    fim = time.monotonic() + segundos
+    while time.monotonic() < fim:
+        usuario = (usuario * 7919 + 1) % USUARIOS
+        conexao = conexoes[jump_hash(usuario, quantidade_shards)]
+        try:
+            conexao.execute('BEGIN IMMEDIATE')
+            conexao.execute(
+                'INSERT INTO operacoes (usuario_id, operacao, resultado, data_inclusao) VALUES (?, ?, ?, ?)',
+                (usuario, '2 * 3', '6', time.time())
+            )
+            conexao.execute('UPDATE estatisticas SET total = total + 1 WHERE usuario_id = ?', (usuario,))
+            conexao.execute('COMMIT')
+            escritas += 1
+        except sqlite3.OperationalError:
+            if conexao.in_transaction:
+                conexao.execute('ROLLBACK')
+            bloqueios += 1
+
+    resultados.put((escritas, bloqueios))
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de cálculos gravados por vários processos em paralelo com 1, 2, 4... shards '
+        'SQLite (um lock de escrita por arquivo).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+        parser.add_argument('--processos', type=int, default=8)
+        parser.add_argument('--segundos', type=float, default=3.0)
+        parser.add_argument(
+            '--sincrono', default='FULL', choices=['NORMAL', 'FULL'],
+            help='PRAGMA synchronous do benchmark; FULL torna visível o custo do lock de escrita.'
+        )
+
+    def handle(self, *args, **options):
+        pragmas = {**PRAGMAS_PADRAO, 'synchronous': options['sincrono']}
+        self.stdout.write(f'{"shards":>6} {"escritas/s":>11} {"bloqueios":>10} {"escala":>7}')
+        base = None
+        for quantidade in options['shards']:
+            with tempfile.TemporaryDirectory() as pasta:
+                for shard in range(quantidade):
+                    conexao = sqlite3.connect(os.path.join(pasta, f'shard_{shard}.sqlite3'))
+                    aplicar_pragmas(conexao, pragmas)
+                    conexao.executescript(ESQUEMA)
+                    conexao.executemany(
+                        'INSERT INTO estatisticas (usuario_id, total) VALUES (?, 0)',
+                        ((usuario,) for usuario in range(USUARIOS) if jump_hash(usuario, quantidade) == shard)
+                    )
+                    conexao.commit()
+                    conexao.close()
+
+                escritas, bloqueios = self._medir(pasta, quantidade, pragmas, options)
+
+            vazao = escritas / options['segundos']
+            base = base or vazao
+            self.stdout.write(f'{quantidade:>6} {vazao:>11.0f} {bloqueios:>10} {vazao / base:>6.1f}x')
+
+    def _medir(self, pasta, quantidade, pragmas, options):
+        contexto = multiprocessing.get_context('spawn')
+        resultados = contexto.Queue()
+        processos = [
+            contexto.Process(
+                target=_escrever,
+                args=(pasta, quantidade, pragmas, indice, options['segundos'], resultados)
+            )
+            for indice in range(options['processos'])
+        ]
+        for processo in processos:
+            processo.start()
+        totais = [resultados.get() for _ in processos]
+        for processo in processos:
+            processo.join()
+        return sum(escritas for escritas, _ in totais), sum(bloqueios for _, bloqueios in totais)
@@ -0,0 +1,140 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from kogui_calculator.backends.sqlite_wal.base import PRAGMAS_PADRAO, aplicar_pragmas
+
+# Configuração anterior: journal de rollback, transações adiadas e uma conexão
+# nova por requisição. O timeout de 5 s é o padrão do módulo sqlite3.
+PERFIS = {
+    'padrão': {'pragmas': {}, 'begin': 'BEGIN', 'persistente': False},
+    'wal': {'pragmas': PRAGMAS_PADRAO, 'begin': 'BEGIN IMMEDIATE', 'persistente': True},
+}
+
+ESQUEMA = """
+CREATE TABLE operacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    usuario_id INTEGER NOT NULL,
+    operacao TEXT NOT NULL,
+    resultado TEXT NOT NULL,
+    data_inclusao REAL NOT NULL
+);
+CREATE INDEX operacoes_usuario_data ON operacoes (usuario_id, data_inclusao DESC);
+CREATE TABLE estatisticas (usuario_id INTEGER PRIMARY KEY, total INTEGER NOT NULL);
+"""
+
+USUARIOS = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a vazão de leituras do histórico e de cálculos gravados em paralelo no SQLite, '
+        'com a configuração padrão e com o perfil WAL do backend sqlite_wal.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escritores', type=int, default=4)
+        parser.add_argument('--leitores', type=int, default=4)
+        parser.add_argument('--segundos', type=float, default=3.0)
+        parser.add_argument('--operacoes', type=int, default=20000, help='Operações já existentes.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"perfil":>8} {"escritas/s":>11} {"leituras/s":>11} {"bloqueios":>10}'
+        )
+        for nome, perfil in PERFIS.items():
+            with tempfile.TemporaryDirectory() as pasta:
+                caminho = os.path.join(pasta, 'benchmark.sqlite3')
+                self._preparar(caminho, options['operacoes'])
+                escritas, leituras, bloqueios = self._medir(caminho, perfil, options)
+
+            segundos = options['segundos']
+            self.stdout.write(
+                f'{nome:>8} {escritas / segundos:>11.0f} {leituras / segundos:>11.0f} {bloqueios:>10}'
+            )
+
+    def _preparar(self, caminho, quantidade):
+        conexao = sqlite3.connect(caminho)
+        conexao.executescript(ESQUEMA)
+        agora = time.time()
+        conexao.executemany(
+            'INSERT INTO operacoes (usuario_id, operacao, resultado, data_inclusao) VALUES (?, ?, ?, ?)',
+            ((i % USUARIOS, f'{i} + {i}', str(2 * i), agora - i) for i in range(quantidade))
+        )
+        conexao.executemany(
+            'INSERT INTO estatisticas (usuario_id, total) VALUES (?, ?)',
+            ((usuario, quantidade // USUARIOS) for usuario in range(USUARIOS))
+        )
+        conexao.commit()
+        conexao.close()
+
+    def _conectar(self, caminho, perfil):
+        conexao = sqlite3.connect(caminho, isolation_level=None, check_same_thread=False)
+        aplicar_pragmas(conexao, perfil['pragmas'])
+        return conexao
+
+    def _medir(self, caminho, perfil, options):
+        fim = time.monotonic() + options['segundos']
+        contadores = {'escritas': 0, 'leituras': 0, 'bloqueios': 0}
+        lock = threading.Lock()
+
+        def somar(chave):
+            with lock:
+                contadores[chave] += 1
+
+        def executar(tarefa, indice):
+            conexao = self._conectar(caminho, perfil) if perfil['persistente'] else None
+            i = 0
+            while time.monotonic() < fim:
+                i += 1
+                atual = conexao or self._conectar(caminho, perfil)
+                try:
+                    tarefa(atual, (indice + i) % USUARIOS, i)
+                except sqlite3.OperationalError:
+                    # "database is locked": a requisição falharia com erro 500.
+                    if atual.in_transaction:
+                        atual.execute('ROLLBACK')
+                    somar('bloqueios')
+                finally:
+                    if conexao is None:
+                        atual.close()
+            if conexao is not None:
+                conexao.close()
+
+        def escrever(conexao, usuario, i):
+            # Mesmo padrão do cálculo: lê e atualiza as estatísticas na transação do INSERT.
+            conexao.execute(perfil['begin'])
+            conexao.execute('SELECT total FROM estatisticas WHERE usuario_id = ?', (usuario,)).fetchone()
+            conexao.execute(
+                'INSERT INTO operacoes (usuario_id, operacao, resultado, data_inclusao) VALUES (?, ?, ?, ?)',
+                (usuario, f'{i} * 2', str(i * 2), time.time())
+            )
+            conexao.execute('UPDATE estatisticas SET total = total + 1 WHERE usuario_id = ?', (usuario,))
+            conexao.execute('COMMIT')
+            somar('escritas')
+
+        def ler(conexao, usuario, i):
+            conexao.execute(
+                'SELECT id, operacao, resultado, data_inclusao FROM operacoes '
+                'WHERE usuario_id = ? ORDER BY data_inclusao DESC LIMIT 20',
+                (usuario,)
+            ).fetchall()
+            somar('leituras')
+
+        threads = [
+            threading.Thread(target=executar, args=(escrever, indice))
+            for indice in range(options['escritores'])
+        ] + [
+            threading.Thread(target=executar, args=(ler, indice))
+            for indice in range(options['leitores'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return contadores['escritas'], contadores['leituras'], contadores['bloqueios']
@@ -0,0 +1,59 @@
+import gzip
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculadora import importacao
+from calculadora.models import Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa operações históricas de um arquivo NDJSON ou CSV (opcionalmente .gz) '
+        'para o histórico de um usuário.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help='Caminho do arquivo a importar.')
+        parser.add_argument('--usuario', required=True, help='Email do usuário dono das operações.')
+        parser.add_argument('--formato', choices=importacao.FORMATOS, help='Padrão: deduzido da extensão.')
+        parser.add_argument('--lote', type=int, default=importacao.TAMANHO_LOTE)
+        parser.add_argument(
+            '--rejeitados',
+            help='Arquivo NDJSON onde as linhas rejeitadas são gravadas (padrão: <arquivo>.rejeitados.ndjson).'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            usuario = Usuario.objects.get(email=options['usuario'])
+        except Usuario.DoesNotExist:
+            raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+
+        caminho = options['arquivo']
+        nome = caminho[:-3] if caminho.endswith('.gz') else caminho
+        formato = options['formato'] or ('csv' if nome.endswith('.csv') else 'ndjson')
+        caminho_rejeitados = options['rejeitados'] or f'{nome}.rejeitados.ndjson'
+        abrir = gzip.open if caminho.endswith('.gz') else open
+
+        with abrir(caminho, 'rt', encoding='utf-8', newline='') as entrada, \
+                open(caminho_rejeitados, 'w', encoding='utf-8') as saida_rejeitados:
+
+            def rejeitar(numero, bruto, motivo):
+                saida_rejeitados.write(json.dumps(
+                    {'linha': numero, 'motivo': motivo, 'conteudo': bruto},
+                    ensure_ascii=False
+                ) + '\n')
+
+            resultado = importacao.importar(
+                usuario,
+                importacao.ler(formato, entrada),
+                rejeitar,
+                tamanho_lote=options['lote']
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{resultado.importadas} operações importadas, {resultado.rejeitadas} rejeitadas '
+            f'em {resultado.duracao:.1f}s ({resultado.linhas_por_segundo} linhas/s).'
+        ))
+        if resultado.rejeitadas:
+            self.stdout.write(f'Linhas rejeitadas gravadas em {caminho_rejeitados}.')
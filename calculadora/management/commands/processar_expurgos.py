@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from calculadora import expurgo
+from calculadora.models import TarefaExpurgo
+
+
+class Command(BaseCommand):
+    help = 'Executa tarefas de expurgo pendentes ou interrompidas (por exemplo, após reiniciar o servidor).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incluir-falhas', action='store_true', help='Tenta novamente as tarefas que falharam.'
+        )
+
+    def handle(self, *args, **options):
+        status = ['pendente', 'executando']
+        if options['incluir_falhas']:
+            status.append('falhou')
+
+        inicio = time.perf_counter()
+        concluidas = 0
+        removidas = 0
+        tarefas = TarefaExpurgo.objects.filter(status__in=status).order_by('data_criacao')
+        for tarefa_id in list(tarefas.values_list('pk', flat=True)):
+            tarefa = expurgo.executar(tarefa_id)
+            removidas += tarefa.removidas
+            if tarefa.status == 'concluida':
+                concluidas += 1
+            else:
+                self.stderr.write(f'Tarefa {tarefa.pk} falhou: {tarefa.erro}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{concluidas} tarefas concluídas, {removidas} operações removidas '
+            f'em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,132 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import F
+
+from calculadora import estatisticas, shards
+from calculadora.backends import cache_usuarios
+from calculadora.models import ContagemPeriodo, EstatisticasUsuario, Operacao, TarefaExpurgo, Usuario
+
+TAMANHO_LOTE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        'Move o histórico dos usuários que estão fora do shard calculado pela lista atual de '
+        'CALCULADORA_SHARDS. Rode logo após mudar a lista, antes de liberar os workers. Os ids '
+        'das operações movidas mudam (o uuid é preservado): a geração de ids do usuário é '
+        'incrementada e os clientes de /api/operacoes/delta/ que enviam "geracao" recebem '
+        '"ressincronizar" e baixam o histórico de novo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--origens', nargs='+', default=[],
+            help='Aliases que saíram de CALCULADORA_SHARDS e devem ser esvaziados.'
+        )
+        parser.add_argument(
+            '--verificar', action='store_true', help='Apenas relata quantos usuários seriam movidos.'
+        )
+
+    def handle(self, *args, **options):
+        for alias in options['origens']:
+            if alias not in connections.settings:
+                raise CommandError(f'Banco {alias} não está em DATABASES.')
+
+        inicio = time.perf_counter()
+        usuarios_movidos = 0
+        operacoes_movidas = 0
+        for origem in dict.fromkeys(shards.shards() + options['origens']):
+            for usuario_id in sorted(self._usuarios(origem)):
+                destino = shards.banco_do_usuario(usuario_id)
+                if destino == origem:
+                    continue
+                usuarios_movidos += 1
+                if options['verificar']:
+                    self.stdout.write(f'Usuário {usuario_id}: {origem} -> {destino}')
+                    continue
+                operacoes_movidas += self._mover(usuario_id, origem, destino)
+
+        acao = 'a mover' if options['verificar'] else 'movidos'
+        self.stdout.write(self.style.SUCCESS(
+            f'{usuarios_movidos} usuários {acao}, {operacoes_movidas} operações copiadas '
+            f'em {time.perf_counter() - inicio:.1f}s.'
+        ))
+
+    def _usuarios(self, banco):
+        ids = set(Operacao.objects.using(banco).values_list('usuario_id', flat=True).distinct())
+        ids.update(EstatisticasUsuario.objects.using(banco).values_list('usuario_id', flat=True))
+        ids.update(ContagemPeriodo.objects.using(banco).values_list('usuario_id', flat=True).distinct())
+        return ids
+
+    def _mover(self, usuario_id, origem, destino):
+        usuario = Usuario.objects.filter(pk=usuario_id).only('id', 'operacoes_ocultas_ate').first()
+        copiadas = 0
+
+        with transaction.atomic(using=destino), transaction.atomic(using=origem):
+            if usuario is not None:
+                # Só as operações visíveis; as ocultas aguardavam expurgo de qualquer forma.
+                visiveis = (
+                    Operacao.objects.using(origem)
+                    .filter(usuario_id=usuario_id, id__gt=usuario.operacoes_ocultas_ate)
+                    .order_by('id')
+                )
+                lote = []
+                for operacao in visiveis.iterator(chunk_size=TAMANHO_LOTE):
+                    lote.append(Operacao(
+                        usuario_id=usuario_id,
+                        operacao=operacao.operacao,
+                        resultado=operacao.resultado,
+                        tipo_operacao=operacao.tipo_operacao,
+                        data_inclusao=operacao.data_inclusao,
+                        uuid=operacao.uuid
+                    ))
+                    if len(lote) >= TAMANHO_LOTE:
+                        Operacao.objects.using(destino).bulk_create(lote)
+                        copiadas += len(lote)
+                        lote = []
+                if lote:
+                    Operacao.objects.using(destino).bulk_create(lote)
+                    copiadas += len(lote)
+
+                contadores = EstatisticasUsuario.objects.using(origem).filter(pk=usuario_id).first()
+                if contadores is not None:
+                    contadores.save(using=destino)
+
+                ContagemPeriodo.objects.using(destino).filter(usuario_id=usuario_id).delete()
+                ContagemPeriodo.objects.using(destino).bulk_create(
+                    [
+                        ContagemPeriodo(
+                            usuario_id=usuario_id,
+                            granularidade=contagem.granularidade,
+                            inicio=contagem.inicio,
+                            tipo_operacao=contagem.tipo_operacao,
+                            quantidade=contagem.quantidade
+                        )
+                        for contagem in ContagemPeriodo.objects.using(origem).filter(usuario_id=usuario_id)
+                    ],
+                    batch_size=TAMANHO_LOTE
+                )
+
+            Operacao.objects.using(origem).filter(usuario_id=usuario_id).delete()
+            EstatisticasUsuario.objects.using(origem).filter(pk=usuario_id).delete()
+            ContagemPeriodo.objects.using(origem).filter(usuario_id=usuario_id).delete()
+
+        # Os ids mudaram: as listagens guardadas pelos clientes (ETag) deixam de valer.
+        estatisticas.marcar_alteracao(usuario_id)
+
+        if usuario is not None:
+            # Os ids no destino são novos: o corte de operações ocultas, os
+            # expurgos pendentes e os cursores do delta, que se referiam aos ids
+            # da origem, deixam de valer.
+            Usuario.objects.filter(pk=usuario_id).update(
+                operacoes_ocultas_ate=0, geracao_ids=F('geracao_ids') + 1
+            )
+            cache_usuarios.invalidar(usuario_id)
+            TarefaExpurgo.objects.filter(
+                usuario_alvo=usuario_id, status__in=['pendente', 'executando']
+            ).update(limite_id=0)
+
+        self.stdout.write(f'Usuário {usuario_id}: {copiadas} operações de {origem} para {destino}.')
+        return copiadas
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from calculadora import contagens
+from calculadora.models import Usuario
+
+
+class Command(BaseCommand):
+    help = 'Preenche (ou refaz) as contagens por hora e por dia a partir das operações, incluindo as arquivadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Email do usuário (padrão: todos os usuários).')
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.order_by('pk')
+        if options['usuario']:
+            usuarios = usuarios.filter(email=options['usuario'])
+            if not usuarios.exists():
+                raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+
+        inicio = time.perf_counter()
+        total_usuarios = 0
+        total_periodos = 0
+        for usuario_id in usuarios.values_list('pk', flat=True).iterator():
+            total_periodos += contagens.reconstruir(usuario_id)
+            total_usuarios += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_periodos} contagens geradas para {total_usuarios} usuários '
+            f'em {time.perf_counter() - inicio:.1f}s.'
+        ))
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from calculadora import estatisticas, shards
+from calculadora.models import EstatisticasUsuario, Usuario
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula as estatísticas incrementais a partir da tabela de operações, '
+        'corrigindo contadores que divergiram.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Email do usuário (padrão: todos os usuários).')
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Apenas relata as divergências, sem gravar.'
+        )
+
+    def handle(self, *args, **options):
+        usuarios = Usuario.objects.order_by('pk')
+        if options['usuario']:
+            usuarios = usuarios.filter(email=options['usuario'])
+            if not usuarios.exists():
+                raise CommandError(f'Usuário {options["usuario"]} não encontrado.')
+
+        campos = ['total_operacoes', 'contagens_diarias', *EstatisticasUsuario.CAMPOS_POR_TIPO.values()]
+        divergentes = 0
+        total = 0
+
+        for usuario_id in usuarios.values_list('pk', flat=True).iterator():
+            total += 1
+            esperado = estatisticas.calcular(usuario_id)
+            atual = (
+                EstatisticasUsuario.objects.using(shards.banco_do_usuario(usuario_id))
+                .filter(pk=usuario_id).values(*campos).first()
+            )
+
+            hoje = timezone.localdate()
+            if atual is not None and estatisticas.na_janela(atual, hoje) == estatisticas.na_janela(esperado, hoje):
+                continue
+
+            divergentes += 1
+            self.stdout.write(f'Usuário {usuario_id}: {atual} -> {esperado}')
+            if not options['verificar']:
+                estatisticas.reconstruir(usuario_id)
+
+        acao = 'encontradas' if options['verificar'] else 'corrigidas'
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} usuários verificados, {divergentes} divergências {acao}.'
+        ))
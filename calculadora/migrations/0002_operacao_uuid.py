@@ -0,0 +1,32 @@
+import uuid
+
+from django.db import migrations, models
+
+
+def gerar_uuids(apps, schema_editor):
+    Operacao = apps.get_model('calculadora', 'Operacao')
+    operacoes = list(Operacao.objects.filter(uuid__isnull=True).only('id'))
+    for operacao in operacoes:
+        operacao.uuid = uuid.uuid4()
+    Operacao.objects.bulk_update(operacoes, ['uuid'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operacao',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True, verbose_name='Identificador público'),
+        ),
+        migrations.RunPython(gerar_uuids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='operacao',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Identificador público'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0002_operacao_uuid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticasUsuario',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='estatisticas', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('total_operacoes', models.PositiveBigIntegerField(default=0, verbose_name='Total de operações')),
+                ('total_soma', models.PositiveBigIntegerField(default=0, verbose_name='Somas')),
+                ('total_subtracao', models.PositiveBigIntegerField(default=0, verbose_name='Subtrações')),
+                ('total_multiplicacao', models.PositiveBigIntegerField(default=0, verbose_name='Multiplicações')),
+                ('total_divisao', models.PositiveBigIntegerField(default=0, verbose_name='Divisões')),
+                ('total_mista', models.PositiveBigIntegerField(default=0, verbose_name='Operações mistas')),
+                ('contagens_diarias', models.JSONField(default=dict, help_text='Contagem por data local (AAAA-MM-DD) dos últimos dias.', verbose_name='Operações por dia')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última atualização')),
+            ],
+            options={
+                'verbose_name': 'Estatísticas do usuário',
+                'verbose_name_plural': 'Estatísticas dos usuários',
+                'db_table': 'estatisticas_usuarios',
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0003_estatisticasusuario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularidade', models.CharField(choices=[('hora', 'Hora'), ('dia', 'Dia')], max_length=4, verbose_name='Granularidade')),
+                ('inicio', models.DateTimeField(verbose_name='Início do período')),
+                ('tipo_operacao', models.CharField(choices=[('+', 'Soma'), ('-', 'Subtração'), ('*', 'Multiplicação'), ('/', 'Divisão'), ('mixed', 'Operação Mista')], max_length=10, verbose_name='Tipo de operação')),
+                ('quantidade', models.PositiveBigIntegerField(default=0, verbose_name='Quantidade')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contagens_periodo', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Contagem por período',
+                'verbose_name_plural': 'Contagens por período',
+                'db_table': 'contagens_periodo',
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'granularidade', 'inicio', 'tipo_operacao'), name='contagem_periodo_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:41
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0004_contagemperiodo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='operacoes_ocultas_ate',
+            field=models.BigIntegerField(default=0, help_text='Operações com id menor ou igual a este valor aguardam remoção e não são exibidas.', verbose_name='Operações ocultas até o id'),
+        ),
+        migrations.CreateModel(
+            name='TarefaExpurgo',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('usuario_alvo', models.BigIntegerField(verbose_name='Id do usuário')),
+                ('tipo', models.CharField(choices=[('historico', 'Limpeza de histórico'), ('conta', 'Exclusão de conta')], max_length=10, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('falhou', 'Falhou')], default='pendente', max_length=10, verbose_name='Status')),
+                ('limite_id', models.BigIntegerField(verbose_name='Remover operações até o id')),
+                ('total_estimado', models.PositiveBigIntegerField(default=0, verbose_name='Total estimado')),
+                ('removidas', models.PositiveBigIntegerField(default=0, verbose_name='Operações removidas')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de criação')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última atualização')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Data de conclusão')),
+                ('usuario', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tarefas_expurgo', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de expurgo',
+                'verbose_name_plural': 'Tarefas de expurgo',
+                'db_table': 'tarefas_expurgo',
+                'ordering': ['-data_criacao'],
+            },
+        ),
+    ]
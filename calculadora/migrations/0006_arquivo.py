@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0005_expurgo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='dias_retencao',
+            field=models.PositiveIntegerField(blank=True, help_text='Idade em dias a partir da qual as operações são arquivadas. Vazio usa o padrão do nível.', null=True, verbose_name='Dias de retenção'),
+        ),
+        migrations.CreateModel(
+            name='SegmentoArquivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês')),
+                ('quantidade', models.PositiveIntegerField(default=0, verbose_name='Operações arquivadas')),
+                ('por_tipo', models.JSONField(default=dict, verbose_name='Operações por tipo')),
+                ('tamanho_bytes', models.PositiveBigIntegerField(default=0, verbose_name='Tamanho em bytes')),
+                ('primeira_data', models.DateTimeField(null=True, verbose_name='Operação mais antiga')),
+                ('ultima_data', models.DateTimeField(null=True, verbose_name='Operação mais recente')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última atualização')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segmentos_arquivo', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'verbose_name': 'Segmento de arquivo',
+                'verbose_name_plural': 'Segmentos de arquivo',
+                'db_table': 'segmentos_arquivo',
+                'ordering': ['-mes'],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'mes'), name='segmento_arquivo_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0007_shards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='versao_token',
+            field=models.PositiveIntegerField(default=0, help_text='Incrementada para revogar todos os tokens de acesso já emitidos.', verbose_name='Versão dos tokens'),
+        ),
+    ]
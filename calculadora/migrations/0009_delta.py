@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0008_usuario_versao_token'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='historico_limpo_em',
+            field=models.DateTimeField(blank=True, help_text='Momento da última limpeza do histórico (tombstone de operacoes_ocultas_ate).', null=True, verbose_name='Histórico limpo em'),
+        ),
+        migrations.AddIndex(
+            model_name='operacao',
+            index=models.Index(fields=['usuario', 'id'], name='operacoes_usuario_76075b_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0009_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estatisticasusuario',
+            name='versao_historico',
+            field=models.PositiveBigIntegerField(default=0, help_text='Incrementada a cada inserção, limpeza ou remoção de operações (ETag das listagens).', verbose_name='Versão do histórico'),
+        ),
+    ]
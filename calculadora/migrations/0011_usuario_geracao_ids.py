@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculadora', '0010_versao_historico'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='geracao_ids',
+            field=models.PositiveIntegerField(default=0, help_text='Incrementada quando os ids das operações mudam (rebalanceamento de shards).', verbose_name='Geração dos ids'),
+        ),
+    ]
@@ -1,7 +1,11 @@
+import uuid
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from . import shards
+
 
 class Usuario(AbstractUser):
     """Modelo customizado de usuário para a calculadora."""
@@ -9,6 +13,33 @@ class Usuario(AbstractUser):
     email = models.EmailField(unique=True, verbose_name="Email")
     data_cadastro = models.DateTimeField(auto_now_add=True, verbose_name="Data de cadastro")
     data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última atualização")
+    operacoes_ocultas_ate = models.BigIntegerField(
+        default=0,
+        verbose_name="Operações ocultas até o id",
+        help_text="Operações com id menor ou igual a este valor aguardam remoção e não são exibidas."
+    )
+    dias_retencao = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name="Dias de retenção",
+        help_text="Idade em dias a partir da qual as operações são arquivadas. Vazio usa o padrão do nível."
+    )
+    versao_token = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Versão dos tokens",
+        help_text="Incrementada para revogar todos os tokens de acesso já emitidos."
+    )
+    historico_limpo_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Histórico limpo em",
+        help_text="Momento da última limpeza do histórico (tombstone de operacoes_ocultas_ate)."
+    )
+    geracao_ids = models.PositiveIntegerField(
+        default=0,
+        verbose_name="Geração dos ids",
+        help_text="Incrementada quando os ids das operações mudam (rebalanceamento de shards)."
+    )
     
 
     USERNAME_FIELD = 'email'
@@ -25,9 +56,51 @@ class Usuario(AbstractUser):
     def save(self, *args, **kwargs) -> None:
         if not self.username:
             self.username = self.email
+        if self._password is not None and not self._state.adding:
+            # Trocar a senha revoga os tokens emitidos com a senha anterior.
+            self.versao_token += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'versao_token'}
         super().save(*args, **kwargs)
 
 
+class OperacaoQuerySet(models.QuerySet):
+    """QuerySet com operações em lote para o modelo Operacao."""
+    
+    def do_usuario(self, usuario: 'Usuario') -> 'OperacaoQuerySet':
+        """Operações visíveis do usuário, lidas do seu shard (exclui as que aguardam expurgo)."""
+        return self.using(shards.banco_leitura(usuario.pk)).filter(
+            usuario_id=usuario.pk, id__gt=usuario.operacoes_ocultas_ate
+        )
+    
+    def do_shard(self, usuario_id: int) -> 'OperacaoQuerySet':
+        """Todas as operações do usuário no banco primário do seu shard, para escrita."""
+        return self.using(shards.banco_do_usuario(usuario_id)).filter(usuario_id=usuario_id)
+    
+    def criar_em_lote(self, operacoes: list, batch_size: int = None) -> list:
+        """
+        Insere várias operações com um bulk_create por shard.
+        
+        O bulk_create não chama save(), então o tipo de operação é definido
+        aqui antes da inserção e o sinal operacoes_criadas é enviado dentro da
+        mesma transação.
+        """
+        from .signals import enviar_operacoes_criadas
+        
+        por_banco = {}
+        for operacao in operacoes:
+            operacao.definir_tipo_operacao()
+            banco = self._db or shards.banco_do_usuario(operacao.usuario_id)
+            por_banco.setdefault(banco, []).append(operacao)
+        
+        criadas = []
+        for banco, do_banco in por_banco.items():
+            with transaction.atomic(using=banco):
+                criadas.extend(self.using(banco).bulk_create(do_banco, batch_size=batch_size))
+                enviar_operacoes_criadas(do_banco)
+        return criadas
+
+
 class Operacao(models.Model):
     """Modelo para armazenar operações matemáticas dos usuários."""
     TIPOS_OPERACAO = [
@@ -38,10 +111,12 @@ class Operacao(models.Model):
         ('mixed', 'Operação Mista'),
     ]
     
+    # Sem constraint no banco: com sharding a tabela de usuários fica só no primário.
     usuario = models.ForeignKey(
         Usuario, 
         on_delete=models.CASCADE, 
         related_name='operacoes',
+        db_constraint=False,
         verbose_name="Usuário"
     )
     operacao = models.TextField(verbose_name="Expressão matemática")
@@ -56,6 +131,14 @@ class Operacao(models.Model):
         default=timezone.now, 
         verbose_name="Data da operação"
     )
+    uuid = models.UUIDField(
+        default=uuid.uuid4,
+        unique=True,
+        editable=False,
+        verbose_name="Identificador público"
+    )
+    
+    objects = OperacaoQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Operação"
@@ -64,6 +147,8 @@ class Operacao(models.Model):
         ordering = ['-data_inclusao']
         indexes = [
             models.Index(fields=['usuario', '-data_inclusao']),
+            # Sincronização incremental: operações do usuário depois de um id.
+            models.Index(fields=['usuario', 'id']),
             models.Index(fields=['tipo_operacao']),
         ]
     
@@ -71,13 +156,22 @@ class Operacao(models.Model):
         return f"{self.operacao} = {self.resultado} ({self.usuario.nome})"
     
     def save(self, *args, **kwargs) -> None:
+        self.definir_tipo_operacao()
+        super().save(*args, **kwargs)
+    
+    def definir_tipo_operacao(self) -> None:
+        """Preenche tipo_operacao a partir da expressão, se ainda não definido."""
         if not self.tipo_operacao or self.tipo_operacao == 'mixed':
             self.tipo_operacao = self._detectar_tipo_operacao()
-        super().save(*args, **kwargs)
     
     def _detectar_tipo_operacao(self) -> str:
         """Detecta o tipo de operação baseado na expressão matemática."""
-        operacao_limpa = self.operacao.replace(' ', '')
+        return self.detectar_tipo_operacao(self.operacao)
+    
+    @staticmethod
+    def detectar_tipo_operacao(operacao: str) -> str:
+        """Detecta o tipo de operação de uma expressão matemática."""
+        operacao_limpa = operacao.replace(' ', '')
         
 
         operadores = {'+': 0, '-': 0, '*': 0, '/': 0}
@@ -92,3 +186,167 @@ class Operacao(models.Model):
             return operadores_usados[0]
         
         return 'mixed'
+
+
+class EstatisticasUsuario(models.Model):
+    """Contadores de operações por usuário, mantidos a cada inserção e limpeza."""
+    CAMPOS_POR_TIPO = {
+        '+': 'total_soma',
+        '-': 'total_subtracao',
+        '*': 'total_multiplicacao',
+        '/': 'total_divisao',
+        'mixed': 'total_mista',
+    }
+    
+    usuario = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='estatisticas',
+        db_constraint=False,
+        verbose_name="Usuário"
+    )
+    total_operacoes = models.PositiveBigIntegerField(default=0, verbose_name="Total de operações")
+    total_soma = models.PositiveBigIntegerField(default=0, verbose_name="Somas")
+    total_subtracao = models.PositiveBigIntegerField(default=0, verbose_name="Subtrações")
+    total_multiplicacao = models.PositiveBigIntegerField(default=0, verbose_name="Multiplicações")
+    total_divisao = models.PositiveBigIntegerField(default=0, verbose_name="Divisões")
+    total_mista = models.PositiveBigIntegerField(default=0, verbose_name="Operações mistas")
+    contagens_diarias = models.JSONField(
+        default=dict,
+        verbose_name="Operações por dia",
+        help_text="Contagem por data local (AAAA-MM-DD) dos últimos dias."
+    )
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última atualização")
+    versao_historico = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Versão do histórico",
+        help_text="Incrementada a cada inserção, limpeza ou remoção de operações (ETag das listagens)."
+    )
+    
+    class Meta:
+        verbose_name = "Estatísticas do usuário"
+        verbose_name_plural = "Estatísticas dos usuários"
+        db_table = "estatisticas_usuarios"
+    
+    def __str__(self) -> str:
+        return f"Estatísticas de {self.usuario_id}: {self.total_operacoes} operações"
+
+
+class ContagemPeriodo(models.Model):
+    """Quantidade de operações de um usuário por período (hora ou dia) e tipo."""
+    GRANULARIDADES = [
+        ('hora', 'Hora'),
+        ('dia', 'Dia'),
+    ]
+    
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='contagens_periodo',
+        db_constraint=False,
+        verbose_name="Usuário"
+    )
+    granularidade = models.CharField(max_length=4, choices=GRANULARIDADES, verbose_name="Granularidade")
+    inicio = models.DateTimeField(verbose_name="Início do período")
+    tipo_operacao = models.CharField(
+        max_length=10,
+        choices=Operacao.TIPOS_OPERACAO,
+        verbose_name="Tipo de operação"
+    )
+    quantidade = models.PositiveBigIntegerField(default=0, verbose_name="Quantidade")
+    
+    class Meta:
+        verbose_name = "Contagem por período"
+        verbose_name_plural = "Contagens por período"
+        db_table = "contagens_periodo"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['usuario', 'granularidade', 'inicio', 'tipo_operacao'],
+                name='contagem_periodo_unica'
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.usuario_id} {self.granularidade} {self.inicio}: {self.quantidade}"
+
+
+
+class TarefaExpurgo(models.Model):
+    """Remoção em segundo plano das operações de um usuário, em blocos pequenos."""
+    TIPOS = [
+        ('historico', 'Limpeza de histórico'),
+        ('conta', 'Exclusão de conta'),
+    ]
+    STATUS = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('falhou', 'Falhou'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='tarefas_expurgo',
+        verbose_name="Usuário"
+    )
+    usuario_alvo = models.BigIntegerField(verbose_name="Id do usuário")
+    tipo = models.CharField(max_length=10, choices=TIPOS, verbose_name="Tipo")
+    status = models.CharField(max_length=10, choices=STATUS, default='pendente', verbose_name="Status")
+    limite_id = models.BigIntegerField(verbose_name="Remover operações até o id")
+    total_estimado = models.PositiveBigIntegerField(default=0, verbose_name="Total estimado")
+    removidas = models.PositiveBigIntegerField(default=0, verbose_name="Operações removidas")
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de criação")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última atualização")
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name="Data de conclusão")
+    
+    class Meta:
+        verbose_name = "Tarefa de expurgo"
+        verbose_name_plural = "Tarefas de expurgo"
+        db_table = "tarefas_expurgo"
+        ordering = ['-data_criacao']
+    
+    def __str__(self) -> str:
+        return f"{self.get_tipo_display()} de {self.usuario_alvo} ({self.status})"
+    
+    @property
+    def progresso(self) -> float:
+        if self.status == 'concluida':
+            return 100.0
+        if not self.total_estimado:
+            return 0.0
+        return round(min(self.removidas / self.total_estimado, 1) * 100, 1)
+
+
+
+class SegmentoArquivo(models.Model):
+    """Índice de um arquivo de operações arquivadas (um por usuário e mês)."""
+    usuario = models.ForeignKey(
+        Usuario,
+        on_delete=models.CASCADE,
+        related_name='segmentos_arquivo',
+        verbose_name="Usuário"
+    )
+    mes = models.DateField(verbose_name="Mês")
+    quantidade = models.PositiveIntegerField(default=0, verbose_name="Operações arquivadas")
+    por_tipo = models.JSONField(default=dict, verbose_name="Operações por tipo")
+    tamanho_bytes = models.PositiveBigIntegerField(default=0, verbose_name="Tamanho em bytes")
+    primeira_data = models.DateTimeField(null=True, verbose_name="Operação mais antiga")
+    ultima_data = models.DateTimeField(null=True, verbose_name="Operação mais recente")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última atualização")
+    
+    class Meta:
+        verbose_name = "Segmento de arquivo"
+        verbose_name_plural = "Segmentos de arquivo"
+        db_table = "segmentos_arquivo"
+        ordering = ['-mes']
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'mes'], name='segmento_arquivo_unico'),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.usuario_id} {self.mes:%Y-%m}: {self.quantidade}"
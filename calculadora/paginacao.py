@@ -0,0 +1,80 @@
+"""
+Paginação do histórico de operações.
+
+A interface web continua usando paginação por número de página. Clientes de
+API com históricos grandes podem usar ``?paginacao=cursor``: a paginação por
+cursor busca a página diretamente pelo índice ``(usuario, -data_inclusao)``,
+sem ``COUNT(*)`` nem ``OFFSET``, e não pula nem repete linhas quando novas
+operações são inseridas durante a navegação.
+"""
+from collections import OrderedDict
+
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+VALORES_FALSOS = ('0', 'false', 'nao', 'não')
+
+
+class OperacoesCursorPagination(CursorPagination):
+    """Paginação por cursor sobre (data_inclusao, id), do mais recente ao mais antigo."""
+    ordering = ('-data_inclusao', '-id')
+    page_size = 20
+    page_size_query_param = 'tamanho'
+    max_page_size = 100
+
+
+class OperacoesPageNumberPagination(PageNumberPagination):
+    """Paginação por número de página com contagem total opcional (``?contar=false``)."""
+    page_size = 20
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.sem_contagem = request.query_params.get('contar', '').lower() in VALORES_FALSOS
+        if not self.sem_contagem:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        try:
+            self.numero_pagina = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except (TypeError, ValueError):
+            self.numero_pagina = 1
+
+        inicio = (self.numero_pagina - 1) * self.page_size
+        # Uma linha a mais indica se existe próxima página sem precisar contar.
+        linhas = list(queryset[inicio:inicio + self.page_size + 1])
+        self.tem_proxima = len(linhas) > self.page_size
+        return linhas[:self.page_size]
+
+    def get_paginated_response(self, data):
+        if not self.sem_contagem:
+            return super().get_paginated_response(data)
+
+        return Response(OrderedDict([
+            ('next', self._link_sem_contagem(self.numero_pagina + 1) if self.tem_proxima else None),
+            ('previous', self._link_sem_contagem(self.numero_pagina - 1) if self.numero_pagina > 1 else None),
+            ('results', data),
+        ]))
+
+    def _link_sem_contagem(self, numero: int) -> str:
+        url = self.request.build_absolute_uri()
+        if numero == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, numero)
+
+
+class OperacoesPagination(BasePagination):
+    """Escolhe a paginação por cursor (``?paginacao=cursor``) ou por número de página."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        usar_cursor = (
+            request.query_params.get('paginacao') == 'cursor'
+            or OperacoesCursorPagination.cursor_query_param in request.query_params
+        )
+        self.delegada = OperacoesCursorPagination() if usar_cursor else OperacoesPageNumberPagination()
+        return self.delegada.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.delegada.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return OperacoesPageNumberPagination().get_paginated_response_schema(schema)
@@ -0,0 +1,287 @@
+"""
+Persistência de operações com escrita adiada (write-behind).
+
+Com ``CALCULADORA_ESCRITA_ASSINCRONA = True`` os cálculos não fazem mais um
+INSERT síncrono: a operação é colocada em uma fila limitada do processo e uma
+thread de gravação a persiste com ``bulk_create`` quando o lote enche ou o
+intervalo configurado expira. O ``uuid`` da operação é gerado na aplicação,
+então a resposta já tem um identificador estável antes da gravação.
+
+Um lote que falha ``TENTATIVAS`` vezes não é descartado: o cliente já recebeu
+200 por essas operações. Ele fica pendente e a thread insiste nele antes de
+retirar qualquer outra operação da fila; com o banco fora do ar a fila enche
+e as requisições novas recebem 503 (``FilaCheia``) em vez de uma confirmação
+que se perderia. Só o que continuar pendente quando o processo terminar é
+perdido, e cada operação vai para o log de erro.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import shards
+from .models import Operacao
+
+logger = logging.getLogger(__name__)
+
+CONFIGURACAO_PADRAO = {
+    'TAMANHO_MAXIMO': 10000,
+    'TAMANHO_LOTE': 500,
+    'INTERVALO': 0.5,
+    'TIMEOUT': 2.0,
+    'TENTATIVAS': 3,
+}
+
+
+class FilaCheia(Exception):
+    """A fila de escrita continuou cheia durante todo o tempo de espera."""
+
+
+class FilaEscrita:
+    """Fila limitada de operações gravadas em lote por uma thread dedicada."""
+
+    def __init__(self, **configuracao) -> None:
+        self._configuracao = configuracao
+        self._lock = threading.Lock()
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        self._parando = threading.Event()
+        self._pendentes = deque()
+        self.gravadas = 0
+        self.lotes = 0
+        self.rejeitadas = 0
+
+    def config(self, chave: str):
+        if chave in self._configuracao:
+            return self._configuracao[chave]
+        personalizada = getattr(settings, 'CALCULADORA_FILA_ESCRITA', {})
+        return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+    @property
+    def fila(self) -> queue.Queue:
+        # A fila é recriada em processos filhos após um fork, já que a thread
+        # de gravação do processo pai não existe no filho.
+        if self._fila is None or self._pid != os.getpid():
+            with self._lock:
+                if self._fila is None or self._pid != os.getpid():
+                    self._fila = queue.Queue(maxsize=self.config('TAMANHO_MAXIMO'))
+                    self._pendentes.clear()
+                    self._thread = None
+                    self._pid = os.getpid()
+        return self._fila
+
+    def enfileirar(self, operacao: Operacao) -> None:
+        """
+        Coloca a operação na fila de gravação.
+
+        Se a fila estiver cheia, aguarda até ``TIMEOUT`` segundos (pressão de
+        retorno sobre a requisição) e então levanta ``FilaCheia``.
+        """
+        operacao.definir_tipo_operacao()
+        try:
+            self.fila.put(operacao, timeout=self.config('TIMEOUT'))
+        except queue.Full:
+            with self._lock:
+                self.rejeitadas += 1
+            raise FilaCheia('A fila de gravação está cheia. Tente novamente em instantes.')
+        self._garantir_thread()
+
+    def _garantir_thread(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._parando.clear()
+                self._thread = threading.Thread(
+                    target=self._executar, name='calculadora-fila-escrita', daemon=True
+                )
+                self._thread.start()
+
+    def _coletar_lote(self, bloquear: bool) -> List[Operacao]:
+        """Retira da fila até ``TAMANHO_LOTE`` operações."""
+        tamanho_lote = self.config('TAMANHO_LOTE')
+        lote = []
+        limite = time.monotonic() + self.config('INTERVALO')
+
+        while len(lote) < tamanho_lote:
+            restante = limite - time.monotonic()
+            try:
+                if bloquear and restante > 0:
+                    lote.append(self.fila.get(timeout=restante))
+                else:
+                    lote.append(self.fila.get_nowait())
+            except queue.Empty:
+                break
+
+        return lote
+
+    def _nao_gravadas(self, lote: List[Operacao]) -> List[Operacao]:
+        """
+        Operações do lote que ainda não estão no banco.
+
+        Com vários shards uma tentativa pode ter gravado parte do lote; o
+        ``uuid`` (único) diz o que já entrou.
+        """
+        por_banco = {}
+        for operacao in lote:
+            por_banco.setdefault(shards.banco_do_usuario(operacao.usuario_id), []).append(operacao.uuid)
+
+        existentes = set()
+        for banco, uuids in por_banco.items():
+            existentes.update(Operacao.objects.using(banco).filter(uuid__in=uuids).values_list('uuid', flat=True))
+
+        restantes = [operacao for operacao in lote if operacao.uuid not in existentes]
+        for operacao in restantes:
+            # O bulk_create revertido pode ter preenchido o id.
+            operacao.pk = None
+            operacao._state.adding = True
+        return restantes
+
+    def _gravar(self, lote: List[Operacao], repetido: bool = False) -> bool:
+        """Tenta gravar o lote até ``TENTATIVAS`` vezes; retorna se conseguiu."""
+        total = len(lote)
+        for tentativa in range(1, self.config('TENTATIVAS') + 1):
+            try:
+                close_old_connections()
+                if repetido or tentativa > 1:
+                    lote = self._nao_gravadas(lote)
+                Operacao.objects.criar_em_lote(lote)
+                break
+            except Exception:
+                logger.exception(
+                    'Falha ao gravar lote de %d operações (tentativa %d).', len(lote), tentativa
+                )
+                time.sleep(self.config('INTERVALO'))
+        else:
+            return False
+
+        with self._lock:
+            self.gravadas += total
+            self.lotes += 1
+        return True
+
+    def _gravar_ou_guardar(self, lote: List[Operacao]) -> bool:
+        if self._gravar(lote):
+            return True
+        logger.error('Lote de %d operações mantido para nova tentativa.', len(lote))
+        with self._lock:
+            self._pendentes.append(lote)
+        return False
+
+    def _regravar_pendentes(self) -> bool:
+        """Grava os lotes pendentes em ordem; para no primeiro que falhar."""
+        while True:
+            with self._lock:
+                if not self._pendentes:
+                    return True
+                lote = self._pendentes[0]
+            if not self._gravar(lote, repetido=True):
+                return False
+            with self._lock:
+                self._pendentes.popleft()
+
+    def _executar(self) -> None:
+        while not self._parando.is_set():
+            # Nada novo sai da fila enquanto houver lote pendente (ver docstring do módulo).
+            if self._pendentes and not self._regravar_pendentes():
+                continue
+            lote = self._coletar_lote(bloquear=True)
+            if lote:
+                self._gravar_ou_guardar(lote)
+
+    def descarregar(self) -> int:
+        """
+        Grava imediatamente os pendentes e tudo o que está na fila.
+
+        Retorna a quantidade gravada; para no primeiro lote que falhar.
+        """
+        antes = self.gravadas
+        if not self._regravar_pendentes():
+            return self.gravadas - antes
+        while True:
+            lote = self._coletar_lote(bloquear=False)
+            if not lote or not self._gravar_ou_guardar(lote):
+                return self.gravadas - antes
+
+    def parar(self, timeout: Optional[float] = 5.0) -> None:
+        """Encerra a thread de gravação e descarrega o que restou na fila."""
+        self._parando.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        if self._fila is not None and self._pid == os.getpid():
+            self.descarregar()
+            for lote in self._pendentes:
+                for operacao in lote:
+                    logger.error(
+                        'Operação confirmada e não gravada: uuid=%s usuario=%s operacao=%r resultado=%r data=%s',
+                        operacao.uuid, operacao.usuario_id, operacao.operacao,
+                        operacao.resultado, operacao.data_inclusao.isoformat()
+                    )
+
+    def profundidade(self) -> int:
+        if self._fila is None or self._pid != os.getpid():
+            return 0
+        return self._fila.qsize()
+
+    def pendentes(self) -> int:
+        """Operações de lotes que falharam e aguardam nova tentativa."""
+        with self._lock:
+            return sum(len(lote) for lote in self._pendentes)
+
+    def metricas(self) -> dict:
+        with self._lock:
+            return {
+                'ativa': escrita_assincrona_ativa(),
+                'profundidade': self.profundidade(),
+                'pendentes': sum(len(lote) for lote in self._pendentes),
+                'capacidade': self.config('TAMANHO_MAXIMO'),
+                'gravadas': self.gravadas,
+                'lotes': self.lotes,
+                'rejeitadas': self.rejeitadas,
+            }
+
+
+fila_escrita = FilaEscrita()
+atexit.register(fila_escrita.parar)
+
+
+def escrita_assincrona_ativa() -> bool:
+    return getattr(settings, 'CALCULADORA_ESCRITA_ASSINCRONA', False)
+
+
+def salvar_operacao(usuario, operacao: str, resultado: str) -> Operacao:
+    """
+    Persiste o cálculo do usuário.
+
+    No modo síncrono a operação é inserida na hora. No modo de escrita adiada
+    ela é enfileirada e retornada sem ``id``; o ``uuid`` identifica a operação.
+    """
+    if not escrita_assincrona_ativa():
+        banco = shards.banco_do_usuario(usuario.pk)
+        with transaction.atomic(using=banco):
+            return Operacao.objects.using(banco).create(usuario=usuario, operacao=operacao, resultado=resultado)
+
+    nova = Operacao(usuario=usuario, operacao=operacao, resultado=resultado)
+    fila_escrita.enfileirar(nova)
+    return nova
+
+
+async def asalvar_operacao(usuario, operacao: str, resultado: str) -> Operacao:
+    """
+    Versão assíncrona de ``salvar_operacao``.
+
+    A inserção e os receptores de ``operacoes_criadas`` (estatísticas e
+    contagens) precisam da mesma transação, e o ORM assíncrono não abre
+    transações; por isso o caminho síncrono inteiro roda em uma thread.
+    """
+    return await sync_to_async(salvar_operacao)(usuario, operacao, resultado)
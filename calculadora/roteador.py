@@ -0,0 +1,140 @@
+"""
+Roteamento de leituras para a réplica do banco.
+
+As views somente leitura (histórico e estatísticas) usam ``LeituraReplicaMixin``,
+que liga o roteamento para a réplica durante a requisição. Todo o resto, e
+qualquer escrita, continua no banco primário.
+
+Para que o usuário sempre veja o próprio cálculo (read-your-writes), cada
+gravação de operações marca o usuário no cache por ``JANELA_ESCRITA``
+segundos; durante essa janela as leituras dele vão para o primário. Com mais
+de um processo, o cache configurado precisa ser compartilhado (ex: Redis).
+"""
+import contextvars
+import threading
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.dispatch import receiver
+
+from .signals import historico_limpo, operacoes_criadas
+
+CONFIGURACAO_PADRAO = {
+    'ALIAS': 'replica',
+    'JANELA_ESCRITA': 5,
+    'CACHE': 'default',
+}
+
+_ler_da_replica = contextvars.ContextVar('ler_da_replica', default=False)
+
+_lock = threading.Lock()
+_contadores = {'replica': 0, 'primario_apos_escrita': 0}
+
+
+def config(chave: str):
+    personalizada = getattr(settings, 'CALCULADORA_REPLICA', {})
+    return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+
+def replica_configurada() -> bool:
+    return config('ALIAS') in connections.settings
+
+
+def _chave_escrita(usuario_id: int) -> str:
+    return f'replica:escrita:{usuario_id}'
+
+
+def marcar_escrita(usuario_id: int) -> None:
+    """Mantém as leituras do usuário no primário durante a janela de escrita."""
+    caches[config('CACHE')].set(_chave_escrita(usuario_id), True, config('JANELA_ESCRITA'))
+
+
+def escreveu_recentemente(usuario_id: int) -> bool:
+    return caches[config('CACHE')].get(_chave_escrita(usuario_id), False)
+
+
+def ativar_replica(usuario) -> Optional[contextvars.Token]:
+    """Liga a leitura pela réplica no contexto atual, salvo se o usuário acabou de escrever."""
+    if not replica_configurada():
+        return None
+    if usuario.is_authenticated and escreveu_recentemente(usuario.pk):
+        with _lock:
+            _contadores['primario_apos_escrita'] += 1
+        return None
+    return _ler_da_replica.set(True)
+
+
+def desativar_replica(token: Optional[contextvars.Token]) -> None:
+    if token is not None:
+        _ler_da_replica.reset(token)
+
+
+def banco_leitura(alias: str) -> str:
+    """
+    Troca o primário pela réplica quando a view lê da réplica.
+
+    Usada pelas consultas que escolhem o banco com ``using()``, que não passam
+    pelo roteador.
+    """
+    if alias != DEFAULT_DB_ALIAS or not _ler_da_replica.get():
+        return alias
+    # Dentro de uma transação a leitura precisa ver o que ela mesma escreveu.
+    if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return alias
+    with _lock:
+        _contadores['replica'] += 1
+    return config('ALIAS')
+
+
+def metricas() -> dict:
+    with _lock:
+        return {'ativa': replica_configurada(), **_contadores}
+
+
+class RoteadorLeituraEscrita:
+    """Envia as leituras das views marcadas para a réplica e todas as escritas ao primário."""
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        banco = banco_leitura(DEFAULT_DB_ALIAS)
+        return None if banco == DEFAULT_DB_ALIAS else banco
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        # Réplica e primário têm os mesmos dados.
+        aliases = {DEFAULT_DB_ALIAS, config('ALIAS')}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name=None, **hints) -> Optional[bool]:
+        # A réplica recebe o esquema pela replicação.
+        if db == config('ALIAS'):
+            return False
+        return None
+
+
+class LeituraReplicaMixin:
+    """Mixin para APIViews somente leitura: as consultas da view vão para a réplica."""
+
+    def initial(self, request, *args, **kwargs) -> None:
+        super().initial(request, *args, **kwargs)
+        self._token_replica = ativar_replica(request.user)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        desativar_replica(getattr(self, '_token_replica', None))
+        self._token_replica = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+@receiver(operacoes_criadas)
+def _ao_criar_operacoes(sender, usuario_id: int, **kwargs) -> None:
+    marcar_escrita(usuario_id)
+
+
+@receiver(historico_limpo)
+def _ao_limpar_historico(sender, usuario_id: int, **kwargs) -> None:
+    marcar_escrita(usuario_id)
@@ -1,8 +1,26 @@
+import re
+from datetime import datetime, time, timedelta
+
 from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from . import avaliador
 from .models import Usuario, Operacao
 
+# Compiladas uma vez por processo, na importação; os validate_* rodam em todo
+# login, registro e cálculo.
+EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+NOME_REGEX = re.compile(r'^[a-zA-ZÀ-ÿ\s\'\-\.]+$')
+OPERACAO_REGEX = re.compile(r'^[0-9+\-*/().\s]+$')
+MODELO_REGEX = re.compile(r'^[0-9A-Za-z_+\-*/().\s]+$')
+DIGITO_REGEX = re.compile(r'\d')
+OPERADOR_REGEX = re.compile(r'[+\-*/]')
+OPERADORES_CONSECUTIVOS_REGEX = re.compile(r'[+*/]{2,}|--')
+INICIO_INVALIDO_REGEX = re.compile(r'^[+*/]')
+FIM_INVALIDO_REGEX = re.compile(r'[+\-*/]$')
+
 
 class UsuarioSerializer(serializers.ModelSerializer):
     """Serializer para o modelo Usuario."""
@@ -59,9 +77,7 @@ class UsuarioRegistroSerializer(serializers.ModelSerializer):
         if len(value) > 150:
             raise serializers.ValidationError('O nome não pode ter mais de 150 caracteres.')
         
-
-        import re
-        if not re.match(r'^[a-zA-ZÀ-ÿ\s\'\-\.]+$', value):
+        if not NOME_REGEX.match(value):
             raise serializers.ValidationError('O nome deve conter apenas letras, espaços e caracteres válidos.')
         
         return value
@@ -73,10 +89,7 @@ class UsuarioRegistroSerializer(serializers.ModelSerializer):
         
         value = value.strip().lower()
         
-
-        import re
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, value):
+        if not EMAIL_REGEX.match(value):
             raise serializers.ValidationError('Digite um email válido. Exemplo: usuario@exemplo.com')
         
 
@@ -152,10 +165,7 @@ class LoginSerializer(serializers.Serializer):
         
         value = value.strip().lower()
         
-
-        import re
-        email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(email_pattern, value):
+        if not EMAIL_REGEX.match(value):
             raise serializers.ValidationError('Digite um email válido.')
         
         return value
@@ -181,9 +191,10 @@ class LoginSerializer(serializers.Serializer):
             })
         
 
-        try:
-            usuario_existe = Usuario.objects.get(email=email)
-        except Usuario.DoesNotExist:
+        # Uma única leitura do usuário: o BackendUsuario reaproveita a instância
+        # para conferir a senha em vez de buscá-la de novo pelo email.
+        cadastrado = Usuario.objects.filter(email=email).first()
+        if cadastrado is None:
             raise serializers.ValidationError({
                 'email': ['Este email não está cadastrado. Verifique o email ou crie uma conta.']
             })
@@ -191,7 +202,7 @@ class LoginSerializer(serializers.Serializer):
 
         usuario = authenticate(
             request=self.context.get('request'),
-            username=email,
+            usuario=cadastrado,
             password=senha
         )
         
@@ -217,10 +228,10 @@ class OperacaoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Operacao
         fields = [
-            'id', 'operacao', 'resultado', 'tipo_operacao', 
+            'id', 'uuid', 'operacao', 'resultado', 'tipo_operacao', 
             'data_inclusao', 'usuario', 'usuario_nome'
         ]
-        read_only_fields = ['id', 'data_inclusao', 'usuario', 'usuario_nome']
+        read_only_fields = ['id', 'uuid', 'data_inclusao', 'usuario', 'usuario_nome']
     
     def create(self, validated_data: dict) -> Operacao:
         """Criar nova operação associada ao usuário autenticado."""
@@ -229,6 +240,92 @@ class OperacaoSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+CAMPOS_OPERACAO = ('id', 'uuid', 'operacao', 'resultado', 'tipo_operacao', 'data_inclusao')
+
+
+def formatar_data_hora(valor, fuso=None) -> str:
+    """Formata um datetime como o DateTimeField do DRF (ISO 8601 no fuso atual)."""
+    texto = valor.astimezone(fuso or timezone.get_current_timezone()).isoformat()
+    if texto.endswith('+00:00'):
+        texto = texto[:-6] + 'Z'
+    return texto
+
+
+def iterar_operacoes(linhas, usuario: Usuario):
+    """
+    Converte linhas de ``Operacao.objects.values(*CAMPOS_OPERACAO)`` em dicts.
+    
+    Produz a mesma saída do OperacaoSerializer sem a maquinaria de campos do
+    DRF por linha; o nome do usuário é lido uma única vez em vez de ser
+    resolvido por ``usuario.nome`` em cada operação. É um gerador, para que
+    exportações longas não precisem manter todas as linhas em memória.
+    """
+    usuario_id = usuario.id
+    usuario_nome = usuario.nome
+    fuso = timezone.get_current_timezone()
+    
+    for linha in linhas:
+        yield {
+            'id': linha['id'],
+            'uuid': str(linha['uuid']),
+            'operacao': linha['operacao'],
+            'resultado': linha['resultado'],
+            'tipo_operacao': linha['tipo_operacao'],
+            'data_inclusao': formatar_data_hora(linha['data_inclusao'], fuso),
+            'usuario': usuario_id,
+            'usuario_nome': usuario_nome,
+        }
+
+
+def serializar_operacoes(linhas, usuario: Usuario) -> list:
+    """Versão em lista de ``iterar_operacoes``, usada nas páginas do histórico."""
+    return list(iterar_operacoes(linhas, usuario))
+
+
+def validar_operacao(value: str) -> str:
+    """
+    Regras de validação de uma expressão do cálculo.
+    
+    Compartilhadas pelo ``CalcularSerializer`` e pelo endpoint rápido de
+    cálculo. Levanta ``serializers.ValidationError``.
+    """
+    if not value or not value.strip():
+        raise serializers.ValidationError('A operação não pode estar vazia.')
+    
+    value = value.strip()
+    
+    if len(value) > 500:
+        raise serializers.ValidationError('A operação é muito longa. Máximo de 500 caracteres.')
+    
+    if not OPERACAO_REGEX.match(value):
+        raise serializers.ValidationError(
+            'A operação contém caracteres não permitidos. '
+            'Use apenas números e operadores básicos (+, -, *, /, parênteses).'
+        )
+    
+    if not DIGITO_REGEX.search(value):
+        raise serializers.ValidationError('A operação deve conter pelo menos um número.')
+    
+    if not OPERADOR_REGEX.search(value):
+        raise serializers.ValidationError('A operação deve conter pelo menos um operador (+, -, *, /).')
+    
+    if value.count('(') != value.count(')'):
+        raise serializers.ValidationError('Os parênteses não estão balanceados.')
+    
+    if '/0' in value.replace(' ', '') or '/ 0' in value:
+        raise serializers.ValidationError('Divisão por zero não é permitida.')
+    
+    operadores_consecutivos = OPERADORES_CONSECUTIVOS_REGEX.search(value.replace(' ', ''))
+    if operadores_consecutivos:
+        raise serializers.ValidationError('Operadores consecutivos não são permitidos.')
+    
+    value_sem_espacos = value.replace(' ', '')
+    if INICIO_INVALIDO_REGEX.match(value_sem_espacos) or FIM_INVALIDO_REGEX.search(value_sem_espacos):
+        raise serializers.ValidationError('A operação não pode começar ou terminar com um operador.')
+    
+    return value
+
+
 class CalcularSerializer(serializers.Serializer):
     """Serializer para processar cálculos matemáticos."""
     operacao = serializers.CharField(
@@ -238,42 +335,179 @@ class CalcularSerializer(serializers.Serializer):
     
     def validate_operacao(self, value: str) -> str:
         """Validar se a operação contém apenas caracteres permitidos."""
-        import re
-        
-        if not value or not value.strip():
-            raise serializers.ValidationError('A operação não pode estar vazia.')
-        
+        return validar_operacao(value)
+
+
+class CalcularLoteSerializer(serializers.Serializer):
+    """Serializer para processar um lote de cálculos matemáticos."""
+    MAXIMO_OPERACOES = 1000
+    
+    operacoes = serializers.ListField(
+        allow_empty=False,
+        max_length=MAXIMO_OPERACOES,
+        help_text="Lista de expressões matemáticas (ex: [\"2+2\", \"10*5-3\"])",
+        error_messages={
+            'empty': 'A lista de operações não pode estar vazia.',
+            'max_length': f'O lote pode ter no máximo {MAXIMO_OPERACOES} operações.',
+        }
+    )
+
+
+class CalcularGradeSerializer(serializers.Serializer):
+    """Serializer para avaliar um modelo de expressão sobre colunas de valores."""
+    MAXIMO_LINHAS = 10000
+    
+    expressao = serializers.CharField(
+        max_length=500,
+        help_text="Modelo com variáveis nomeadas (ex: (x*1.07)-y)"
+    )
+    valores = serializers.DictField(
+        child=serializers.ListField(),
+        help_text="Colunas de valores por variável (ex: {\"x\": [1, 2], \"y\": [3, 4]})"
+    )
+    persistir = serializers.BooleanField(
+        default=False,
+        help_text="Registra um resumo da avaliação no histórico do usuário"
+    )
+    
+    def validate_expressao(self, value: str) -> str:
+        """Validar caracteres do modelo de expressão."""
         value = value.strip()
+        if not MODELO_REGEX.match(value):
+            raise serializers.ValidationError(
+                'O modelo contém caracteres não permitidos. '
+                'Use números, variáveis e operadores básicos (+, -, *, /, parênteses).'
+            )
         
-        if len(value) > 500:
-            raise serializers.ValidationError('A operação é muito longa. Máximo de 500 caracteres.')
-        
-        padrao_permitido = re.compile(r'^[0-9+\-*/().\s]+$')
+        return value
+    
+    def validate_valores(self, value: dict) -> dict:
+        """Validar que as colunas são numéricas e têm o mesmo tamanho."""
+        tamanhos = {len(coluna) for coluna in value.values()}
+        if len(tamanhos) > 1:
+            raise serializers.ValidationError('Todas as colunas devem ter o mesmo número de valores.')
         
-        if not padrao_permitido.match(value):
+        if tamanhos and tamanhos.pop() > self.MAXIMO_LINHAS:
             raise serializers.ValidationError(
-                'A operação contém caracteres não permitidos. '
-                'Use apenas números e operadores básicos (+, -, *, /, parênteses).'
+                f'A grade pode ter no máximo {self.MAXIMO_LINHAS} linhas.'
             )
         
-        if not re.search(r'\d', value):
-            raise serializers.ValidationError('A operação deve conter pelo menos um número.')
+        for nome, coluna in value.items():
+            for valor in coluna:
+                if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+                    raise serializers.ValidationError(
+                        f'A coluna "{nome}" deve conter apenas números.'
+                    )
         
-        if not re.search(r'[+\-*/]', value):
-            raise serializers.ValidationError('A operação deve conter pelo menos um operador (+, -, *, /).')
+        return value
+    
+    def validate(self, attrs: dict) -> dict:
+        """Compilar o modelo e conferir se todas as variáveis têm valores."""
+        try:
+            programa, variaveis = avaliador.compilar_vetorizado(attrs['expressao'])
+        except ValueError as e:
+            raise serializers.ValidationError({'expressao': str(e)})
         
-        if value.count('(') != value.count(')'):
-            raise serializers.ValidationError('Os parênteses não estão balanceados.')
+        if not variaveis:
+            raise serializers.ValidationError({
+                'expressao': 'O modelo deve conter pelo menos uma variável.'
+            })
         
-        if '/0' in value.replace(' ', '') or '/ 0' in value:
-            raise serializers.ValidationError('Divisão por zero não é permitida.')
+        faltando = [nome for nome in variaveis if nome not in attrs['valores']]
+        if faltando:
+            raise serializers.ValidationError({
+                'valores': f'Informe valores para as variáveis: {", ".join(faltando)}.'
+            })
         
-        operadores_consecutivos = re.search(r'[+*/]{2,}|--', value.replace(' ', ''))
-        if operadores_consecutivos:
-            raise serializers.ValidationError('Operadores consecutivos não são permitidos.')
+        attrs['programa'] = programa
+        attrs['variaveis'] = variaveis
+        attrs['linhas'] = len(attrs['valores'][variaveis[0]])
+        return attrs
+
+
+class EstatisticasPeriodoSerializer(serializers.Serializer):
+    """Serializer para os parâmetros da consulta de estatísticas por período."""
+    MAXIMO_PERIODOS = 10000
+    PASSOS = {'hora': timedelta(hours=1), 'dia': timedelta(days=1)}
+    
+    inicio = serializers.CharField(help_text="Data ou data/hora inicial (ex: 2024-01-01)")
+    fim = serializers.CharField(help_text="Data final (inclusiva) ou data/hora final (exclusiva)")
+    granularidade = serializers.ChoiceField(
+        choices=['hora', 'dia'],
+        default='dia',
+        error_messages={'invalid_choice': 'Use "hora" ou "dia".'}
+    )
+    
+    def _converter(self, value: str, fim: bool = False) -> datetime:
+        """Interpreta uma data ou data/hora no fuso do projeto."""
+        try:
+            data = parse_date(value)
+            if data is not None:
+                data_hora = datetime.combine(data, time.min)
+                if fim:
+                    data_hora += timedelta(days=1)
+            else:
+                data_hora = parse_datetime(value)
+                if data_hora is None:
+                    raise ValueError
+        except ValueError:
+            raise serializers.ValidationError('Use o formato AAAA-MM-DD ou AAAA-MM-DDTHH:MM.')
+        
+        if timezone.is_naive(data_hora):
+            data_hora = timezone.make_aware(data_hora)
+        return data_hora
+    
+    def validate_inicio(self, value: str) -> datetime:
+        return self._converter(value)
+    
+    def validate_fim(self, value: str) -> datetime:
+        return self._converter(value, fim=True)
+    
+    def validate(self, attrs: dict) -> dict:
+        """Validar o intervalo e o número de períodos."""
+        if attrs['fim'] <= attrs['inicio']:
+            raise serializers.ValidationError({'fim': 'O fim deve ser posterior ao início.'})
         
-        value_sem_espacos = value.replace(' ', '')
-        if re.match(r'^[+*/]', value_sem_espacos) or re.search(r'[+\-*/]$', value_sem_espacos):
-            raise serializers.ValidationError('A operação não pode começar ou terminar com um operador.')
+        periodos = (attrs['fim'] - attrs['inicio']) / self.PASSOS[attrs['granularidade']]
+        if periodos > self.MAXIMO_PERIODOS:
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    f'O intervalo pode ter no máximo {self.MAXIMO_PERIODOS} períodos. '
+                    'Reduza o intervalo ou use a granularidade "dia".'
+                ]
+            })
         
-        return value
\ No newline at end of file
+        return attrs
+
+
+class DeltaOperacoesSerializer(serializers.Serializer):
+    """Serializer para os parâmetros da sincronização incremental do histórico."""
+    LIMITE_PADRAO = 500
+    LIMITE_MAXIMO = 1000
+    ESPERA_MAXIMA = 30
+    
+    desde_id = serializers.IntegerField(
+        required=False, min_value=0, help_text="Maior id que o cliente já tem (o cursor da resposta anterior)"
+    )
+    desde = serializers.DateTimeField(
+        required=False, help_text="Data/hora inicial, para a primeira sincronização de um cliente"
+    )
+    limite = serializers.IntegerField(required=False, min_value=1, max_value=LIMITE_MAXIMO, default=LIMITE_PADRAO)
+    geracao = serializers.IntegerField(
+        required=False, min_value=0,
+        help_text="Geração da resposta anterior; se mudou, a sincronização recomeça do zero"
+    )
+    esperar = serializers.FloatField(
+        required=False, min_value=0, max_value=ESPERA_MAXIMA, default=0,
+        help_text="Segundos de espera por novidades quando não houver nenhuma (long polling)"
+    )
+    
+    def validate(self, attrs: dict) -> dict:
+        """Aceitar um único ponto de partida; sem nenhum, a sincronização começa do zero."""
+        if 'desde_id' in attrs and 'desde' in attrs:
+            raise serializers.ValidationError({
+                'non_field_errors': ['Informe desde_id ou desde, não os dois.']
+            })
+        if 'desde' not in attrs:
+            attrs.setdefault('desde_id', 0)
+        return attrs
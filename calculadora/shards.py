@@ -0,0 +1,103 @@
+"""
+Particionamento (sharding) do histórico por usuário.
+
+As operações de cada usuário, junto com suas estatísticas e contagens por
+período, ficam em um dos bancos listados em ``CALCULADORA_SHARDS``, escolhido
+por jump consistent hash do ``usuario_id``. Cada arquivo SQLite tem seu
+próprio lock de escrita, então cálculos de usuários em shards diferentes
+gravam em paralelo. ``Usuario`` e as demais tabelas ficam sempre no banco
+primário (``default``).
+
+Consultas de dados particionados indicam o banco explicitamente
+(``Operacao.objects.do_usuario``/``do_shard``); o roteador cobre o ``save()``
+de instâncias e as relações com o usuário. Ao mudar a lista de shards, rode
+``manage.py rebalancear_shards``.
+"""
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+MODELOS_PARTICIONADOS = {'operacao', 'estatisticasusuario', 'contagemperiodo'}
+
+
+def shards() -> List[str]:
+    return list(getattr(settings, 'CALCULADORA_SHARDS', None) or [DEFAULT_DB_ALIAS])
+
+
+def jump_hash(chave: int, baldes: int) -> int:
+    """
+    Jump consistent hash (Lamping e Veach, 2014).
+
+    Ao passar de N para N+1 baldes, só ~1/(N+1) das chaves mudam de balde, e
+    todas elas vão para o balde novo.
+    """
+    chave &= 0xFFFFFFFFFFFFFFFF
+    balde, proximo = -1, 0
+    while proximo < baldes:
+        balde = proximo
+        chave = (chave * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        proximo = int((balde + 1) * ((1 << 31) / ((chave >> 33) + 1)))
+    return balde
+
+
+def banco_do_usuario(usuario_id: int) -> str:
+    """Alias do banco que guarda o histórico do usuário."""
+    lista = shards()
+    if len(lista) == 1:
+        return lista[0]
+    return lista[jump_hash(int(usuario_id), len(lista))]
+
+
+def banco_leitura(usuario_id: int) -> str:
+    """Como ``banco_do_usuario``, mas usa a réplica quando a view lê dela."""
+    from .roteador import banco_leitura as _banco_leitura
+
+    return _banco_leitura(banco_do_usuario(usuario_id))
+
+
+def _particionado(model) -> bool:
+    return model._meta.app_label == 'calculadora' and model._meta.model_name in MODELOS_PARTICIONADOS
+
+
+class RoteadorShards:
+    """Direciona instâncias particionadas ao shard do usuário e o resto ao primário."""
+
+    def _banco(self, model, hints: dict) -> Optional[str]:
+        instancia = hints.get('instance')
+        if instancia is None:
+            return None
+
+        if not _particionado(model):
+            # Ex: operacao.usuario, com a operação carregada de um shard.
+            if instancia._state.db not in (None, DEFAULT_DB_ALIAS) and instancia._state.db in shards():
+                return DEFAULT_DB_ALIAS
+            return None
+
+        if instancia._meta.model_name == 'usuario':
+            usuario_id = instancia.pk
+        else:
+            usuario_id = getattr(instancia, 'usuario_id', None)
+        if usuario_id is None:
+            return None
+        return banco_do_usuario(usuario_id)
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        return self._banco(model, hints)
+
+    def db_for_write(self, model, **hints) -> Optional[str]:
+        return self._banco(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        bancos = set(shards()) | {DEFAULT_DB_ALIAS}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name=None, **hints) -> Optional[bool]:
+        # O primário tem todas as tabelas; os demais shards, só as particionadas.
+        if db == DEFAULT_DB_ALIAS or db not in shards():
+            return None
+        if model_name is None:
+            return None
+        return app_label == 'calculadora' and model_name in MODELOS_PARTICIONADOS
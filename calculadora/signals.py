@@ -0,0 +1,33 @@
+"""
+Sinais do histórico de operações.
+
+Os caminhos de inserção em lote usam ``bulk_create``, que não dispara
+``post_save``; por isso todos eles enviam ``operacoes_criadas`` explicitamente,
+e inserções individuais são convertidas no mesmo sinal. Os receptores rodam
+dentro da transação da inserção ou da limpeza.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import Signal, receiver
+
+from .models import Operacao
+
+# Operações inseridas. Argumentos: usuario_id, operacoes (lista de Operacao).
+operacoes_criadas = Signal()
+
+# Histórico do usuário apagado. Argumentos: usuario_id.
+historico_limpo = Signal()
+
+
+@receiver(post_save, sender=Operacao)
+def _operacao_salva(sender, instance: Operacao, created: bool, raw: bool = False, **kwargs) -> None:
+    if created and not raw:
+        operacoes_criadas.send(sender=Operacao, usuario_id=instance.usuario_id, operacoes=[instance])
+
+
+def enviar_operacoes_criadas(operacoes: list) -> None:
+    """Envia ``operacoes_criadas`` uma vez por usuário presente no lote."""
+    por_usuario = {}
+    for operacao in operacoes:
+        por_usuario.setdefault(operacao.usuario_id, []).append(operacao)
+    for usuario_id, do_usuario in por_usuario.items():
+        operacoes_criadas.send(sender=Operacao, usuario_id=usuario_id, operacoes=do_usuario)
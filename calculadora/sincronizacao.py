@@ -0,0 +1,98 @@
+"""
+Sincronização incremental do histórico (``/api/operacoes/delta/``).
+
+Clientes que mantêm uma cópia local do histórico pedem só o que mudou desde o
+último id recebido. A consulta percorre o índice ``(usuario, id)`` a partir
+desse id, então o custo acompanha o volume de mudanças e não o tamanho do
+histórico. A primeira sincronização pode partir de uma data/hora (índice
+``(usuario, data_inclusao)``); depois o cliente segue pelo ``cursor``.
+
+Remoções não deixam uma lápide por linha: ``LimparHistoricoAPIView`` só move
+``Usuario.operacoes_ocultas_ate``, e esse corte é a lápide de intervalo. Toda
+resposta traz ``removidas_ate`` e ``historico_limpo_em``; o cliente apaga as
+cópias com id menor ou igual, o que é idempotente.
+
+Os cursores são ids do shard do usuário. O ``rebalancear_shards`` copia o
+histórico com ids novos e incrementa ``Usuario.geracao_ids``; toda resposta
+traz a ``geracao`` e o cliente a devolve no pedido seguinte. Se ela mudou, a
+resposta recomeça do id 0 com ``ressincronizar``, e o cliente descarta a
+cópia local antes de aplicar as operações.
+
+Com ``esperar``, uma consulta sem novidades espera por um evento do histórico
+(``eventos.py``) e consulta de novo. Com o transporte local, só as escritas
+feitas no mesmo processo acordam a espera; as demais aparecem no fim dela.
+
+Os ids são atribuídos na ordem das escritas, que o SQLite serializa; por isso
+nenhuma linha nova pode surgir com id menor que um cursor já entregue.
+"""
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import Max
+
+from . import eventos
+from .models import Operacao, Usuario
+from .serializers import CAMPOS_OPERACAO, formatar_data_hora, serializar_operacoes
+
+
+def consultar(
+    usuario: Usuario,
+    limite: int,
+    desde_id: Optional[int] = None,
+    desde: Optional[datetime] = None,
+    geracao: Optional[int] = None,
+) -> dict:
+    """Operações posteriores a ``desde_id`` (ou a ``desde``) em ordem de id, e a lápide atual."""
+    ressincronizar = geracao is not None and geracao != usuario.geracao_ids
+    if ressincronizar:
+        desde_id, desde = 0, None
+
+    queryset = Operacao.objects.do_usuario(usuario)
+    if desde_id is not None:
+        queryset = queryset.filter(id__gt=desde_id)
+    if desde is not None:
+        queryset = queryset.filter(data_inclusao__gt=desde)
+
+    linhas = list(queryset.order_by('id').values(*CAMPOS_OPERACAO)[:limite + 1])
+    mais = len(linhas) > limite
+    linhas = linhas[:limite]
+
+    if linhas:
+        cursor = linhas[-1]['id']
+    elif desde_id is not None:
+        cursor = max(desde_id, usuario.operacoes_ocultas_ate)
+    else:
+        # Nada depois da data: o cliente já está em dia até a operação mais recente.
+        maior = Operacao.objects.do_usuario(usuario).aggregate(maior=Max('id'))['maior']
+        cursor = max(maior or 0, usuario.operacoes_ocultas_ate)
+
+    limpo_em = usuario.historico_limpo_em
+    return {
+        'operacoes': serializar_operacoes(linhas, usuario),
+        'cursor': cursor,
+        'mais': mais,
+        'removidas_ate': usuario.operacoes_ocultas_ate,
+        'historico_limpo_em': formatar_data_hora(limpo_em) if limpo_em else None,
+        'geracao': usuario.geracao_ids,
+        'ressincronizar': ressincronizar,
+    }
+
+
+def aguardar(usuario: Usuario, esperar: float, **parametros) -> dict:
+    """
+    ``consultar`` com long polling.
+
+    A assinatura é feita antes da primeira consulta, para que uma escrita
+    entre as duas não seja perdida. Qualquer evento (operações novas ou
+    limpeza) encerra a espera.
+    """
+    assinatura = eventos.hub.assinar(usuario.pk)
+    try:
+        delta = consultar(usuario, **parametros)
+        if delta['operacoes'] or assinatura.proximo(esperar) is None:
+            return delta
+    finally:
+        eventos.hub.cancelar(assinatura)
+
+    usuario.refresh_from_db(fields=['operacoes_ocultas_ate', 'historico_limpo_em', 'geracao_ids'])
+    return consultar(usuario, **parametros)
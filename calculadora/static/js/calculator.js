@@ -2,6 +2,8 @@
 
 let currentInput = '0';
 let shouldResetDisplay = false;
+// uuids already shown, so pushed operations are not added twice
+const renderedOperations = new Set();
 
 // Calculator display functions
 function appendToDisplay(value) {
@@ -57,8 +59,8 @@ async function calculate() {
         currentInput = result;
         shouldResetDisplay = true;
         
-        // Adicionar ao histórico
-        addToHistory(expression, result);
+        // Adicionar ao histórico (as outras abas recebem pelo stream de eventos)
+        addToHistory(data);
         
     } catch (error) {
         document.getElementById('display').textContent = 'Erro';
@@ -68,19 +70,31 @@ async function calculate() {
 }
 
 // History functions
-function addToHistory(expression, result) {
-    const historyItems = document.getElementById('historyItems');
-    const timestamp = new Date().toLocaleString('pt-BR');
+function createHistoryItem(operacao) {
+    const timestamp = operacao.data_inclusao ? 
+        new Date(operacao.data_inclusao).toLocaleString('pt-BR') : 
+        'Data não disponível';
     
-    const historyItem = document.createElement('div');
-    historyItem.className = 'history-item';
-    historyItem.innerHTML = `
-        <div class="expression">${expression}</div>
-        <div class="result">= ${result}</div>
-        <div class="timestamp">${timestamp}</div>
-    `;
+    return createHistoryElement(operacao.operacao || 'N/A', operacao.resultado || 'N/A', timestamp);
+}
+
+function addToHistory(operacao) {
+    if (operacao.uuid) {
+        if (renderedOperations.has(operacao.uuid)) {
+            return;
+        }
+        renderedOperations.add(operacao.uuid);
+    }
     
-    historyItems.insertBefore(historyItem, historyItems.firstChild);
+    const historyItems = document.getElementById('historyItems');
+    // Remover a mensagem de histórico vazio
+    historyItems.querySelectorAll('.loading').forEach(item => item.remove());
+    historyItems.insertBefore(createHistoryItem(operacao), historyItems.firstChild);
+}
+
+function showEmptyHistory() {
+    renderedOperations.clear();
+    document.getElementById('historyItems').innerHTML = '<div class="loading">Nenhuma operação realizada ainda.</div>';
 }
 
 async function loadHistory() {
@@ -100,7 +114,7 @@ async function loadHistory() {
                 console.error('Token expirado ou inválido');
                 historyItems.innerHTML = '<div class="loading">Sessão expirada. Faça login novamente.</div>';
                 setTimeout(() => logout(), 2000);
-                return;
+                return [];
             }
             
             const errorText = await response.text();
@@ -122,40 +136,33 @@ async function loadHistory() {
             console.error('Formato de dados inválido:', data);
             console.error('Tipo de dados recebido:', typeof data);
             historyItems.innerHTML = `<div class="loading">Erro: formato de dados inválido. Tipo recebido: ${typeof data}</div>`;
-            return;
+            return [];
         }
         
         if (operacoes.length === 0) {
-            historyItems.innerHTML = '<div class="loading">Nenhuma operação realizada ainda.</div>';
-            return;
+            showEmptyHistory();
+            return operacoes;
         }
         
         historyItems.innerHTML = '';
+        renderedOperations.clear();
         
         operacoes.forEach((operacao, index) => {
             try {
-                const timestamp = operacao.data_inclusao ? 
-                    new Date(operacao.data_inclusao).toLocaleString('pt-BR') : 
-                    'Data não disponível';
-                
-                const historyItem = document.createElement('div');
-                historyItem.className = 'history-item';
-                historyItem.innerHTML = `
-                    <div class="expression">${operacao.operacao || 'N/A'}</div>
-                    <div class="result">= ${operacao.resultado || 'N/A'}</div>
-                    <div class="timestamp">${timestamp}</div>
-                `;
-                historyItems.appendChild(historyItem);
+                renderedOperations.add(operacao.uuid);
+                historyItems.appendChild(createHistoryItem(operacao));
             } catch (itemError) {
                 console.error(`Erro ao processar item ${index}:`, itemError, operacao);
             }
         });
         
         console.log('Histórico carregado com sucesso');
+        return operacoes;
         
     } catch (error) {
         console.error('Erro detalhado ao carregar histórico:', error);
         historyItems.innerHTML = `<div class="loading">Erro ao carregar histórico: ${error.message}</div>`;
+        return [];
     }
 }
 
@@ -175,7 +182,7 @@ async function clearHistory() {
             }
 
             const data = await response.json();
-            document.getElementById('historyItems').innerHTML = '<div class="loading">Nenhuma operação realizada ainda.</div>';
+            showEmptyHistory();
             alert(`Histórico limpo com sucesso! ${data.operacoes_deletadas} operações foram removidas.`);
             
         } catch (error) {
@@ -203,6 +210,13 @@ document.addEventListener('keydown', (event) => {
 });
 
 // Page-specific initialization function called by common.js
-function onAuthenticationSuccess() {
-    loadHistory();
+async function onAuthenticationSuccess() {
+    const operacoes = await loadHistory();
+    
+    // Operações feitas em outras abas ou dispositivos chegam pelo stream
+    subscribeHistory(maxOperationId(operacoes), {
+        onOperations: (novas) => novas.forEach(addToHistory),
+        onCleared: showEmptyHistory,
+        onChanged: loadHistory
+    });
 }
\ No newline at end of file
@@ -112,6 +112,53 @@ function toggleLoading(element, isLoading) {
     }
 }
 
+// Live history updates (Server-Sent Events)
+// The server pushes operations created in any tab or device; `lastId` is the
+// newest id already on the page, so nothing saved after it is missed.
+// Only enabled when the page was served over ASGI (data-live-history): under
+// WSGI every open stream would hold a worker.
+function subscribeHistory(lastId, handlers) {
+    if (document.body.dataset.liveHistory !== 'true') {
+        return null;
+    }
+    if (window.historySource || typeof EventSource === 'undefined') {
+        return window.historySource || null;
+    }
+
+    const url = lastId ? `/api/operacoes/eventos/?desde=${lastId}` : '/api/operacoes/eventos/';
+    const source = new EventSource(url, { withCredentials: true });
+
+    // Rows created since the last event, oldest first
+    source.addEventListener('operacoes', (event) => {
+        handlers.onOperations(JSON.parse(event.data));
+    });
+    source.addEventListener('historico_limpo', () => handlers.onCleared());
+    // Too many changes to send row by row: reload the list once
+    source.addEventListener('historico_alterado', () => handlers.onChanged());
+
+    window.historySource = source;
+    return source;
+}
+
+function maxOperationId(operacoes) {
+    return operacoes.reduce((maior, operacao) => Math.max(maior, operacao.id || 0), 0);
+}
+
+// History item element
+// Built with textContent: expressions and results come from the server and
+// must never be parsed as HTML.
+function createHistoryElement(expression, result, timestamp) {
+    const historyItem = document.createElement('div');
+    historyItem.className = 'history-item';
+    [['expression', expression], ['result', `= ${result}`], ['timestamp', timestamp]].forEach(([className, text]) => {
+        const element = document.createElement('div');
+        element.className = className;
+        element.textContent = text;
+        historyItem.appendChild(element);
+    });
+    return historyItem;
+}
+
 // Initialize common functionality when DOM is loaded
 document.addEventListener('DOMContentLoaded', function() {
     // Check if we're on a page that requires authentication
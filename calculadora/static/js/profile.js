@@ -35,7 +35,14 @@ function checkAuthentication() {
         window.appUserData = data;
         localStorage.setItem('user_data', JSON.stringify(window.appUserData));
         loadProfile();
-        loadHistoryWithPagination();
+        loadHistoryWithPagination().then(operacoes => {
+            // Operações feitas em outras abas ou dispositivos chegam pelo stream
+            subscribeHistory(maxOperationId(operacoes), {
+                onOperations: applyPushedOperations,
+                onCleared: showEmptyHistory,
+                onChanged: loadHistoryWithPagination
+            });
+        });
     })
     .catch(error => {
         console.error('Erro na verificação de autenticação:', error);
@@ -89,7 +96,7 @@ async function loadHistoryWithPagination() {
         if (!response.ok) {
             if (response.status === 401) {
                 logout();
-                return;
+                return [];
             }
             throw new Error(`Erro ${response.status}: ${response.statusText}`);
         }
@@ -97,16 +104,8 @@ async function loadHistoryWithPagination() {
         const data = await response.json();
         let operacoes = Array.isArray(data) ? data : (data.results || []);
 
-        // Armazenar operações globalmente para paginação
-        window.allOperations = operacoes;
-
-        // Calcular estatísticas
-        calculateStats(operacoes);
-
-        // Implementar paginação manual
-        totalPages = Math.ceil(operacoes.length / itemsPerPage);
-        displayHistory(operacoes);
-        updatePagination();
+        renderOperations(operacoes);
+        return operacoes;
 
     } catch (error) {
         console.error('Erro ao carregar histórico:', error);
@@ -117,7 +116,41 @@ async function loadHistoryWithPagination() {
         document.getElementById('totalOperations').textContent = '0';
         document.getElementById('todayOperations').textContent = '0';
         document.getElementById('weekOperations').textContent = '0';
+        return [];
+    }
+}
+
+function renderOperations(operacoes) {
+    // Armazenar operações globalmente para paginação
+    window.allOperations = operacoes;
+
+    // Calcular estatísticas
+    calculateStats(operacoes);
+
+    // Implementar paginação manual
+    totalPages = Math.ceil(operacoes.length / itemsPerPage);
+    if (currentPage > Math.max(totalPages, 1)) {
+        currentPage = Math.max(totalPages, 1);
     }
+    displayHistory(operacoes);
+    updatePagination();
+}
+
+// Apply operations pushed by the server instead of reloading the history
+function applyPushedOperations(novas) {
+    const atuais = window.allOperations || [];
+    const conhecidas = new Set(atuais.map(operacao => operacao.uuid));
+    const ineditas = novas.filter(operacao => !conhecidas.has(operacao.uuid));
+
+    if (ineditas.length > 0) {
+        // Mais recentes primeiro, como na API
+        renderOperations(ineditas.reverse().concat(atuais));
+    }
+}
+
+function showEmptyHistory() {
+    currentPage = 1;
+    renderOperations([]);
 }
 
 function calculateStats(operacoes) {
@@ -155,14 +188,7 @@ function displayHistory(operacoes) {
     historyItems.innerHTML = '';
     pageOperacoes.forEach(operacao => {
         const timestamp = new Date(operacao.data_inclusao).toLocaleString('pt-BR');
-        const historyItem = document.createElement('div');
-        historyItem.className = 'history-item';
-        historyItem.innerHTML = `
-            <div class="expression">${operacao.operacao}</div>
-            <div class="result">= ${operacao.resultado}</div>
-            <div class="timestamp">${timestamp}</div>
-        `;
-        historyItems.appendChild(historyItem);
+        historyItems.appendChild(createHistoryElement(operacao.operacao, operacao.resultado, timestamp));
     });
 }
 
@@ -332,9 +358,8 @@ async function clearHistory() {
             throw new Error('Erro ao limpar histórico');
         }
 
-        // Recarregar histórico
-        currentPage = 1;
-        loadHistoryWithPagination();
+        // O histórico está vazio; não há o que consultar de novo
+        showEmptyHistory();
         alert('Histórico limpo com sucesso!');
 
     } catch (error) {
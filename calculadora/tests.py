@@ -1,12 +1,46 @@
-from django.test import TestCase, Client
+import gzip
+import io
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, Client, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.contrib.auth.hashers import make_password
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, connections, router
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.http import http_date
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
-from .models import Usuario, Operacao
+from . import aquecimento, arquivamento, avaliador, contagens, estatisticas, eventos, expurgo, shards, tokens
+from .backends import cache_usuarios
+from .cache_resultados import cache_resultados
+from .models import Usuario, Operacao, EstatisticasUsuario, ContagemPeriodo, SegmentoArquivo, TarefaExpurgo
+from .serializers import OperacaoSerializer
+from .persistencia import FilaCheia, FilaEscrita, fila_escrita
 import json
 
 
+def cache_em_arquivo(caso, alias: str) -> override_settings:
+    """Configura ``alias`` como um cache de arquivos, compartilhado entre processos como um Redis."""
+    diretorio = tempfile.TemporaryDirectory()
+    caso.addCleanup(diretorio.cleanup)
+    return override_settings(CACHES={**settings.CACHES, alias: {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': diretorio.name,
+    }})
+
+
 class TemplateViewsTestCase(TestCase):
     """Testes para as views que servem templates HTML."""
     
@@ -33,6 +67,19 @@ class TemplateViewsTestCase(TestCase):
         """Testa se a página de perfil é carregada."""
         response = self.client.get(reverse('calculadora:perfil'))
         self.assertEqual(response.status_code, 200)
+        
+    def test_historico_ao_vivo_somente_asgi(self):
+        """Testa que as páginas só habilitam o stream SSE quando servidas por ASGI."""
+        for nome in ('calculadora:calculadora', 'calculadora:perfil'):
+            with self.subTest(pagina=nome):
+                self.assertNotContains(self.client.get(reverse(nome)), 'data-live-history')
+        
+    async def test_historico_ao_vivo_asgi(self):
+        """Testa que sob ASGI as páginas habilitam o stream."""
+        for nome in ('calculadora:calculadora', 'calculadora:perfil'):
+            with self.subTest(pagina=nome):
+                response = await self.async_client.get(reverse(nome))
+                self.assertContains(response, 'data-live-history="true"')
 
 
 class RegistroAPITestCase(APITestCase):
@@ -132,6 +179,38 @@ class LoginAPITestCase(APITestCase):
         
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_login_le_usuario_uma_vez(self):
+        """Testa que o login busca o usuário no banco uma única vez."""
+        data = {'email': 'teste@exemplo.com', 'senha': 'senha123456'}
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        selects = [
+            consulta['sql'] for consulta in consultas
+            if consulta['sql'].startswith('SELECT') and 'FROM "usuarios"' in consulta['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_login_atualiza_hash_antigo(self):
+        """Testa que um hash de algoritmo antigo é regravado no login sem revogar tokens."""
+        Usuario.objects.filter(pk=self.user.pk).update(
+            password=make_password('senha123456', hasher='md5')
+        )
+        
+        data = {'email': 'teste@exemplo.com', 'senha': 'senha123456'}
+        response = self.client.post(self.url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertEqual(self.user.versao_token, 0)
 
 
 class LogoutAPITestCase(APITestCase):
@@ -161,6 +240,243 @@ class LogoutAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class TokenAPITestCase(APITestCase):
+    """Testes para a autenticação por tokens assinados."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        response = self.client.post(
+            reverse('calculadora:api_token'),
+            {'email': 'teste@exemplo.com', 'senha': 'senha123456'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.tokens = response.data
+        
+    def autenticar(self, token=None):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token or self.tokens["acesso"]}')
+        
+    def test_credenciais_invalidas(self):
+        """Testa que senha errada não emite tokens."""
+        response = self.client.post(
+            reverse('calculadora:api_token'),
+            {'email': 'teste@exemplo.com', 'senha': 'errada'},
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_calculo_sem_consultar_sessao_nem_usuario(self):
+        """Testa que o cálculo autenticado por token não lê sessão nem usuário."""
+        self.autenticar()
+        self.client.post(reverse('calculadora:api_calcular'), {'operacao': '1 + 1'}, format='json')
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('calculadora:api_calcular'), {'operacao': '2 * 3'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 2)
+        sql = ' '.join(consulta['sql'] for consulta in consultas)
+        self.assertNotIn('"usuarios"', sql)
+        self.assertNotIn('django_session', sql)
+        
+    def test_perfil_com_token(self):
+        """Testa que o perfil é carregado completo para o usuário do token."""
+        self.autenticar()
+        response = self.client.get(reverse('calculadora:api_perfil'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['nome'], 'Teste Usuario')
+        
+    def test_token_invalido(self):
+        """Testa token adulterado."""
+        self.autenticar(self.tokens['acesso'] + 'x')
+        response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_token_expirado(self):
+        """Testa que o token de acesso expira."""
+        self.autenticar()
+        with override_settings(CALCULADORA_TOKENS={'VALIDADE_ACESSO': -1}):
+            response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_renovar(self):
+        """Testa a troca do token de renovação por um novo par."""
+        response = self.client.post(
+            reverse('calculadora:api_token_renovar'), {'renovacao': self.tokens['renovacao']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.autenticar(response.data['acesso'])
+        self.assertEqual(self.client.get(reverse('calculadora:api_operacoes')).status_code, status.HTTP_200_OK)
+        
+    def test_token_de_acesso_nao_renova(self):
+        """Testa que o token de acesso não serve como token de renovação."""
+        response = self.client.post(
+            reverse('calculadora:api_token_renovar'), {'renovacao': self.tokens['acesso']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_logout_revoga_tokens(self):
+        """Testa que o logout com token revoga o acesso e a renovação."""
+        self.autenticar()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('calculadora:api_logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.client.credentials()
+        response = self.client.post(
+            reverse('calculadora:api_token_renovar'), {'renovacao': self.tokens['renovacao']}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        
+    def test_troca_de_senha_revoga_tokens(self):
+        """Testa que trocar a senha invalida os tokens emitidos."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('outrasenha123')
+            self.user.save()
+        
+        self.autenticar()
+        response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class CacheUsuariosTestCase(APITestCase):
+    """Testes para o cache do usuário da sessão."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        cache_usuarios.limpar()
+        cache_usuarios.zerar_metricas()
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        
+    def _cache_compartilhado(self, **config):
+        """Liga a camada compartilhada em um cache de arquivos."""
+        configuracao = cache_em_arquivo(self, 'usuarios')
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        return override_settings(CALCULADORA_CACHE_USUARIOS={'CACHE': 'usuarios', **config})
+        
+    def test_usuario_da_sessao_vem_do_cache(self):
+        """Testa que só a primeira requisição lê o usuário do banco."""
+        url = reverse('calculadora:api_estatisticas')
+        self.client.get(url)
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('"usuarios"' in consulta['sql'] for consulta in consultas))
+        metricas = cache_usuarios.metricas()
+        self.assertEqual(metricas['falhas'], 1)
+        self.assertEqual(metricas['acertos_locais'], 1)
+        
+    def test_views_assincronas_usam_o_cache(self):
+        """Testa que ``request.auser()`` nas views assíncronas também passa pelo cache."""
+        url = reverse('calculadora:api_calcular_async')
+        self.client.post(url, {'operacao': '1 + 1'}, format='json')
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(url, {'operacao': '2 + 2'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(any('FROM "usuarios"' in consulta['sql'] for consulta in consultas))
+        metricas = cache_usuarios.metricas()
+        self.assertEqual(metricas['falhas'], 1)
+        self.assertEqual(metricas['acertos_locais'], 1)
+        
+        with self._cache_compartilhado(JANELA_LOCAL=-1):
+            self.client.post(url, {'operacao': '3 + 3'}, format='json')
+            self.client.post(url, {'operacao': '4 + 4'}, format='json')
+        self.assertEqual(cache_usuarios.metricas()['acertos_compartilhados'], 1)
+        
+    def test_camada_compartilhada(self):
+        """Testa que, vencida a cópia local, o usuário vem do cache compartilhado."""
+        url = reverse('calculadora:api_estatisticas')
+        with self._cache_compartilhado():
+            self.client.get(url)
+            
+            with override_settings(CALCULADORA_CACHE_USUARIOS={'CACHE': 'usuarios', 'JANELA_LOCAL': -1}):
+                self.client.get(url)
+            
+            self.assertEqual(cache_usuarios.metricas()['acertos_compartilhados'], 1)
+            
+            # A alteração apaga a entrada compartilhada, não só a cópia deste processo.
+            with self.captureOnCommitCallbacks(execute=True):
+                Usuario.objects.get(pk=self.user.pk).save()
+            self.assertIsNone(caches['usuarios'].get(f'{cache_usuarios.prefixo}{self.user.pk}'))
+        
+    def test_locmem_nao_e_compartilhado(self):
+        """Testa que um alias LocMemCache, local ao processo, não é usado como camada compartilhada."""
+        url = reverse('calculadora:api_estatisticas')
+        self.client.get(url)
+        
+        with override_settings(CALCULADORA_CACHE_USUARIOS={'CACHE': 'default', 'JANELA_LOCAL': -1}):
+            self.client.get(url)
+            metricas = cache_usuarios.metricas()
+        
+        self.assertEqual((metricas['acertos_compartilhados'], metricas['falhas']), (0, 2))
+        self.assertIsNone(metricas['alias'])
+        self.assertIsNone(caches['default'].get(f'{cache_usuarios.prefixo}{self.user.pk}'))
+        
+    def test_atualizacao_do_perfil_invalida(self):
+        """Testa que a alteração do perfil aparece na requisição seguinte."""
+        url = reverse('calculadora:api_perfil')
+        self.client.get(url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(url, {'nome': 'Nome Atualizado'}, format='json')
+        
+        self.assertEqual(self.client.get(url).data['nome'], 'Nome Atualizado')
+        
+    def test_limpar_historico_invalida(self):
+        """Testa que o corte do histórico limpo não fica preso na cópia em cache."""
+        Operacao.objects.create(usuario=self.user, operacao='1 + 1', resultado='2')
+        url = reverse('calculadora:api_operacoes')
+        self.assertEqual(len(self.client.get(url).data['results']), 1)
+        
+        with override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('calculadora:api_limpar_historico'))
+        
+        self.assertEqual(self.client.get(url).data['results'], [])
+        
+    def test_troca_de_senha_encerra_sessao(self):
+        """Testa que a sessão antiga cai após a troca de senha, mesmo com o usuário em cache."""
+        url = reverse('calculadora:api_estatisticas')
+        self.client.get(url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('outrasenha123')
+            self.user.save()
+        
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+    def test_logout_invalida(self):
+        """Testa que o logout apaga o usuário do cache."""
+        self.client.get(reverse('calculadora:api_estatisticas'))
+        cache_usuarios.zerar_metricas()
+        self.client.post(reverse('calculadora:api_logout'))
+        
+        metricas = cache_usuarios.metricas()
+        self.assertEqual(metricas['invalidacoes'], 1)
+        self.assertEqual(metricas['entradas_locais'], 0)
+
+
 class PerfilAPITestCase(APITestCase):
     """Testes para a API de perfil do usuário."""
     
@@ -270,6 +586,15 @@ class CalcularAPITestCase(APITestCase):
         response = self.client.post(self.url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         
+    def test_calculo_aninhamento_profundo(self):
+        """Testa que aninhamento excessivo responde 400 com a mensagem de sintaxe."""
+        data = {'operacao': '(' * 240 + '1+1' + ')' * 240}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Expressão matemática inválida', str(response.data))
+        self.assertNotIn('recursion', str(response.data))
+        
     def test_calculo_caracteres_invalidos(self):
         """Testa operação com caracteres não permitidos."""
         data = {'operacao': '2 + abc'}
@@ -286,6 +611,344 @@ class CalcularAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class AvaliadorTestCase(SimpleTestCase):
+    """Testes para o avaliador compilado de expressões."""
+    
+    def test_precedencia_e_parenteses(self):
+        """Testa precedência de operadores e agrupamento."""
+        self.assertEqual(avaliador.avaliar('2 + 3 * 4'), 14)
+        self.assertEqual(avaliador.avaliar('(2 + 3) * 4'), 20)
+        self.assertEqual(avaliador.avaliar('10 - 4 - 3'), 3)
+        self.assertEqual(avaliador.avaliar('2 * -3'), -6)
+        
+    def test_divisao_retorna_float_arredondado(self):
+        """Testa divisão real e arredondamento em 10 casas."""
+        self.assertEqual(avaliador.avaliar('100 / 3'), 33.3333333333)
+        self.assertIsInstance(avaliador.avaliar('15 / 3'), float)
+        
+    def test_erros(self):
+        """Testa mensagens de erro equivalentes ao caminho antigo."""
+        casos = {
+            '5 / (2 - 2)': 'Divisão por zero não é permitida',
+            '2 + abc': 'Operação contém caracteres não permitidos',
+            '(2 + 3': 'Parênteses não balanceados',
+            '2 + * 3': 'Expressão matemática inválida',
+            '2(3)': 'Expressão matemática inválida',
+            '007 + 1': 'Expressão matemática inválida',
+        }
+        for expressao, mensagem in casos.items():
+            with self.subTest(expressao=expressao):
+                with self.assertRaisesMessage(ValueError, mensagem):
+                    avaliador.avaliar(expressao)
+                    
+    def test_aninhamento_profundo(self):
+        """Testa que parênteses demais são erro de sintaxe, não de recursão."""
+        profunda = '(' * 240 + '1' + ')' * 240
+        self.assertLess(len(profunda), 500)
+        with self.assertRaisesMessage(ValueError, 'Expressão matemática inválida'):
+            avaliador.avaliar(profunda)
+        
+        self.assertEqual(avaliador.avaliar('(' * 100 + '1 + 1' + ')' * 100), 2)
+        self.assertEqual(avaliador.avaliar('-' * 400 + '3'), 3)
+        self.assertEqual(avaliador.avaliar('2 * -+-' + '-' * 301 + '3'), -6)
+        
+    def test_programa_reaproveitado_do_cache(self):
+        """Testa que expressões equivalentes compartilham o programa compilado."""
+        self.assertIs(avaliador.compilar('2 + 2'), avaliador.compilar('2+2'))
+
+
+class AquecimentoTestCase(SimpleTestCase):
+    """Testes para o aquecimento do processo na inicialização."""
+    
+    def test_todos_os_passos_executam(self):
+        """Testa que todos os passos rodam sem falhas registradas."""
+        with self.assertNoLogs('calculadora.aquecimento', level='ERROR'):
+            duracoes = aquecimento.aquecer()
+        
+        self.assertEqual(set(duracoes), set(aquecimento.PASSOS))
+        
+    def test_falha_em_um_passo_nao_interrompe(self):
+        """Testa que um passo com erro é registrado e os demais continuam."""
+        with mock.patch.dict(aquecimento.PASSOS, {'urls': mock.Mock(side_effect=RuntimeError)}):
+            with self.assertLogs('calculadora.aquecimento', level='ERROR'):
+                duracoes = aquecimento.aquecer()
+        
+        self.assertIn('avaliador', duracoes)
+
+
+class CacheResultadosTestCase(APITestCase):
+    """Testes para o cache de resultados de cálculos."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_calcular')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        caches['calculos'].clear()
+        cache_resultados.zerar_metricas()
+        
+    def test_acerto_ignora_espacos_e_registra_operacao(self):
+        """Testa que expressões equivalentes reaproveitam o resultado."""
+        self.client.post(self.url, {'operacao': '7 * 6'}, format='json')
+        response = self.client.post(self.url, {'operacao': '7*6'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resultado'], 42)
+        self.assertEqual(response.data['operacao'], '7*6')
+        self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 2)
+        self.assertEqual(cache_resultados.metricas()['acertos'], 1)
+        self.assertEqual(cache_resultados.metricas()['falhas'], 1)
+        
+    def test_expressao_invalida_nao_e_memorizada(self):
+        """Testa que erros de validação continuam sendo reportados."""
+        for _ in range(2):
+            response = self.client.post(self.url, {'operacao': '2 + + 3'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(cache_resultados.metricas()['acertos'], 0)
+        
+    def test_acerto_nao_dispensa_validacao(self):
+        """Testa que uma expressão rejeitada não é respondida pelo cache."""
+        self.client.force_login(self.user)
+        for url in (self.url, reverse('calculadora:api_calcular_rapido')):
+            with self.subTest(url=url):
+                caches['calculos'].clear()
+                # A chave ignora o tab; a validação de "/0" não.
+                response = self.client.post(url, {'operacao': '1/\t0.5'}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                
+                response = self.client.post(url, {'operacao': '1/0.5'}, format='json')
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('Divisão por zero', str(response.json()['detalhes']))
+        
+    def test_metricas_somente_admin(self):
+        """Testa que as métricas exigem usuário administrador."""
+        url = reverse('calculadora:api_metricas')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('cache_resultados', response.data)
+        self.assertIn('cache_usuarios', response.data)
+        self.assertIn('eventos', response.data)
+
+
+class CalcularLoteAPITestCase(APITestCase):
+    """Testes para a API de cálculos em lote."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_calcular_lote')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+    def test_lote_resultados_e_erros_em_ordem(self):
+        """Testa que cada item retorna resultado ou erro na ordem enviada."""
+        data = {'operacoes': ['2 + 3', '2 + + 3', '10 / 4', '3 * 3']}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sucessos'], 3)
+        self.assertEqual(response.data['falhas'], 1)
+        
+        resultados = response.data['resultados']
+        self.assertEqual([item['indice'] for item in resultados], [0, 1, 2, 3])
+        self.assertEqual(resultados[0]['resultado'], 5)
+        self.assertIn('erro', resultados[1])
+        self.assertEqual(resultados[2]['resultado'], 2.5)
+        self.assertIsNotNone(resultados[3]['id'])
+        
+    def test_lote_erros_do_avaliador_por_item(self):
+        """Testa que overflow em um item não derruba o lote."""
+        data = {'operacoes': ['9' * 400 + '.0 * 2', '9' * 400 + ' / 3', '1 + 1']}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sucessos'], 1)
+        self.assertEqual(response.data['falhas'], 2)
+        
+        resultados = response.data['resultados']
+        self.assertEqual(resultados[0]['detalhes'], 'Resultado muito grande')
+        self.assertEqual(resultados[1]['detalhes'], 'Resultado muito grande')
+        self.assertEqual(resultados[2]['resultado'], 2)
+        
+    def test_lote_define_tipo_operacao(self):
+        """Testa que o bulk_create preenche o tipo de operação."""
+        data = {'operacoes': ['2 + 3', '3 * 3', '(1 + 2) / 3']}
+        
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(self.url, data, format='json')
+        
+        insercoes = [q for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "operacoes"')]
+        self.assertEqual(len(insercoes), 1)
+        
+        tipos = set(Operacao.objects.filter(usuario=self.user).values_list('tipo_operacao', flat=True))
+        self.assertEqual(tipos, {'+', '*', 'mixed'})
+        
+    def test_lote_vazio(self):
+        """Testa lote sem operações."""
+        response = self.client.post(self.url, {'operacoes': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CalcularGradeAPITestCase(APITestCase):
+    """Testes para a API de avaliação de modelos sobre grades de valores."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_calcular_grade')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+    def test_grade_com_erro_por_linha(self):
+        """Testa avaliação vetorizada com divisão por zero isolada na linha."""
+        data = {
+            'expressao': '(x * 1.07) - y / z',
+            'valores': {'x': [100, 200, 300], 'y': [10, 10, 10], 'z': [2, 0, 5]}
+        }
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['variaveis'], ['x', 'y', 'z'])
+        self.assertEqual(response.data['resultados'], [102.0, None, 319.0])
+        self.assertEqual(response.data['erros'], [
+            {'linha': 1, 'detalhes': 'Divisão por zero não é permitida'}
+        ])
+        self.assertIsNone(response.data['id'])
+        self.assertFalse(Operacao.objects.filter(usuario=self.user).exists())
+        
+    def test_grade_com_overflow_na_linha(self):
+        """Testa que um resultado infinito vira erro da linha, não da grade."""
+        data = {'expressao': 'x * 10', 'valores': {'x': [1, 1e308, 2]}}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['resultados'], [10, None, 20])
+        self.assertEqual(response.data['erros'], [
+            {'linha': 1, 'detalhes': 'Resultado muito grande'}
+        ])
+        
+    def test_grade_persistencia_resumida(self):
+        """Testa que a persistência grava uma única operação de resumo."""
+        data = {
+            'expressao': 'x - y',
+            'valores': {'x': [5, 7], 'y': [1, 1]},
+            'persistir': True
+        }
+        
+        response = self.client.post(self.url, data, format='json')
+        operacao = Operacao.objects.get(usuario=self.user)
+        self.assertEqual(response.data['id'], operacao.id)
+        self.assertEqual(operacao.tipo_operacao, '-')
+        self.assertIn('2 linhas, 0 erros', operacao.resultado)
+        
+    def test_grade_variavel_sem_valores(self):
+        """Testa modelo que usa variável não informada."""
+        data = {'expressao': 'x + y', 'valores': {'x': [1]}}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    def test_grade_colunas_de_tamanhos_diferentes(self):
+        """Testa colunas com números de linhas diferentes."""
+        data = {'expressao': 'x + y', 'valores': {'x': [1, 2], 'y': [1]}}
+        
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CALCULADORA_ESCRITA_ASSINCRONA=True)
+class EscritaAdiadaTestCase(APITestCase):
+    """Testes para a gravação adiada de operações."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_calcular')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        # A gravação é feita manualmente com descarregar() na thread do teste.
+        patcher = mock.patch.object(FilaEscrita, '_garantir_thread')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def test_calculo_enfileirado_com_uuid_estavel(self):
+        """Testa que a resposta traz o uuid e a operação é gravada no descarregamento."""
+        response = self.client.post(self.url, {'operacao': '2 + 3'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNone(response.data['id'])
+        self.assertFalse(Operacao.objects.exists())
+        self.assertEqual(fila_escrita.profundidade(), 1)
+        
+        self.assertEqual(fila_escrita.descarregar(), 1)
+        operacao = Operacao.objects.get(uuid=response.data['uuid'])
+        self.assertEqual(operacao.resultado, '5')
+        self.assertEqual(operacao.tipo_operacao, '+')
+        
+    def test_lote_com_falha_fica_pendente(self):
+        """Testa que um lote que falhou não é descartado e é gravado depois."""
+        fila = FilaEscrita(INTERVALO=0)
+        fila.enfileirar(Operacao(usuario=self.user, operacao='1+1', resultado='2'))
+        
+        with mock.patch.object(Operacao.objects, 'criar_em_lote', side_effect=RuntimeError('banco fora')), \
+                self.assertLogs('calculadora.persistencia', level='ERROR'):
+            self.assertEqual(fila.descarregar(), 0)
+        self.assertEqual(fila.pendentes(), 1)
+        self.assertEqual(fila.metricas()['pendentes'], 1)
+        self.assertFalse(Operacao.objects.exists())
+        
+        fila.enfileirar(Operacao(usuario=self.user, operacao='2+2', resultado='4'))
+        self.assertEqual(fila.descarregar(), 2)
+        self.assertEqual(fila.pendentes(), 0)
+        self.assertEqual(
+            sorted(Operacao.objects.values_list('operacao', flat=True)), ['1+1', '2+2']
+        )
+        
+    def test_nova_tentativa_nao_duplica(self):
+        """Testa que a nova tentativa pula as operações que a anterior já gravou."""
+        fila = FilaEscrita(INTERVALO=0)
+        fila.enfileirar(Operacao(usuario=self.user, operacao='1+1', resultado='2'))
+        criar_em_lote = Operacao.objects.criar_em_lote
+        chamadas = []
+        
+        def grava_e_falha_na_primeira(lote):
+            chamadas.append(len(lote))
+            criar_em_lote(lote)
+            if len(chamadas) == 1:
+                raise RuntimeError('conexão perdida após o commit')
+        
+        with mock.patch.object(Operacao.objects, 'criar_em_lote', side_effect=grava_e_falha_na_primeira), \
+                self.assertLogs('calculadora.persistencia', level='ERROR'):
+            self.assertEqual(fila.descarregar(), 1)
+        self.assertEqual(chamadas, [1, 0])
+        self.assertEqual(Operacao.objects.count(), 1)
+        
+    def test_fila_cheia(self):
+        """Testa a pressão de retorno quando a fila está cheia."""
+        fila = FilaEscrita(TAMANHO_MAXIMO=1, TIMEOUT=0.01)
+        fila.enfileirar(Operacao(usuario=self.user, operacao='1+1', resultado='2'))
+        
+        with self.assertRaises(FilaCheia):
+            fila.enfileirar(Operacao(usuario=self.user, operacao='1+2', resultado='3'))
+        self.assertEqual(fila.metricas()['rejeitadas'], 1)
+
+
 class OperacoesListAPITestCase(APITestCase):
     """Testes para a API de listagem de operações."""
     
@@ -317,6 +980,38 @@ class OperacoesListAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 2)
         
+    def test_listagem_equivalente_ao_serializer(self):
+        """Testa que o caminho enxuto produz a mesma saída do OperacaoSerializer."""
+        response = self.client.get(self.url)
+        esperado = OperacaoSerializer(Operacao.objects.filter(usuario=self.user), many=True).data
+        self.assertEqual(json.loads(json.dumps(response.data['results'])), json.loads(json.dumps(esperado)))
+        
+    def test_listar_operacoes_por_cursor(self):
+        """Testa paginação por cursor sem contagem total."""
+        for i in range(3):
+            Operacao.objects.create(usuario=self.user, operacao=f'{i} * 2', resultado=str(i * 2))
+        
+        response = self.client.get(self.url, {'paginacao': 'cursor', 'tamanho': 3})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 3)
+        
+        # Uma inserção concorrente não desloca a página seguinte.
+        Operacao.objects.create(usuario=self.user, operacao='9 * 9', resultado='81')
+        segunda = self.client.get(response.data['next'])
+        vistos = [op['id'] for op in response.data['results'] + segunda.data['results']]
+        self.assertEqual(len(vistos), 5)
+        self.assertEqual(len(set(vistos)), 5)
+        self.assertIsNone(segunda.data['next'])
+        
+    def test_listar_operacoes_sem_contagem(self):
+        """Testa paginação por número de página sem COUNT(*)."""
+        response = self.client.get(self.url, {'contar': 'false'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(response.data['results']), 2)
+        
     def test_listar_operacoes_nao_autenticado(self):
         """Testa listagem de operações sem autenticação."""
         self.client.force_authenticate(user=None)
@@ -325,6 +1020,989 @@ class OperacoesListAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class ViewsAssincronasTestCase(APITestCase):
+    """Testes para as views assíncronas de cálculo, histórico e estatísticas."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        cache_usuarios.limpar()
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        for i in range(3):
+            Operacao.objects.create(usuario=self.user, operacao=f'{i} + 1', resultado=str(i + 1))
+            
+    def test_calcular(self):
+        """Testa cálculo com a mesma resposta da view DRF."""
+        response = self.client.post(
+            reverse('calculadora:api_calcular_async'), {'operacao': '6 * 7'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dados = response.json()
+        self.assertEqual(dados['resultado'], 42)
+        self.assertEqual(set(dados), {'operacao', 'resultado', 'id', 'uuid', 'data_inclusao'})
+        self.assertTrue(Operacao.objects.filter(uuid=dados['uuid'], usuario=self.user).exists())
+        self.assertEqual(EstatisticasUsuario.objects.get(pk=self.user.pk).total_operacoes, 4)
+        
+    def test_calcular_invalido(self):
+        """Testa que a validação é a do CalcularSerializer."""
+        response = self.client.post(
+            reverse('calculadora:api_calcular_async'), {'operacao': '2 + abc'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('operacao', response.json()['detalhes'])
+        
+    def test_historico_igual_ao_sincrono(self):
+        """Testa que o histórico assíncrono devolve o mesmo JSON da view DRF."""
+        for parametros in ({}, {'contar': 'false'}):
+            with self.subTest(parametros=parametros):
+                assincrono = self.client.get(reverse('calculadora:api_operacoes_async'), parametros)
+                sincrono = self.client.get(reverse('calculadora:api_operacoes'), parametros)
+                self.assertEqual(assincrono.status_code, status.HTTP_200_OK)
+                self.assertEqual(assincrono.json()['results'], sincrono.json()['results'])
+                self.assertEqual(assincrono.json().get('count'), sincrono.json().get('count'))
+        
+    def test_pagina_invalida(self):
+        """Testa página fora do intervalo."""
+        response = self.client.get(reverse('calculadora:api_operacoes_async'), {'page': 5})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+    def test_estatisticas_iguais_as_sincronas(self):
+        """Testa que as estatísticas assíncronas batem com a view DRF."""
+        assincrono = self.client.get(reverse('calculadora:api_estatisticas_async'))
+        sincrono = self.client.get(reverse('calculadora:api_estatisticas'))
+        self.assertEqual(assincrono.status_code, status.HTTP_200_OK)
+        self.assertEqual(assincrono.json(), sincrono.json())
+        
+    def test_token(self):
+        """Testa autenticação por token e a recusa de token revogado."""
+        self.client.logout()
+        par = tokens.emitir(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {par["acesso"]}')
+        
+        response = self.client.get(reverse('calculadora:api_operacoes_async'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'][0]['usuario_nome'], 'Teste Usuario')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens.revogar(self.user.pk)
+        response = self.client.get(reverse('calculadora:api_estatisticas_async'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        
+    def test_nao_autenticado(self):
+        """Testa acesso sem autenticação."""
+        self.client.logout()
+        response = self.client.get(reverse('calculadora:api_estatisticas_async'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+    def test_csrf_com_sessao(self):
+        """Testa que o POST com sessão exige o token CSRF."""
+        cliente = APIClient(enforce_csrf_checks=True)
+        cliente.force_login(self.user)
+        response = cliente.post(
+            reverse('calculadora:api_calcular_async'), {'operacao': '1 + 1'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CalcularRapidoTestCase(APITestCase):
+    """Testes para o endpoint de cálculo sem DRF."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        caches['calculos'].clear()
+        cache_usuarios.limpar()
+        self.url = reverse('calculadora:api_calcular_rapido')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        
+    def test_mesma_resposta_da_view_drf(self):
+        """Testa que chaves, tipos e formatos são os de /api/operacoes/calcular/."""
+        rapido = self.client.post(self.url, {'operacao': ' 10 / 4 '}, format='json')
+        drf = self.client.post(reverse('calculadora:api_calcular'), {'operacao': ' 10 / 4 '}, format='json')
+        self.assertEqual(rapido.status_code, status.HTTP_200_OK)
+        self.assertEqual(rapido['Content-Type'], 'application/json')
+        
+        dados, esperado = rapido.json(), drf.json()
+        self.assertEqual(set(dados), set(esperado))
+        for chave in ('operacao', 'resultado'):
+            self.assertEqual(dados[chave], esperado[chave])
+        self.assertEqual(len(dados['data_inclusao']), len(esperado['data_inclusao']))
+        self.assertTrue(dados['data_inclusao'].endswith('Z'))
+        self.assertTrue(Operacao.objects.filter(uuid=dados['uuid'], usuario=self.user).exists())
+        self.assertEqual(EstatisticasUsuario.objects.get(pk=self.user.pk).total_operacoes, 2)
+        
+    def test_erros_iguais_aos_da_view_drf(self):
+        """Testa que os erros de validação são idênticos."""
+        for corpo in (
+            {'operacao': '2 + abc'},
+            {'operacao': '5 / 0'},
+            {'operacao': '   '},
+            {'operacao': 'x' * 501},
+            {'operacao': 42},
+            {},
+        ):
+            with self.subTest(corpo=corpo):
+                rapido = self.client.post(self.url, corpo, format='json')
+                drf = self.client.post(reverse('calculadora:api_calcular'), corpo, format='json')
+                self.assertEqual(rapido.status_code, drf.status_code)
+                self.assertEqual(rapido.json(), drf.json())
+        
+    def test_json_invalido(self):
+        """Testa corpo que não é JSON."""
+        response = self.client.post(self.url, 'nao-e-json', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+    def test_token(self):
+        """Testa autenticação por token e a recusa de token revogado."""
+        self.client.logout()
+        par = tokens.emitir(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {par["acesso"]}')
+        response = self.client.post(self.url, {'operacao': '6 * 7'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['resultado'], 42)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            tokens.revogar(self.user.pk)
+        response = self.client.post(self.url, {'operacao': '6 * 7'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+        
+    def test_nao_autenticado(self):
+        """Testa acesso sem autenticação."""
+        self.client.logout()
+        response = self.client.post(self.url, {'operacao': '1 + 1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+    def test_csrf_com_sessao(self):
+        """Testa que o POST com sessão exige o token CSRF."""
+        cliente = APIClient(enforce_csrf_checks=True)
+        cliente.force_login(self.user)
+        response = cliente.post(self.url, {'operacao': '1 + 1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+    def test_metodo_nao_permitido(self):
+        """Testa que só POST é aceito."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(response.json(), {'detail': 'Método "GET" não é permitido.'})
+
+
+@override_settings(CALCULADORA_EVENTOS={'KEEPALIVE': 0.05, 'DURACAO_MAXIMA': 0.2})
+class EventosHistoricoTestCase(APITestCase):
+    """Testes para o stream SSE do histórico."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        cache_usuarios.limpar()
+        eventos.hub.zerar_metricas()
+        self.url = reverse('calculadora:api_eventos_operacoes')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        
+    def _eventos(self, partes):
+        """Eventos (tipo, dados) recebidos, sem comentários de keepalive."""
+        recebidos = []
+        for parte in partes:
+            texto = parte.decode() if isinstance(parte, bytes) else parte
+            campos = dict(linha.split(': ', 1) for linha in texto.strip().split('\n') if not linha.startswith(':'))
+            if 'event' in campos:
+                recebidos.append((campos['event'], json.loads(campos['data'])))
+        return recebidos
+        
+    def test_fluxo_entrega_operacoes_novas(self):
+        """Testa que uma operação gravada chega às abas conectadas."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        
+        partes = iter(response.streaming_content)
+        self.assertTrue(next(partes).startswith(b'retry: '))
+        self.assertEqual(eventos.hub.metricas()['conexoes'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            calculo = self.client.post(reverse('calculadora:api_calcular'), {'operacao': '6 * 7'}, format='json')
+        
+        recebidos = self._eventos(partes)
+        self.assertEqual(len(recebidos), 1)
+        tipo, linhas = recebidos[0]
+        self.assertEqual(tipo, 'operacoes')
+        self.assertEqual(linhas[0]['uuid'], calculo.json()['uuid'])
+        self.assertEqual(linhas[0]['usuario_nome'], 'Teste Usuario')
+        self.assertEqual(linhas, self.client.get(reverse('calculadora:api_operacoes')).json()['results'])
+        self.assertEqual(eventos.hub.metricas()['conexoes'], 0)
+        
+    def test_reconexao_reenvia_perdidas(self):
+        """Testa o reenvio das operações gravadas depois do Last-Event-ID."""
+        primeira = Operacao.objects.create(usuario=self.user, operacao='1 + 1', resultado='2')
+        segunda = Operacao.objects.create(usuario=self.user, operacao='2 + 2', resultado='4')
+        
+        for response in (
+            self.client.get(self.url, HTTP_LAST_EVENT_ID=str(primeira.id)),
+            self.client.get(self.url, {'desde': primeira.id}),
+        ):
+            partes = list(response.streaming_content)
+            self.assertIn(f'id: {segunda.id}\n'.encode(), partes[1])
+            self.assertEqual(
+                [linha['uuid'] for tipo, dados in self._eventos(partes) for linha in dados],
+                [str(segunda.uuid)]
+            )
+        
+    @override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False)
+    def test_limpeza_do_historico(self):
+        """Testa que a limpeza do histórico é enviada às abas."""
+        assinatura = eventos.hub.assinar(self.user.pk)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('calculadora:api_limpar_historico'))
+            self.assertEqual(self._eventos([assinatura.proximo(0)]), [('historico_limpo', {})])
+        finally:
+            eventos.hub.cancelar(assinatura)
+        
+    @override_settings(CALCULADORA_EVENTOS={'LIMITE_LOTE': 2})
+    def test_lote_grande_pede_recarga(self):
+        """Testa que lotes grandes viram um pedido de recarga."""
+        assinatura = eventos.hub.assinar(self.user.pk)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                Operacao.objects.criar_em_lote([
+                    Operacao(usuario=self.user, operacao=f'{i} + 1', resultado=str(i + 1)) for i in range(3)
+                ])
+            self.assertEqual(assinatura.proximo(0), eventos.RECARREGAR)
+        finally:
+            eventos.hub.cancelar(assinatura)
+        
+    def test_sem_assinantes_nao_publica(self):
+        """Testa que nada é serializado sem abas conectadas."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('calculadora:api_calcular'), {'operacao': '1 + 1'}, format='json')
+        self.assertEqual(eventos.hub.metricas()['publicados'], 0)
+        
+    @override_settings(CALCULADORA_EVENTOS={'KEEPALIVE': 0.05, 'DURACAO_MAXIMA': 5, 'TAMANHO_FILA': 1})
+    def test_conexao_atrasada_pede_recarga(self):
+        """Testa que uma conexão que não consome é encerrada com pedido de recarga."""
+        response = self.client.get(self.url)
+        partes = iter(response.streaming_content)
+        next(partes)
+        for _ in range(2):
+            eventos.hub.entregar(self.user.pk, eventos.quadro('historico_limpo', {}))
+        
+        self.assertEqual(list(partes), [eventos.RECARREGAR.encode()])
+        self.assertEqual(eventos.hub.metricas()['atrasadas'], 1)
+        
+    def test_nao_autenticado(self):
+        """Testa acesso sem autenticação."""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+    async def test_fluxo_asgi(self):
+        """Testa o gerador assíncrono usado sob ASGI."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url)
+        self.assertTrue(response.is_async)
+        
+        partes = response.streaming_content
+        self.assertTrue((await anext(partes)).startswith(b'retry: '))
+        eventos.hub.entregar(self.user.pk, eventos.quadro('historico_limpo', {}))
+        restantes = [parte async for parte in partes]
+        self.assertEqual(self._eventos(restantes), [('historico_limpo', {})])
+        self.assertEqual(eventos.hub.metricas()['conexoes'], 0)
+
+
+class DeltaOperacoesAPITestCase(APITestCase):
+    """Testes para a sincronização incremental do histórico."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        cache_usuarios.limpar()
+        self.url = reverse('calculadora:api_operacoes_delta')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        self.operacoes = [
+            Operacao.objects.create(usuario=self.user, operacao=f'{i} + 1', resultado=str(i + 1))
+            for i in range(5)
+        ]
+        
+    def test_operacoes_depois_do_id(self):
+        """Testa a leitura em ordem de id, com limite e cursor."""
+        response = self.client.get(self.url, {'desde_id': self.operacoes[1].id, 'limite': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        dados = response.json()
+        self.assertEqual([linha['id'] for linha in dados['operacoes']], [self.operacoes[2].id, self.operacoes[3].id])
+        self.assertTrue(dados['mais'])
+        self.assertEqual(dados['cursor'], self.operacoes[3].id)
+        self.assertEqual(dados['operacoes'][0]['usuario_nome'], 'Teste Usuario')
+        
+        dados = self.client.get(self.url, {'desde_id': dados['cursor'], 'limite': 2}).json()
+        self.assertEqual([linha['id'] for linha in dados['operacoes']], [self.operacoes[4].id])
+        self.assertFalse(dados['mais'])
+        
+        dados = self.client.get(self.url, {'desde_id': dados['cursor']}).json()
+        self.assertEqual(dados['operacoes'], [])
+        self.assertEqual(dados['cursor'], self.operacoes[4].id)
+        
+    def test_sem_parametros_sincroniza_tudo(self):
+        """Testa a primeira sincronização sem ponto de partida."""
+        dados = self.client.get(self.url).json()
+        self.assertEqual(len(dados['operacoes']), 5)
+        self.assertEqual(dados['removidas_ate'], 0)
+        self.assertIsNone(dados['historico_limpo_em'])
+        
+    def test_desde_data(self):
+        """Testa a sincronização a partir de uma data/hora."""
+        antiga = timezone.now() - timedelta(days=2)
+        Operacao.objects.filter(pk__in=[op.pk for op in self.operacoes[:3]]).update(data_inclusao=antiga)
+        
+        dados = self.client.get(self.url, {'desde': (antiga + timedelta(days=1)).isoformat()}).json()
+        self.assertEqual([linha['id'] for linha in dados['operacoes']], [self.operacoes[3].id, self.operacoes[4].id])
+        
+        dados = self.client.get(self.url, {'desde': timezone.now().isoformat()}).json()
+        self.assertEqual(dados['operacoes'], [])
+        self.assertEqual(dados['cursor'], self.operacoes[4].id)
+        
+    @override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False)
+    def test_lapide_da_limpeza(self):
+        """Testa que a limpeza aparece como lápide de intervalo."""
+        self.client.post(reverse('calculadora:api_limpar_historico'))
+        novo = Operacao.objects.create(usuario=self.user, operacao='9 + 9', resultado='18')
+        
+        dados = self.client.get(self.url, {'desde_id': self.operacoes[1].id}).json()
+        self.assertEqual([linha['id'] for linha in dados['operacoes']], [novo.id])
+        self.assertEqual(dados['removidas_ate'], self.operacoes[4].id)
+        self.assertIsNotNone(dados['historico_limpo_em'])
+        
+    def test_geracao_nova_forca_ressincronizacao(self):
+        """Testa que ids renumerados (rebalanceamento) fazem o cliente recomeçar do zero."""
+        dados = self.client.get(self.url).json()
+        self.assertEqual(dados['geracao'], 0)
+        self.assertFalse(dados['ressincronizar'])
+        
+        Usuario.objects.filter(pk=self.user.pk).update(geracao_ids=1)
+        cache_usuarios.limpar()
+        caches['default'].clear()
+        
+        dados = self.client.get(self.url, {'desde_id': dados['cursor'], 'geracao': 0}).json()
+        self.assertTrue(dados['ressincronizar'])
+        self.assertEqual(dados['geracao'], 1)
+        self.assertEqual(len(dados['operacoes']), 5)
+        
+        dados = self.client.get(self.url, {'desde_id': dados['cursor'], 'geracao': 1}).json()
+        self.assertFalse(dados['ressincronizar'])
+        self.assertEqual(dados['operacoes'], [])
+        
+    def test_custo_proporcional_as_mudancas(self):
+        """Testa que a consulta parte do id pelo índice (usuario, id)."""
+        plano = Operacao.objects.do_usuario(self.user).filter(id__gt=self.operacoes[3].id).order_by('id').explain()
+        self.assertIn('operacoes_usuario_76075b_idx', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+        
+    def test_espera_sem_novidades(self):
+        """Testa que o long polling termina no prazo sem novidades."""
+        inicio = time.monotonic()
+        response = self.client.get(self.url, {'desde_id': self.operacoes[4].id, 'esperar': 0.2})
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.2)
+        self.assertEqual(response.json()['operacoes'], [])
+        self.assertEqual(eventos.hub.metricas()['conexoes'], 0)
+        
+    def test_espera_acorda_com_evento(self):
+        """Testa que um evento do histórico encerra a espera."""
+        timer = threading.Timer(
+            0.1, eventos.hub.entregar, (self.user.pk, eventos.quadro('historico_limpo', {}))
+        )
+        timer.start()
+        inicio = time.monotonic()
+        response = self.client.get(self.url, {'desde_id': self.operacoes[4].id, 'esperar': 10})
+        timer.join()
+        self.assertLess(time.monotonic() - inicio, 5)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+    def test_parametros_invalidos(self):
+        """Testa combinações e limites inválidos."""
+        for parametros in (
+            {'desde_id': 1, 'desde': timezone.now().isoformat()},
+            {'esperar': 60},
+            {'limite': 0},
+            {'desde_id': -1},
+        ):
+            with self.subTest(parametros=parametros):
+                response = self.client.get(self.url, parametros)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(response.json()['erro'], 'Parâmetros inválidos')
+        
+    def test_nao_autenticado(self):
+        """Testa acesso sem autenticação."""
+        self.client.logout()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CondicionalGetTestCase(APITestCase):
+    """Testes para o GET condicional (ETag e Last-Modified) do histórico e das estatísticas."""
+    
+    def setUp(self):
+        caches['default'].clear()
+        cache_usuarios.limpar()
+        self.url = reverse('calculadora:api_operacoes')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_login(self.user)
+        self.calcular('1 + 1')
+        
+    def calcular(self, expressao):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('calculadora:api_calcular'), {'operacao': expressao}, format='json')
+        
+    def test_validadores_na_resposta(self):
+        """Testa que a listagem leva ETag, Last-Modified e pede revalidação."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('private', response['Cache-Control'])
+        
+    def consultas_historico(self, consultas) -> list:
+        return [
+            consulta['sql'] for consulta in consultas.captured_queries
+            if 'operacoes' in consulta['sql'] or 'estatisticas_usuarios' in consulta['sql']
+        ]
+        
+    def test_304_sem_consultar_operacoes(self):
+        """Testa que uma ETag atual responde 304 lendo no máximo a versão, por chave primária."""
+        valor_etag = self.client.get(self.url)['ETag']
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=valor_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], valor_etag)
+        # O LocMemCache é do processo: a versão vem do banco para valer entre workers.
+        sql, = self.consultas_historico(consultas)
+        self.assertIn('estatisticas_usuarios', sql)
+        
+    def test_304_com_cache_compartilhado(self):
+        """Testa que, com um cache compartilhado, o 304 não consulta o banco e as escritas o atualizam."""
+        with cache_em_arquivo(self, 'versoes'), mock.patch.object(estatisticas, 'CACHE_VERSAO', 'versoes'):
+            valor_etag = self.client.get(self.url)['ETag']
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=valor_etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertFalse(self.consultas_historico(consultas))
+            
+            self.calcular('5 + 5')
+            with CaptureQueriesContext(connection) as consultas:
+                response = self.client.get(self.url, HTTP_IF_NONE_MATCH=valor_etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertFalse([sql for sql in self.consultas_historico(consultas) if 'estatisticas_usuarios' in sql])
+        
+    def test_if_modified_since(self):
+        """Testa o 304 pelo Last-Modified."""
+        response = self.client.get(self.url)
+        self.assertIn('Accept', response['Vary'])
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+    def test_last_modified_acompanha_o_nome(self):
+        """Testa que renomear o usuário, que muda as linhas da listagem, avança o Last-Modified."""
+        ultima = self.client.get(self.url)['Last-Modified']
+        Usuario.objects.filter(pk=self.user.pk).update(
+            nome='Outro Nome', data_atualizacao=timezone.now() + timedelta(seconds=5)
+        )
+        cache_usuarios.limpar()
+        
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=ultima)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['usuario_nome'], 'Outro Nome')
+        
+    def test_last_modified_das_estatisticas_vira_com_o_dia(self):
+        """Testa que o Last-Modified das estatísticas nunca é anterior ao início do dia."""
+        url = reverse('calculadora:api_estatisticas')
+        ontem = timezone.now() - timedelta(days=1)
+        EstatisticasUsuario.objects.filter(pk=self.user.pk).update(data_atualizacao=ontem)
+        
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(ontem.timestamp()))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        inicio_do_dia = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.assertEqual(response['Last-Modified'], http_date(inicio_do_dia.timestamp()))
+        
+    def test_etag_muda_com_o_historico(self):
+        """Testa que cálculos, limpezas e arquivamento invalidam a ETag."""
+        vistas = [self.client.get(self.url)['ETag']]
+        
+        self.calcular('2 * 2')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=vistas[-1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        vistas.append(response['ETag'])
+        
+        with override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('calculadora:api_limpar_historico'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=vistas[-1])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 0)
+        vistas.append(response['ETag'])
+        
+        estatisticas.marcar_alteracao(self.user.pk)
+        vistas.append(self.client.get(self.url)['ETag'])
+        self.assertEqual(len(set(vistas)), 4)
+        
+    def test_etag_por_pagina(self):
+        """Testa que páginas diferentes têm ETags diferentes."""
+        self.assertNotEqual(
+            self.client.get(self.url)['ETag'],
+            self.client.get(self.url, {'tamanho': 1})['ETag']
+        )
+        
+    def test_estatisticas(self):
+        """Testa o GET condicional das estatísticas."""
+        url = reverse('calculadora:api_estatisticas')
+        valor_etag = self.client.get(url)['ETag']
+        
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=valor_etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # Só a leitura da versão.
+        self.assertEqual(len(self.consultas_historico(consultas)), 1)
+        
+        self.calcular('3 - 1')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=valor_etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_operacoes'], 2)
+
+
+class ExportarOperacoesAPITestCase(APITestCase):
+    """Testes para a API de exportação do histórico."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_exportar_operacoes')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        for i, data in enumerate([
+            datetime(2026, 1, 1, 12, 0, tzinfo=dt_timezone.utc),
+            datetime(2026, 2, 1, 12, 0, tzinfo=dt_timezone.utc),
+            datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc),
+        ]):
+            Operacao.objects.create(
+                usuario=self.user, operacao=f'{i} + 1', resultado=str(i + 1), data_inclusao=data
+            )
+        
+    def _conteudo(self, response) -> bytes:
+        return b''.join(response.streaming_content)
+        
+    def test_exportar_ndjson(self):
+        """Testa exportação NDJSON em ordem cronológica."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        
+        linhas = [json.loads(linha) for linha in self._conteudo(response).splitlines()]
+        self.assertEqual([linha['operacao'] for linha in linhas], ['0 + 1', '1 + 1', '2 + 1'])
+        self.assertEqual(linhas[0]['usuario_nome'], 'Teste Usuario')
+        
+    def test_exportar_csv_gzip_incremental(self):
+        """Testa exportação CSV comprimida filtrada por data."""
+        response = self.client.get(self.url, {
+            'formato': 'csv', 'gzip': '1', 'desde': '2026-01-15T00:00:00Z'
+        })
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        
+        linhas = gzip.decompress(self._conteudo(response)).decode('utf-8').splitlines()
+        self.assertEqual(linhas[0], 'id,uuid,operacao,resultado,tipo_operacao,data_inclusao')
+        self.assertEqual(len(linhas), 3)
+        
+    async def test_exportar_asgi_em_fluxo(self):
+        """Testa que sob ASGI a exportação é um iterador assíncrono, entregue bloco a bloco."""
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(self.url, {'formato': 'csv'})
+        self.assertTrue(response.is_async)
+        
+        conteudo = b''.join([parte async for parte in response.streaming_content])
+        self.assertEqual(len(conteudo.decode('utf-8').splitlines()), 4)
+        
+    def test_formato_invalido(self):
+        """Testa formato de exportação não suportado."""
+        response = self.client.get(self.url, {'formato': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImportarOperacoesTestCase(APITestCase):
+    """Testes para a importação de operações históricas."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_importar_operacoes')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+    def test_importar_ndjson_com_rejeicoes(self):
+        """Testa importação preservando datas e rejeitando linhas malformadas."""
+        conteudo = '\n'.join([
+            json.dumps({'operacao': '2 * 3', 'resultado': 6, 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            '{malformada',
+            json.dumps({'operacao': '1 + 1', 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '8 / 2', 'resultado': '4.0', 'data_inclusao': '2020-05-02T10:00:00'}),
+        ])
+        arquivo = SimpleUploadedFile('legado.ndjson', conteudo.encode('utf-8'))
+        
+        response = self.client.post(self.url, {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['importadas'], 2)
+        self.assertEqual(response.data['rejeitadas'], 2)
+        self.assertEqual([r['linha'] for r in response.data['rejeicoes']], [2, 3])
+        
+        operacao = Operacao.objects.get(usuario=self.user, operacao='2 * 3')
+        self.assertEqual(operacao.data_inclusao, datetime(2020, 5, 1, 10, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(operacao.tipo_operacao, '*')
+        self.assertEqual(EstatisticasUsuario.objects.get(pk=self.user.pk).total_operacoes, 2)
+
+    def test_importar_aplica_regras_do_calculo(self):
+        """Testa que expressões e resultados fora das regras do cálculo são rejeitados."""
+        conteudo = '\n'.join([
+            json.dumps({'operacao': '<img src=x onerror=alert(1)>', 'resultado': '1',
+                        'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '1 + 1', 'resultado': '<b>x</b>', 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '1' * 501 + '+1', 'resultado': '1', 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '1 / 0', 'resultado': 'Divisão por zero não é permitida',
+                        'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '2 * (3 + 1)', 'resultado': '8', 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            json.dumps({'operacao': '9 / 3', 'resultado': '3.0', 'data_inclusao': '2020-05-01T10:00:00Z'}),
+        ])
+        arquivo = SimpleUploadedFile('legado.ndjson', conteudo.encode('utf-8'))
+
+        response = self.client.post(self.url, {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['linha'] for r in response.data['rejeicoes']], [1, 2, 3, 4])
+        self.assertEqual(
+            sorted(Operacao.objects.filter(usuario=self.user).values_list('operacao', flat=True)),
+            ['2 * (3 + 1)', '9 / 3']
+        )
+
+    def test_uuid_de_outro_usuario(self):
+        """Testa que um uuid já usado por outro usuário é rejeitado sem perder o lote."""
+        outro = Usuario.objects.create_user(
+            username='outro', email='outro@exemplo.com', password='senha123456', nome='Outro Usuario'
+        )
+        existente = Operacao.objects.create(usuario=outro, operacao='7 - 2', resultado='5')
+
+        def conteudo():
+            return '\n'.join([
+                json.dumps({'operacao': '1 + 1', 'resultado': 2, 'data_inclusao': '2020-05-01T10:00:00Z',
+                            'uuid': str(existente.uuid)}),
+                json.dumps({'operacao': '2 + 2', 'resultado': 4, 'data_inclusao': '2020-05-01T10:00:00Z'}),
+            ]).encode('utf-8')
+
+        response = self.client.post(
+            self.url, {'arquivo': SimpleUploadedFile('a.ndjson', conteudo())}, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['importadas'], response.data['rejeitadas']), (1, 1))
+        self.assertIn('uuid duplicado', response.data['rejeicoes'][0]['motivo'])
+
+        # Gravada entre a verificação e o insert: o banco recusa e o resto do lote é mantido.
+        with mock.patch('calculadora.importacao._uuids_existentes', return_value=set()):
+            response = self.client.post(
+                self.url, {'arquivo': SimpleUploadedFile('b.ndjson', conteudo())}, format='multipart'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['importadas'], response.data['rejeitadas']), (1, 1))
+        self.assertEqual(Operacao.objects.filter(usuario=self.user, operacao='2 + 2').count(), 2)
+        self.assertEqual(Operacao.objects.get(uuid=existente.uuid).usuario_id, outro.pk)
+
+    def test_comando_reimporta_exportacao_csv(self):
+        """Testa o comando de importação com arquivo de rejeitados e uuids duplicados."""
+        Operacao.objects.create(usuario=self.user, operacao='5 - 2', resultado='3')
+        exportado = b''.join(
+            self.client.get(reverse('calculadora:api_exportar_operacoes'), {'formato': 'csv'}).streaming_content
+        ).decode('utf-8')
+        
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'historico.csv')
+            with open(caminho, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(exportado + ',,,,,\n')
+            
+            saida = io.StringIO()
+            call_command('importar_operacoes', caminho, usuario='teste@exemplo.com', stdout=saida)
+            
+            with open(caminho[:-4] + '.csv.rejeitados.ndjson', encoding='utf-8') as rejeitados:
+                motivos = [json.loads(linha)['motivo'] for linha in rejeitados]
+        
+        self.assertIn('0 operações importadas, 2 rejeitadas', saida.getvalue())
+        self.assertEqual(len(motivos), 2)
+        self.assertTrue(any('uuid duplicado' in motivo for motivo in motivos))
+        self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 1)
+
+
+@override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False)
+class ArquivamentoTestCase(APITestCase):
+    """Testes para a retenção com arquivo frio."""
+    
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+        configuracao = override_settings(CALCULADORA_RETENCAO={
+            'DIRETORIO': self.diretorio.name,
+            'DIAS': {'padrao': 30, 'staff': None},
+        })
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        agora = timezone.now()
+        Operacao.objects.criar_em_lote([
+            Operacao(usuario=self.user, operacao='1 + 1', resultado='2',
+                     data_inclusao=agora - timedelta(days=90)),
+            Operacao(usuario=self.user, operacao='2 * 2', resultado='4',
+                     data_inclusao=agora - timedelta(days=60)),
+            Operacao(usuario=self.user, operacao='3 - 1', resultado='2',
+                     data_inclusao=agora - timedelta(days=59)),
+            Operacao(usuario=self.user, operacao='9 / 3', resultado='3.0', data_inclusao=agora),
+        ])
+        
+    def test_arquivar_e_ler_por_mes(self):
+        """Testa que as operações antigas saem da tabela e continuam legíveis."""
+        call_command('arquivar_operacoes', stdout=io.StringIO())
+        
+        self.assertEqual(list(Operacao.objects.values_list('operacao', flat=True)), ['9 / 3'])
+        self.assertEqual(SegmentoArquivo.objects.filter(usuario=self.user).count(), len({
+            arquivamento.inicio_mes(timezone.now() - timedelta(days=dias)) for dias in (90, 60, 59)
+        }))
+        
+        response = self.client.get(reverse('calculadora:api_arquivo_operacoes'))
+        segmentos = response.data['segmentos']
+        self.assertEqual(sum(segmento['quantidade'] for segmento in segmentos), 3)
+        
+        lidas = []
+        for segmento in segmentos:
+            response = self.client.get(reverse('calculadora:api_arquivo_operacoes'), {'mes': segmento['mes']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            lidas.extend(item['operacao'] for item in response.data['results'])
+        self.assertEqual(sorted(lidas), ['1 + 1', '2 * 2', '3 - 1'])
+        
+        # Reexecutar não duplica, e as estatísticas reconstruídas contam o arquivo.
+        call_command('arquivar_operacoes', stdout=io.StringIO())
+        self.assertEqual(SegmentoArquivo.objects.aggregate(total=Sum('quantidade'))['total'], 3)
+        self.assertEqual(estatisticas.reconstruir(self.user.pk).total_operacoes, 4)
+        
+    def test_reconstruir_contagens_inclui_arquivo(self):
+        """Testa que a reconstrução das contagens por período conta as operações arquivadas."""
+        def periodos():
+            return sorted(
+                ContagemPeriodo.objects.filter(usuario=self.user)
+                .values_list('granularidade', 'inicio', 'tipo_operacao', 'quantidade')
+            )
+        
+        antes = periodos()
+        call_command('arquivar_operacoes', stdout=io.StringIO())
+        self.assertEqual(Operacao.objects.count(), 1)
+        self.assertEqual(periodos(), antes)
+        
+        contagens.reconstruir(self.user.pk)
+        self.assertEqual(periodos(), antes)
+
+    def test_importar_rejeita_operacao_arquivada(self):
+        """Testa que reimportar uma operação que já está no arquivo frio não a duplica."""
+        antiga = Operacao.objects.get(operacao='1 + 1')
+        linha = json.dumps({
+            'operacao': '1 + 1', 'resultado': '2', 'uuid': str(antiga.uuid),
+            'data_inclusao': antiga.data_inclusao.isoformat()
+        })
+        call_command('arquivar_operacoes', stdout=io.StringIO())
+
+        response = self.client.post(
+            reverse('calculadora:api_importar_operacoes'),
+            {'arquivo': SimpleUploadedFile('arquivo.ndjson', linha.encode('utf-8'))},
+            format='multipart'
+        )
+        self.assertEqual((response.data['importadas'], response.data['rejeitadas']), (0, 1))
+        self.assertFalse(Operacao.objects.filter(uuid=antiga.uuid).exists())
+
+    def test_nivel_sem_retencao_e_limpeza(self):
+        """Testa que o nível staff não arquiva e que limpar o histórico apaga o arquivo."""
+        Usuario.objects.filter(pk=self.user.pk).update(is_staff=True)
+        call_command('arquivar_operacoes', stdout=io.StringIO())
+        self.assertEqual(Operacao.objects.count(), 4)
+        
+        call_command('arquivar_operacoes', dias=30, stdout=io.StringIO())
+        self.assertEqual(Operacao.objects.count(), 1)
+        pasta = os.path.join(self.diretorio.name, str(self.user.pk))
+        self.assertTrue(os.listdir(pasta))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('calculadora:api_limpar_historico'))
+        self.assertFalse(SegmentoArquivo.objects.exists())
+        self.assertFalse(os.path.exists(pasta))
+
+
+class ReplicaLeituraTestCase(TransactionTestCase):
+    """Testes para o roteamento de leituras para a réplica."""
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        Operacao.objects.bulk_create([
+            Operacao(usuario=self.user, operacao='1 + 1', resultado='2', tipo_operacao='+')
+        ])
+        self.client.force_authenticate(user=self.user)
+        
+    def test_leitura_na_replica_e_primario_apos_escrita(self):
+        """Testa que o histórico vem da réplica, salvo logo após um cálculo do usuário."""
+        url = reverse('calculadora:api_operacoes')
+        
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(any('"operacoes"' in query['sql'] for query in replica.captured_queries))
+        
+        self.client.post(reverse('calculadora:api_calcular'), {'operacao': '2 * 3'}, format='json')
+        
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(replica.captured_queries, [])
+        
+        # Escritas nunca vão para a réplica.
+        self.assertEqual(router.db_for_write(Operacao), 'default')
+
+
+@override_settings(CALCULADORA_SHARDS=['default', 'shard_teste'], CALCULADORA_EXPURGO_ASSINCRONO=False)
+class ShardsTestCase(TransactionTestCase):
+    """Testes para o particionamento do histórico em vários arquivos SQLite."""
+    
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # O shard é um arquivo temporário registrado só para esta classe.
+        cls.pasta = tempfile.TemporaryDirectory()
+        connections.settings['shard_teste'] = {
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(cls.pasta.name, 'shard_teste.sqlite3'),
+        }
+        cls.databases = cls.databases | {'shard_teste'}
+        with override_settings(CALCULADORA_SHARDS=['default', 'shard_teste']):
+            call_command('migrate', database='shard_teste', verbosity=0)
+    
+    @classmethod
+    def tearDownClass(cls):
+        connections['shard_teste'].close()
+        del connections['shard_teste']
+        del connections.settings['shard_teste']
+        cls.pasta.cleanup()
+        super().tearDownClass()
+    
+    def setUp(self):
+        caches['default'].clear()
+        self.client = APIClient()
+        self.usuarios = {}
+        for i in range(20):
+            usuario = Usuario.objects.create_user(
+                username=f'usuario{i}', email=f'usuario{i}@exemplo.com', password='senha123456', nome=f'Usuário {i}'
+            )
+            self.usuarios.setdefault(shards.banco_do_usuario(usuario.pk), usuario)
+            if len(self.usuarios) == 2:
+                break
+        
+    def test_jump_hash_move_apenas_para_o_shard_novo(self):
+        """Testa que ao adicionar um shard as chaves só migram para ele."""
+        movidas = 0
+        for chave in range(1000):
+            antes, depois = shards.jump_hash(chave, 3), shards.jump_hash(chave, 4)
+            if antes != depois:
+                self.assertEqual(depois, 3)
+                movidas += 1
+        self.assertLess(movidas, 400)
+        
+    def test_operacoes_gravadas_e_lidas_no_shard_do_usuario(self):
+        """Testa cálculo, histórico, estatísticas e limpeza com o usuário em outro banco."""
+        usuario = self.usuarios['shard_teste']
+        self.client.force_authenticate(user=usuario)
+        
+        self.client.post(reverse('calculadora:api_calcular'), {'operacao': '2 * 3'}, format='json')
+        self.client.post(reverse('calculadora:api_calcular_lote'), {'operacoes': ['1 + 1']}, format='json')
+        
+        self.assertEqual(Operacao.objects.using('shard_teste').filter(usuario_id=usuario.pk).count(), 2)
+        self.assertFalse(Operacao.objects.using('default').filter(usuario_id=usuario.pk).exists())
+        
+        response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual(response.data['count'], 2)
+        response = self.client.get(reverse('calculadora:api_estatisticas'))
+        self.assertEqual(response.data['total_operacoes'], 2)
+        
+        self.client.post(reverse('calculadora:api_limpar_historico'))
+        self.assertFalse(Operacao.objects.using('shard_teste').exists())
+        self.assertEqual(self.client.get(reverse('calculadora:api_estatisticas')).data['total_operacoes'], 0)
+        
+    def test_rebalancear_para_um_shard(self):
+        """Testa que o rebalanceamento leva o histórico para o shard calculado."""
+        for usuario in self.usuarios.values():
+            Operacao.objects.criar_em_lote([
+                Operacao(usuario=usuario, operacao='1 + 1', resultado='2'),
+                Operacao(usuario=usuario, operacao='2 - 1', resultado='1'),
+            ])
+        uuids = set(Operacao.objects.using('shard_teste').values_list('uuid', flat=True))
+        
+        with override_settings(CALCULADORA_SHARDS=['default']):
+            call_command('rebalancear_shards', origens=['shard_teste'], stdout=io.StringIO())
+            
+            self.assertFalse(Operacao.objects.using('shard_teste').exists())
+            self.assertTrue(uuids <= set(Operacao.objects.values_list('uuid', flat=True)))
+            
+            usuario = Usuario.objects.get(pk=self.usuarios['shard_teste'].pk)
+            self.assertEqual(usuario.geracao_ids, 1)
+            self.assertEqual(Usuario.objects.get(pk=self.usuarios['default'].pk).geracao_ids, 0)
+            self.client.force_authenticate(user=usuario)
+            self.assertEqual(self.client.get(reverse('calculadora:api_operacoes')).data['count'], 2)
+            self.assertEqual(self.client.get(reverse('calculadora:api_estatisticas')).data['total_operacoes'], 2)
+
+
+@override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False)
 class LimparHistoricoAPITestCase(APITestCase):
     """Testes para a API de limpeza de histórico."""
     
@@ -351,13 +2029,40 @@ class LimparHistoricoAPITestCase(APITestCase):
         # Verificar que existem operações
         self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 3)
         
-        response = self.client.post(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['operacoes_deletadas'], 3)
         
         # Verificar que as operações foram deletadas
         self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 0)
         
+        response = self.client.get(response.data['status_url'])
+        self.assertEqual(response.data['status'], 'concluida')
+        self.assertEqual(response.data['removidas'], 3)
+        self.assertEqual(response.data['progresso'], 100.0)
+        
+    def test_operacoes_ocultas_antes_do_expurgo(self):
+        """Testa que o histórico some na hora, antes da remoção em segundo plano."""
+        response = self.client.post(self.url)
+        tarefa = TarefaExpurgo.objects.get(pk=response.data['tarefa'])
+        self.assertEqual(tarefa.status, 'pendente')
+        self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 3)
+        
+        Operacao.objects.create(usuario=self.user, operacao='7 * 6', resultado='42')
+        response = self.client.get(reverse('calculadora:api_operacoes'))
+        self.assertEqual([item['operacao'] for item in response.data['results']], ['7 * 6'])
+        
+        call_command('processar_expurgos', stdout=io.StringIO())
+        tarefa.refresh_from_db()
+        self.assertEqual(tarefa.status, 'concluida')
+        self.assertEqual(Operacao.objects.filter(usuario=self.user).count(), 1)
+        
+        outro = Usuario.objects.create_user(username='outro', email='outro@exemplo.com', password='senha123456')
+        self.client.force_authenticate(user=outro)
+        response = self.client.get(reverse('calculadora:api_expurgo', args=[tarefa.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
     def test_limpar_historico_nao_autenticado(self):
         """Testa limpeza de histórico sem autenticação."""
         self.client.force_authenticate(user=None)
@@ -366,6 +2071,32 @@ class LimparHistoricoAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class ExecutorExpurgoTestCase(SimpleTestCase):
+    """Testes para a thread única de expurgo."""
+    
+    def test_uma_thread_e_conexoes_fechadas(self):
+        """Testa que as tarefas rodam em ordem numa só thread e fecham todas as conexões."""
+        executadas = []
+        executor = expurgo.ExecutorExpurgo()
+        
+        def executar(tarefa_id):
+            executadas.append((tarefa_id, threading.get_ident()))
+            if tarefa_id == 2:
+                raise RuntimeError('falha')
+        
+        with mock.patch.object(expurgo, 'executar', side_effect=executar), \
+                mock.patch.object(expurgo.connections, 'close_all') as close_all, \
+                self.assertLogs('calculadora.expurgo', level='ERROR'):
+            for tarefa_id in (1, 2, 3):
+                executor.enviar(tarefa_id)
+            executor._fila.join()
+        
+        self.assertEqual([tarefa_id for tarefa_id, _ in executadas], [1, 2, 3])
+        self.assertEqual(len({thread for _, thread in executadas}), 1)
+        self.assertNotEqual(executadas[0][1], threading.get_ident())
+        self.assertEqual(close_all.call_count, 3)
+
+
 class EstatisticasAPITestCase(APITestCase):
     """Testes para a API de estatísticas."""
     
@@ -400,6 +2131,73 @@ class EstatisticasAPITestCase(APITestCase):
         
         self.assertEqual(response.data['total_operacoes'], 1)
         
+    def test_estatisticas_incrementais(self):
+        """Testa que os contadores acompanham inserções em lote e limpezas."""
+        self.client.post(
+            reverse('calculadora:api_calcular_lote'),
+            {'operacoes': ['1 + 1', '2 * 2', '(1 + 2) / 3']},
+            format='json'
+        )
+        
+        # A versão do histórico (GET condicional) e a linha de estatísticas, por chave primária.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total_operacoes'], 4)
+        self.assertEqual(response.data['operacoes_hoje'], 4)
+        self.assertEqual(response.data['operacoes_semana'], 4)
+        self.assertEqual(
+            {item['tipo_operacao']: item['count'] for item in response.data['operacoes_por_tipo']},
+            {'+': 2, '*': 1, 'mixed': 1}
+        )
+        
+        self.client.post(reverse('calculadora:api_limpar_historico'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['total_operacoes'], 0)
+        self.assertEqual(response.data['operacoes_por_tipo'], [])
+        
+    def test_historico_anterior_as_estatisticas(self):
+        """Testa que o primeiro cálculo após a criação da tabela conta o histórico antigo."""
+        Operacao.objects.bulk_create([
+            Operacao(usuario=self.user, operacao=f'{i} * 2', resultado=str(i * 2), tipo_operacao='*')
+            for i in range(4)
+        ])
+        EstatisticasUsuario.objects.filter(pk=self.user.pk).delete()
+        
+        self.client.post(reverse('calculadora:api_calcular'), {'operacao': '1 + 1'}, format='json')
+        
+        estatisticas = EstatisticasUsuario.objects.get(pk=self.user.pk)
+        self.assertEqual(estatisticas.total_operacoes, 6)
+        self.assertEqual(estatisticas.total_multiplicacao, 4)
+        self.assertEqual(estatisticas.total_soma, 2)
+        self.assertEqual(self.client.get(self.url).data['operacoes_hoje'], 6)
+        
+    def test_reconstruir_estatisticas(self):
+        """Testa o comando que corrige contadores divergentes."""
+        EstatisticasUsuario.objects.filter(pk=self.user.pk).update(total_operacoes=99)
+        
+        call_command('reconstruir_estatisticas', stdout=io.StringIO())
+        
+        estatisticas = EstatisticasUsuario.objects.get(pk=self.user.pk)
+        self.assertEqual(estatisticas.total_operacoes, 1)
+        self.assertEqual(estatisticas.total_soma, 1)
+
+    def test_verificar_ignora_dias_fora_da_janela(self):
+        """Testa que um dia que saiu da janela, ainda na linha gravada, não conta como divergência."""
+        linha = EstatisticasUsuario.objects.get(pk=self.user.pk)
+        antigo = (timezone.localdate() - timedelta(days=estatisticas.DIAS_MANTIDOS)).isoformat()
+        EstatisticasUsuario.objects.filter(pk=self.user.pk).update(
+            contagens_diarias={**linha.contagens_diarias, antigo: 3}
+        )
+
+        saida = io.StringIO()
+        call_command('reconstruir_estatisticas', verificar=True, stdout=saida)
+        self.assertIn('0 divergências encontradas', saida.getvalue())
+
+        EstatisticasUsuario.objects.filter(pk=self.user.pk).update(contagens_diarias={})
+        saida = io.StringIO()
+        call_command('reconstruir_estatisticas', verificar=True, stdout=saida)
+        self.assertIn('1 divergências encontradas', saida.getvalue())
+
     def test_estatisticas_nao_autenticado(self):
         """Testa obtenção de estatísticas sem autenticação."""
         self.client.force_authenticate(user=None)
@@ -408,6 +2206,60 @@ class EstatisticasAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class EstatisticasPeriodoAPITestCase(APITestCase):
+    """Testes para a API de estatísticas por período."""
+    
+    def setUp(self):
+        self.url = reverse('calculadora:api_estatisticas_periodo')
+        self.user = Usuario.objects.create_user(
+            username='testuser',
+            email='teste@exemplo.com',
+            password='senha123456',
+            nome='Teste Usuario'
+        )
+        self.client.force_authenticate(user=self.user)
+        
+        # 02:30 UTC de 18/10 ainda é 17/10 em America/Sao_Paulo (UTC-3).
+        for data, operacao in [
+            (datetime(2026, 10, 18, 2, 30, tzinfo=dt_timezone.utc), '1 + 1'),
+            (datetime(2026, 10, 18, 13, 0, tzinfo=dt_timezone.utc), '2 * 2'),
+            (datetime(2026, 10, 18, 13, 45, tzinfo=dt_timezone.utc), '3 + 3'),
+        ]:
+            Operacao.objects.create(
+                usuario=self.user, operacao=operacao, resultado='0', data_inclusao=data
+            )
+        
+    def test_periodos_por_dia_no_fuso_local(self):
+        """Testa que os limites dos dias seguem America/Sao_Paulo."""
+        response = self.client.get(self.url, {
+            'inicio': '2026-10-17', 'fim': '2026-10-18', 'granularidade': 'dia'
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['total'] for p in response.data['periodos']], [1, 2])
+        self.assertEqual(response.data['periodos'][1]['por_tipo'], {'*': 1, '+': 1})
+        self.assertEqual(response.data['total'], 3)
+        
+    def test_periodos_por_hora_e_reconstrucao(self):
+        """Testa a granularidade por hora e o comando de reconstrução."""
+        parametros = {
+            'inicio': '2026-10-18T09:00', 'fim': '2026-10-18T12:00', 'granularidade': 'hora'
+        }
+        antes = self.client.get(self.url, parametros).data['periodos']
+        self.assertEqual([p['total'] for p in antes], [0, 2, 0])
+        
+        ContagemPeriodo.objects.all().delete()
+        call_command('reconstruir_contagens', stdout=io.StringIO())
+        
+        depois = self.client.get(self.url, parametros).data['periodos']
+        self.assertEqual(antes, depois)
+        
+    def test_intervalo_invalido(self):
+        """Testa intervalo com fim anterior ao início."""
+        response = self.client.get(self.url, {'inicio': '2026-10-18', 'fim': '2026-10-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CALCULADORA_EXPURGO_ASSINCRONO=False)
 class DeletarContaAPITestCase(APITestCase):
     """Testes para a API de exclusão de conta."""
     
@@ -424,14 +2276,29 @@ class DeletarContaAPITestCase(APITestCase):
         """Testa exclusão de conta com usuário autenticado."""
         self.client.force_authenticate(user=self.user)
         user_id = self.user.id
+        Operacao.objects.create(usuario=self.user, operacao='1 + 1', resultado='2')
         
-        response = self.client.delete(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(self.url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('message', response.data)
         self.assertFalse(response.data['authenticated'])
         
         # Verificar que o usuário foi deletado
         self.assertFalse(Usuario.objects.filter(id=user_id).exists())
+        self.assertFalse(Operacao.objects.filter(usuario_id=user_id).exists())
+        
+    def test_conta_desativada_antes_do_expurgo(self):
+        """Testa que a conta não pode mais entrar enquanto aguarda a remoção."""
+        self.client.force_authenticate(user=self.user)
+        self.client.delete(self.url)
+        
+        self.assertFalse(Usuario.objects.get(pk=self.user.pk).is_active)
+        response = self.client.post(reverse('calculadora:api_login'), {
+            'email': 'teste@exemplo.com',
+            'senha': 'senha123456'
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         
     def test_deletar_conta_nao_autenticado(self):
         """Testa exclusão de conta sem autenticação."""
@@ -439,6 +2306,20 @@ class DeletarContaAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class BancoSqliteTestCase(TestCase):
+    """Testes para o backend SQLite do projeto."""
+    
+    def test_pragmas_aplicados_na_conexao(self):
+        """Testa que a conexão é aberta com os PRAGMAs de produção."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertGreater(cursor.fetchone()[0], 0)
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -20000)
+
+
 class URLsTestCase(TestCase):
     """Testes para verificar se todas as URLs estão configuradas corretamente."""
     
@@ -450,13 +2331,28 @@ class URLsTestCase(TestCase):
             'calculadora:perfil',
             'calculadora:api_registro',
             'calculadora:api_login',
+            'calculadora:api_token',
+            'calculadora:api_token_renovar',
             'calculadora:api_logout',
             'calculadora:api_perfil',
             'calculadora:api_deletar_conta',
             'calculadora:api_calcular',
+            'calculadora:api_calcular_lote',
+            'calculadora:api_calcular_grade',
+            'calculadora:api_calcular_rapido',
             'calculadora:api_operacoes',
+            'calculadora:api_operacoes_delta',
+            'calculadora:api_eventos_operacoes',
+            'calculadora:api_arquivo_operacoes',
+            'calculadora:api_exportar_operacoes',
+            'calculadora:api_importar_operacoes',
             'calculadora:api_limpar_historico',
             'calculadora:api_estatisticas',
+            'calculadora:api_estatisticas_periodo',
+            'calculadora:api_calcular_async',
+            'calculadora:api_operacoes_async',
+            'calculadora:api_estatisticas_async',
+            'calculadora:api_metricas',
         ]
         
         for url_name in urls_to_test:
@@ -468,4 +2364,7 @@ class URLsTestCase(TestCase):
         """Testa URL que aceita parâmetros."""
         url = reverse('calculadora:api_usuario_update', kwargs={'pk': 1})
         self.assertIsNotNone(url)
-        self.assertIn('/1/', url)
\ No newline at end of file
+        self.assertIn('/1/', url)
+        
+        url = reverse('calculadora:api_expurgo', args=['5f0c6c1e-3b1a-4a4e-9d7a-0c2f6b1d2e3f'])
+        self.assertIn('/api/expurgos/', url)
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Autenticação por tokens assinados, sem sessão.
+
+O token de acesso carrega o id do usuário e a ``versao_token`` do momento da
+emissão, assinados com a ``SECRET_KEY`` (``TimestampSigner``), e vale por
+``VALIDADE_ACESSO`` segundos. A validação confere a assinatura e compara a
+versão com a atual, que fica no cache; assim uma requisição autenticada não lê
+sessão nem usuário do banco. O usuário da requisição é montado a partir do
+token, com os demais campos adiados: só quem precisa deles faz a consulta.
+
+Incrementar ``versao_token`` (logout, troca de senha, exclusão da conta)
+revoga todos os tokens do usuário. Com mais de um processo, o cache
+configurado precisa ser compartilhado; com cache local, um processo pode
+aceitar um token revogado por até ``VALIDADE_ACESSO`` segundos.
+
+O token de renovação, de vida mais longa, só serve para obter um novo par em
+``/api/auth/token/renovar/`` e sempre confere a versão no banco.
+"""
+from typing import Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import Usuario
+
+CONFIGURACAO_PADRAO = {
+    'VALIDADE_ACESSO': 15 * 60,
+    'VALIDADE_RENOVACAO': 7 * 24 * 60 * 60,
+    'CACHE': 'default',
+}
+
+SALTS = {
+    'acesso': 'calculadora.tokens.acesso',
+    'renovacao': 'calculadora.tokens.renovacao',
+}
+
+# Versão gravada no cache para usuários inativos ou removidos.
+REVOGADO = -1
+
+
+class TokenRejeitado(exceptions.APIException):
+    """
+    Token de acesso inválido, expirado ou revogado.
+
+    Não herda de ``AuthenticationFailed`` porque o DRF converte essa exceção
+    em 403 quando a primeira autenticação configurada é a de sessão; o
+    cliente precisa do 401 para saber que deve renovar o token.
+    """
+    status_code = 401
+    default_detail = 'Token inválido.'
+    default_code = 'authentication_failed'
+    auth_header = 'Bearer'
+
+
+def config(chave: str):
+    personalizada = getattr(settings, 'CALCULADORA_TOKENS', {})
+    return personalizada.get(chave, CONFIGURACAO_PADRAO[chave])
+
+
+def _chave_versao(usuario_id: int) -> str:
+    return f'tokens:versao:{usuario_id}'
+
+
+def emitir(usuario: Usuario) -> dict:
+    """Emite um par de tokens (acesso e renovação) para o usuário."""
+    dados = {'u': usuario.pk, 'v': usuario.versao_token}
+    return {
+        'acesso': signing.TimestampSigner(salt=SALTS['acesso']).sign_object(dados),
+        'renovacao': signing.TimestampSigner(salt=SALTS['renovacao']).sign_object(dados),
+        'tipo': 'Bearer',
+        'expira_em': config('VALIDADE_ACESSO'),
+    }
+
+
+def ler(token: str, tipo: str) -> dict:
+    """Confere assinatura e validade. Levanta ``signing.BadSignature`` (ou ``SignatureExpired``)."""
+    validade = config('VALIDADE_ACESSO' if tipo == 'acesso' else 'VALIDADE_RENOVACAO')
+    dados = signing.TimestampSigner(salt=SALTS[tipo]).unsign_object(token, max_age=validade)
+    if not isinstance(dados, dict) or not isinstance(dados.get('u'), int) or not isinstance(dados.get('v'), int):
+        raise signing.BadSignature('Conteúdo do token inválido.')
+    return dados
+
+
+def versao_no_banco(usuario_id: int) -> int:
+    versao = (
+        Usuario.objects.using(DEFAULT_DB_ALIAS).filter(pk=usuario_id, is_active=True)
+        .values_list('versao_token', flat=True).first()
+    )
+    return REVOGADO if versao is None else versao
+
+
+def versao_atual(usuario_id: int) -> int:
+    """Versão vigente dos tokens do usuário, lida do cache e, na falta, do banco."""
+    cache = caches[config('CACHE')]
+    versao = cache.get(_chave_versao(usuario_id))
+    if versao is None:
+        versao = versao_no_banco(usuario_id)
+        cache.set(_chave_versao(usuario_id), versao, config('VALIDADE_ACESSO'))
+    return versao
+
+
+async def aversao_atual(usuario_id: int) -> int:
+    """Versão assíncrona de ``versao_atual``, para as views ASGI."""
+    cache = caches[config('CACHE')]
+    versao = await cache.aget(_chave_versao(usuario_id))
+    if versao is None:
+        versao = (
+            await Usuario.objects.using(DEFAULT_DB_ALIAS).filter(pk=usuario_id, is_active=True)
+            .values_list('versao_token', flat=True).afirst()
+        )
+        versao = REVOGADO if versao is None else versao
+        await cache.aset(_chave_versao(usuario_id), versao, config('VALIDADE_ACESSO'))
+    return versao
+
+
+def revogar(usuario_id: int) -> None:
+    """Invalida todos os tokens já emitidos para o usuário."""
+    Usuario.objects.filter(pk=usuario_id).update(versao_token=F('versao_token') + 1)
+    _esquecer_versao(usuario_id)
+
+
+def _esquecer_versao(usuario_id: int) -> None:
+    # Após o commit, para que nenhuma leitura concorrente volte a guardar a versão antiga.
+    chave = _chave_versao(usuario_id)
+    transaction.on_commit(lambda: caches[config('CACHE')].delete(chave))
+
+
+def usuario_do_token(dados: dict) -> Usuario:
+    """
+    Usuário montado a partir do token, sem consulta.
+
+    Só ``id``, ``is_active`` e ``versao_token`` vêm preenchidos; os outros
+    campos são carregados do banco no primeiro acesso.
+    """
+    valores = {'id': dados['u'], 'is_active': True, 'versao_token': dados['v']}
+    campos = [campo.attname for campo in Usuario._meta.concrete_fields if campo.attname in valores]
+    return Usuario.from_db(DEFAULT_DB_ALIAS, campos, [valores[campo] for campo in campos])
+
+
+def ler_cabecalho(request) -> Optional[dict]:
+    """
+    Dados do token de acesso do cabeçalho ``Authorization: Bearer``.
+
+    Retorna ``None`` sem o cabeçalho e levanta ``TokenRejeitado`` se a
+    assinatura não confere ou o token expirou. Não confere a revogação.
+    """
+    partes = get_authorization_header(request).split()
+    if not partes or partes[0].lower() != b'bearer':
+        return None
+    if len(partes) != 2:
+        raise TokenRejeitado('Cabeçalho Authorization inválido.')
+
+    try:
+        return ler(partes[1].decode('ascii'), 'acesso')
+    except signing.SignatureExpired:
+        raise TokenRejeitado('Token expirado.')
+    except (signing.BadSignature, UnicodeDecodeError):
+        raise TokenRejeitado('Token inválido.')
+
+
+class AutenticacaoToken(BaseAuthentication):
+    """Autenticação DRF pelo cabeçalho ``Authorization: Bearer <token de acesso>``."""
+
+    def authenticate(self, request) -> Optional[tuple]:
+        dados = ler_cabecalho(request)
+        if dados is None:
+            return None
+
+        if versao_atual(dados['u']) != dados['v']:
+            raise TokenRejeitado('Token revogado.')
+
+        return usuario_do_token(dados), dados
+
+    def authenticate_header(self, request) -> str:
+        return 'Bearer'
+
+
+@receiver(post_save, sender=Usuario)
+def _usuario_salvo(sender, instance: Usuario, update_fields=None, **kwargs) -> None:
+    # Troca de senha ou desativação mudam a versão vigente.
+    if update_fields is None or {'versao_token', 'is_active'} & set(update_fields):
+        _esquecer_versao(instance.pk)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, views_async, views_eventos, views_rapidas
 
 app_name = 'calculadora'
 
@@ -13,6 +13,8 @@ urlpatterns = [
     # APIs de autenticação
     path('api/auth/register/', views.RegistroAPIView.as_view(), name='api_registro'),
     path('api/auth/login/', views.LoginAPIView.as_view(), name='api_login'),
+    path('api/auth/token/', views.TokenAPIView.as_view(), name='api_token'),
+    path('api/auth/token/renovar/', views.RenovarTokenAPIView.as_view(), name='api_token_renovar'),
     path('api/auth/logout/', views.LogoutAPIView.as_view(), name='api_logout'),
     path('api/auth/profile/', views.PerfilAPIView.as_view(), name='api_perfil'),
     path('api/auth/deletar-conta/', views.DeletarContaAPIView.as_view(), name='api_deletar_conta'),
@@ -20,7 +22,25 @@ urlpatterns = [
     
     # APIs de operações matemáticas
     path('api/operacoes/calcular/', views.CalcularAPIView.as_view(), name='api_calcular'),
+    path('api/operacoes/calcular/rapido/', views_rapidas.calcular_rapido, name='api_calcular_rapido'),
+    path('api/operacoes/calcular/lote/', views.CalcularLoteAPIView.as_view(), name='api_calcular_lote'),
+    path('api/operacoes/calcular/grade/', views.CalcularGradeAPIView.as_view(), name='api_calcular_grade'),
     path('api/operacoes/', views.OperacoesListAPIView.as_view(), name='api_operacoes'),
+    path('api/operacoes/delta/', views.DeltaOperacoesAPIView.as_view(), name='api_operacoes_delta'),
+    path('api/operacoes/eventos/', views_eventos.eventos_operacoes, name='api_eventos_operacoes'),
+    path('api/operacoes/arquivo/', views.ArquivoOperacoesAPIView.as_view(), name='api_arquivo_operacoes'),
+    path('api/operacoes/exportar/', views.ExportarOperacoesAPIView.as_view(), name='api_exportar_operacoes'),
+    path('api/operacoes/importar/', views.ImportarOperacoesAPIView.as_view(), name='api_importar_operacoes'),
     path('api/operacoes/limpar_historico/', views.LimparHistoricoAPIView.as_view(), name='api_limpar_historico'),
+    path('api/expurgos/<uuid:pk>/', views.ExpurgoStatusAPIView.as_view(), name='api_expurgo'),
     path('api/estatisticas/', views.EstatisticasAPIView.as_view(), name='api_estatisticas'),
+    path('api/estatisticas/periodo/', views.EstatisticasPeriodoAPIView.as_view(), name='api_estatisticas_periodo'),
+    
+    # Versões assíncronas (ASGI) do cálculo, do histórico e das estatísticas
+    path('api/async/operacoes/calcular/', views_async.calcular, name='api_calcular_async'),
+    path('api/async/operacoes/', views_async.operacoes, name='api_operacoes_async'),
+    path('api/async/estatisticas/', views_async.estatisticas_usuario, name='api_estatisticas_async'),
+    
+    # Métricas internas
+    path('api/metricas/', views.MetricasAPIView.as_view(), name='api_metricas'),
 ]
\ No newline at end of file
@@ -1,23 +1,43 @@
-import re
+import codecs
 from typing import Any, Dict
 from django.shortcuts import render
-from django.http import HttpRequest, HttpResponse
+from django.urls import reverse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Count, Q
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import datetime, timedelta
-
-from .models import Usuario, Operacao
+from django.utils.dateparse import parse_datetime
+from datetime import datetime
+
+from . import aquecimento, arquivamento, avaliador, contagens, estatisticas, eventos, exportacao, expurgo, importacao, roteador, shards, sincronizacao, tokens
+from .backends import cache_usuarios
+from .cache_resultados import cache_resultados, expressao_candidata
+from .condicional import RespostaCondicionalMixin
+from .models import Usuario, Operacao, SegmentoArquivo, TarefaExpurgo
+from .paginacao import OperacoesPagination
+from .roteador import LeituraReplicaMixin
+from .views_eventos import stream_disponivel
+from .persistencia import FilaCheia, fila_escrita, salvar_operacao
 from .serializers import (
     UsuarioSerializer, 
     UsuarioRegistroSerializer, 
     LoginSerializer,
     OperacaoSerializer, 
-    CalcularSerializer
+    CalcularSerializer,
+    CalcularLoteSerializer,
+    CalcularGradeSerializer,
+    EstatisticasPeriodoSerializer,
+    DeltaOperacoesSerializer,
+    CAMPOS_OPERACAO,
+    serializar_operacoes
 )
 
 
@@ -28,12 +48,12 @@ def login_view(request: HttpRequest) -> HttpResponse:
 
 def calculadora_view(request: HttpRequest) -> HttpResponse:
     """View para servir a página da calculadora."""
-    return render(request, 'calculadora.html')
+    return render(request, 'calculadora.html', {'historico_ao_vivo': stream_disponivel(request)})
 
 
 def perfil_view(request: HttpRequest) -> HttpResponse:
     """View para servir a página de perfil."""
-    return render(request, 'perfil.html')
+    return render(request, 'perfil.html', {'historico_ao_vivo': stream_disponivel(request)})
 class RegistroAPIView(APIView):
     """API para registro de novos usuários."""
     permission_classes = [permissions.AllowAny]
@@ -91,11 +111,62 @@ class LoginAPIView(APIView):
         }, status=status.HTTP_401_UNAUTHORIZED)
 
 
+class TokenAPIView(APIView):
+    """API para obter tokens de acesso assinados (autenticação sem sessão)."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    
+    def post(self, request: HttpRequest) -> Response:
+        serializer = LoginSerializer(data=request.data, context={'request': request})
+        
+        if serializer.is_valid():
+            usuario = serializer.validated_data['usuario']
+            return Response({
+                **tokens.emitir(usuario),
+                'usuario': UsuarioSerializer(usuario).data
+            }, status=status.HTTP_200_OK)
+        
+        return Response({
+            'erro': 'Credenciais inválidas',
+            'detalhes': serializer.errors
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class RenovarTokenAPIView(APIView):
+    """API para trocar um token de renovação por um novo par de tokens."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    
+    def post(self, request: HttpRequest) -> Response:
+        token = request.data.get('renovacao') if hasattr(request.data, 'get') else None
+        if not isinstance(token, str) or not token:
+            return Response({
+                'erro': 'O token de renovação é obrigatório.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            dados = tokens.ler(token, 'renovacao')
+        except signing.BadSignature:
+            return Response({
+                'erro': 'Token de renovação inválido ou expirado.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        # A renovação é rara; confere a versão no banco em vez do cache.
+        if tokens.versao_no_banco(dados['u']) != dados['v']:
+            return Response({
+                'erro': 'Token de renovação revogado.'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        return Response(tokens.emitir(tokens.usuario_do_token(dados)), status=status.HTTP_200_OK)
+
+
 class LogoutAPIView(APIView):
     """API para logout de usuários."""
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request: HttpRequest) -> Response:
+        if isinstance(request.successful_authenticator, tokens.AutenticacaoToken):
+            tokens.revogar(request.user.pk)
         logout(request)
         return Response({
             'message': 'Logout realizado com sucesso!',
@@ -109,7 +180,11 @@ class PerfilAPIView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self) -> Usuario:
-        return self.request.user
+        usuario = self.request.user
+        if usuario.get_deferred_fields():
+            # Usuário vindo de um token: carrega o perfil completo numa consulta só.
+            usuario = Usuario.objects.get(pk=usuario.pk)
+        return usuario
 
 
 
@@ -118,133 +193,444 @@ class CalcularAPIView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request: HttpRequest) -> Response:
-        serializer = CalcularSerializer(data=request.data)
+        operacao_str, resultado = self._consultar_cache(request.data)
         
-        if serializer.is_valid():
-            operacao_str = serializer.validated_data['operacao']
+        if operacao_str is None:
+            serializer = CalcularSerializer(data=request.data)
             
-            try:
-
-                resultado = self._calcular_seguro(operacao_str)
-                
-
-                operacao = Operacao.objects.create(
-                    usuario=request.user,
-                    operacao=operacao_str,
-                    resultado=str(resultado)
-                )
-                
+            if not serializer.is_valid():
                 return Response({
-                    'operacao': operacao_str,
-                    'resultado': resultado,
-                    'id': operacao.id,
-                    'data_inclusao': operacao.data_inclusao
-                }, status=status.HTTP_200_OK)
-                
-            except Exception as e:
-                return Response({
-                    'erro': 'Erro no cálculo',
-                    'detalhes': str(e)
+                    'erro': 'Dados inválidos',
+                    'detalhes': serializer.errors
                 }, status=status.HTTP_400_BAD_REQUEST)
+            
+            operacao_str = serializer.validated_data['operacao']
         
-        return Response({
-            'erro': 'Dados inválidos',
-            'detalhes': serializer.errors
-        }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            if resultado is None:
+                resultado = self._calcular_seguro(operacao_str)
+                cache_resultados.guardar(operacao_str, resultado)
+            
+
+            operacao = salvar_operacao(request.user, operacao_str, str(resultado))
+            
+            return Response({
+                'operacao': operacao_str,
+                'resultado': resultado,
+                'id': operacao.id,
+                'uuid': operacao.uuid,
+                'data_inclusao': operacao.data_inclusao
+            }, status=status.HTTP_200_OK)
+            
+        except FilaCheia as e:
+            return Response({
+                'erro': 'Serviço sobrecarregado',
+                'detalhes': str(e)
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return Response({
+                'erro': 'Erro no cálculo',
+                'detalhes': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    def _consultar_cache(self, dados: Any) -> tuple:
+        """Valida a expressão e a procura no cache de resultados."""
+        operacao = expressao_candidata(dados)
+        if operacao is None:
+            return None, None
+        
+        return operacao, cache_resultados.obter(operacao)
     
     def _calcular_seguro(self, operacao: str) -> float:
         """Calcula uma expressão matemática de forma segura."""
+        return avaliador.avaliar(operacao)
 
-        operacao = operacao.replace(' ', '')
-        
 
-        if not re.match(r'^[0-9+\-*/().]+$', operacao):
-            raise ValueError('Operação contém caracteres não permitidos')
+class CalcularLoteAPIView(APIView):
+    """API para realizar vários cálculos em uma única requisição."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request: HttpRequest) -> Response:
+        lote_serializer = CalcularLoteSerializer(data=request.data)
         
-
-        if operacao.count('(') != operacao.count(')'):
-            raise ValueError('Parênteses não balanceados')
+        if not lote_serializer.is_valid():
+            return Response({
+                'erro': 'Dados inválidos',
+                'detalhes': lote_serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-
-        if '/0' in operacao.replace(' ', ''):
-            raise ValueError('Divisão por zero não é permitida')
+        itens = []
+        novas_operacoes = []
         
-        try:
-
-            resultado = eval(operacao, {"__builtins__": {}}, {})
+        for indice, entrada in enumerate(lote_serializer.validated_data['operacoes']):
+            serializer = CalcularSerializer(data={'operacao': entrada})
             
-
-            if not isinstance(resultado, (int, float)):
-                raise ValueError('Resultado inválido')
+            if not serializer.is_valid():
+                itens.append({
+                    'indice': indice,
+                    'operacao': entrada,
+                    'erro': 'Dados inválidos',
+                    'detalhes': serializer.errors
+                })
+                continue
             
-
-            if isinstance(resultado, float):
-                resultado = round(resultado, 10)
+            operacao_str = serializer.validated_data['operacao']
             
-            return resultado
+            try:
+                resultado = cache_resultados.calcular(operacao_str)
+            except ValueError as e:
+                itens.append({
+                    'indice': indice,
+                    'operacao': operacao_str,
+                    'erro': 'Erro no cálculo',
+                    'detalhes': str(e)
+                })
+                continue
             
-        except ZeroDivisionError:
-            raise ValueError('Divisão por zero não é permitida')
-        except (SyntaxError, NameError, TypeError):
-            raise ValueError('Expressão matemática inválida')
-        except OverflowError:
-            raise ValueError('Resultado muito grande')
+            operacao = Operacao(
+                usuario=request.user,
+                operacao=operacao_str,
+                resultado=str(resultado)
+            )
+            novas_operacoes.append(operacao)
+            itens.append({
+                'indice': indice,
+                'operacao': operacao_str,
+                'resultado': resultado,
+                'objeto': operacao
+            })
+        
+        Operacao.objects.criar_em_lote(novas_operacoes)
+        
+        for item in itens:
+            operacao = item.pop('objeto', None)
+            if operacao is not None:
+                item['id'] = operacao.id
+                item['uuid'] = operacao.uuid
+                item['data_inclusao'] = operacao.data_inclusao
+        
+        return Response({
+            'resultados': itens,
+            'total': len(itens),
+            'sucessos': len(novas_operacoes),
+            'falhas': len(itens) - len(novas_operacoes)
+        }, status=status.HTTP_200_OK)
 
 
-class OperacoesListAPIView(generics.ListAPIView):
-    """API para listar operações do usuário."""
+class CalcularGradeAPIView(APIView):
+    """API para avaliar um modelo de expressão sobre uma grade de valores."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request: HttpRequest) -> Response:
+        serializer = CalcularGradeSerializer(data=request.data)
+        
+        if not serializer.is_valid():
+            return Response({
+                'erro': 'Dados inválidos',
+                'detalhes': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        dados = serializer.validated_data
+        resultados, erros = avaliador.executar_vetorizado(
+            dados['programa'], dados['valores'], dados['linhas']
+        )
+        
+        operacao_id = None
+        if dados['persistir']:
+            banco = shards.banco_do_usuario(request.user.pk)
+            with transaction.atomic(using=banco):
+                operacao = Operacao.objects.using(banco).create(
+                    usuario=request.user,
+                    operacao=dados['expressao'],
+                    resultado=self._resumir(resultados, erros)
+                )
+            operacao_id = operacao.id
+        
+        return Response({
+            'expressao': dados['expressao'],
+            'variaveis': list(dados['variaveis']),
+            'total_linhas': dados['linhas'],
+            'resultados': resultados,
+            'erros': erros,
+            'id': operacao_id
+        }, status=status.HTTP_200_OK)
+    
+    def _resumir(self, resultados: list, erros: list) -> str:
+        """Monta o resumo da grade gravado no campo resultado da operação."""
+        validos = [valor for valor in resultados if valor is not None]
+        resumo = f'{len(resultados)} linhas, {len(erros)} erros'
+        
+        if validos:
+            media = round(sum(validos) / len(validos), 10)
+            resumo += f', min={min(validos)}, max={max(validos)}, media={media}'
+        
+        return resumo[:255]
+
+
+class OperacoesListAPIView(RespostaCondicionalMixin, LeituraReplicaMixin, generics.ListAPIView):
+    """
+    API para listar operações do usuário.
+    
+    Com ``If-None-Match`` ou ``If-Modified-Since`` atuais responde 304 sem
+    consultar as operações.
+    """
     serializer_class = OperacaoSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OperacoesPagination
+    
+    def get(self, request: HttpRequest, *args, **kwargs) -> Response:
+        return self.resposta_condicional(request, lambda: self.list(request, *args, **kwargs))
+    
+    def partes_etag(self, request: HttpRequest) -> tuple:
+        # Os links de paginação são absolutos e cada linha leva o nome do usuário.
+        return (request.build_absolute_uri(), request.accepted_media_type, request.user.nome)
+    
+    def datas_modificacao(self, request: HttpRequest) -> tuple:
+        # Renomear o usuário atualiza data_atualizacao.
+        return (request.user.data_atualizacao,)
     
     def get_queryset(self):
-        return Operacao.objects.filter(usuario=self.request.user)
+        return Operacao.objects.do_usuario(self.request.user).values(*CAMPOS_OPERACAO)
+    
+    def list(self, request: HttpRequest, *args, **kwargs) -> Response:
+        queryset = self.filter_queryset(self.get_queryset())
+        pagina = self.paginate_queryset(queryset)
+        
+        if pagina is not None:
+            return self.get_paginated_response(serializar_operacoes(pagina, request.user))
+        
+        return Response(serializar_operacoes(queryset, request.user))
+
+
+class DeltaOperacoesAPIView(APIView):
+    """
+    API de sincronização incremental do histórico.
+    
+    Retorna as operações criadas depois de ``?desde_id=`` (ou de ``?desde=``)
+    e a lápide das limpezas. Lê sempre do primário: com o atraso da réplica o
+    cliente avançaria o cursor sem ter visto tudo.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request: HttpRequest) -> Response:
+        serializer = DeltaOperacoesSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response({
+                'erro': 'Parâmetros inválidos',
+                'detalhes': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        parametros = dict(serializer.validated_data)
+        esperar = parametros.pop('esperar')
+        if esperar:
+            delta = sincronizacao.aguardar(request.user, esperar, **parametros)
+        else:
+            delta = sincronizacao.consultar(request.user, **parametros)
+        
+        return Response(delta, status=status.HTTP_200_OK)
+
+
+class ArquivoOperacoesAPIView(LeituraReplicaMixin, APIView):
+    """
+    API para consultar operações arquivadas.
+    
+    Sem parâmetros lista os meses arquivados; com ``?mes=AAAA-MM`` retorna as
+    operações daquele mês, lidas do arquivo comprimido.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request: HttpRequest) -> Response:
+        mes = request.query_params.get('mes')
+        
+        if not mes:
+            segmentos = SegmentoArquivo.objects.filter(usuario=request.user).values_list('mes', 'quantidade')
+            return Response({
+                'segmentos': [
+                    {'mes': f'{inicio:%Y-%m}', 'quantidade': quantidade}
+                    for inicio, quantidade in segmentos
+                ]
+            }, status=status.HTTP_200_OK)
+        
+        try:
+            inicio = datetime.strptime(mes, '%Y-%m').date()
+        except ValueError:
+            return Response({
+                'erro': 'Parâmetros inválidos',
+                'detalhes': {'mes': ['Use o formato AAAA-MM.']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        operacoes = serializar_operacoes(arquivamento.ler_segmento(request.user, inicio), request.user)
+        return Response({
+            'mes': mes,
+            'count': len(operacoes),
+            'results': operacoes
+        }, status=status.HTTP_200_OK)
+
+
+class ExportarOperacoesAPIView(APIView):
+    """API para exportar todo o histórico do usuário em fluxo (NDJSON ou CSV)."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request: HttpRequest) -> HttpResponseBase:
+        formato = request.query_params.get('formato', 'ndjson')
+        if formato not in exportacao.FORMATOS:
+            return Response({
+                'erro': 'Parâmetros inválidos',
+                'detalhes': {'formato': ['Use "ndjson" ou "csv".']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        operacoes = Operacao.objects.do_usuario(request.user).order_by('data_inclusao', 'id')
+        
+        desde = request.query_params.get('desde')
+        if desde:
+            data_desde = parse_datetime(desde)
+            if data_desde is None:
+                return Response({
+                    'erro': 'Parâmetros inválidos',
+                    'detalhes': {'desde': ['Use o formato AAAA-MM-DDTHH:MM:SS.']}
+                }, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(data_desde):
+                data_desde = timezone.make_aware(data_desde)
+            operacoes = operacoes.filter(data_inclusao__gt=data_desde)
+        
+        comprimir = request.query_params.get('gzip', '').lower() in ('1', 'true', 'sim')
+        content_type, extensao = exportacao.FORMATOS[formato]
+        nome_arquivo = f'operacoes.{extensao}'
+        if comprimir:
+            content_type = 'application/gzip'
+            nome_arquivo += '.gz'
+        
+        # Sob ASGI um iterador síncrono seria lido inteiro para a memória antes do envio.
+        asgi = isinstance(request._request, ASGIRequest)
+        gerar = exportacao.agerar_exportacao if asgi else exportacao.gerar_exportacao
+        response = StreamingHttpResponse(
+            gerar(operacoes, request.user, formato, comprimir),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo}"'
+        return response
+
+
+class ImportarOperacoesAPIView(APIView):
+    """API para importar operações históricas a partir de um arquivo NDJSON ou CSV."""
+    permission_classes = [permissions.IsAuthenticated]
+    MAXIMO_REJEICOES_RESPOSTA = 100
+    
+    def post(self, request: HttpRequest) -> Response:
+        arquivo = request.FILES.get('arquivo')
+        if arquivo is None:
+            return Response({
+                'erro': 'Dados inválidos',
+                'detalhes': {'arquivo': ['Envie o arquivo no campo "arquivo".']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        formato = request.data.get('formato') or ('csv' if arquivo.name.endswith('.csv') else 'ndjson')
+        if formato not in importacao.FORMATOS:
+            return Response({
+                'erro': 'Dados inválidos',
+                'detalhes': {'formato': ['Use "ndjson" ou "csv".']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rejeicoes = []
+        
+        def rejeitar(numero: int, bruto: object, motivo: str) -> None:
+            if len(rejeicoes) < self.MAXIMO_REJEICOES_RESPOSTA:
+                rejeicoes.append({'linha': numero, 'motivo': motivo})
+        
+        linhas = codecs.iterdecode(arquivo, 'utf-8', errors='replace')
+        resultado = importacao.importar(request.user, importacao.ler(formato, linhas), rejeitar)
+        
+        return Response({
+            **resultado.como_dict(),
+            'rejeicoes': rejeicoes
+        }, status=status.HTTP_200_OK)
 
 
 class LimparHistoricoAPIView(APIView):
-    """API para limpar histórico de operações do usuário."""
+    """
+    API para limpar histórico de operações do usuário.
+    
+    As operações somem da listagem na hora; a remoção física é feita em
+    segundo plano por uma tarefa de expurgo.
+    """
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request: HttpRequest) -> Response:
-        operacoes_deletadas = Operacao.objects.filter(usuario=request.user).count()
-        Operacao.objects.filter(usuario=request.user).delete()
+        with transaction.atomic():
+            limite_id, operacoes_deletadas = expurgo.ocultar_historico(request.user)
+            tarefa = expurgo.agendar(request.user, 'historico', limite_id, operacoes_deletadas)
         
         return Response({
             'message': 'Histórico limpo com sucesso!',
-            'operacoes_deletadas': operacoes_deletadas
+            'operacoes_deletadas': operacoes_deletadas,
+            'tarefa': str(tarefa.pk),
+            'status_url': reverse('calculadora:api_expurgo', args=[tarefa.pk])
         }, status=status.HTTP_200_OK)
 
 
-class EstatisticasAPIView(APIView):
-    """API para obter estatísticas do usuário."""
+class ExpurgoStatusAPIView(APIView):
+    """API para acompanhar uma tarefa de expurgo do usuário."""
     permission_classes = [permissions.IsAuthenticated]
     
-    def get(self, request: HttpRequest) -> Response:
-        usuario = request.user
-        hoje = timezone.now().date()
-        semana_passada = hoje - timedelta(days=7)
+    def get(self, request: HttpRequest, pk) -> Response:
+        tarefa = TarefaExpurgo.objects.filter(pk=pk, usuario=request.user).first()
+        if tarefa is None:
+            return Response({'erro': 'Tarefa não encontrada'}, status=status.HTTP_404_NOT_FOUND)
         
+        return Response({
+            'id': str(tarefa.pk),
+            'tipo': tarefa.tipo,
+            'status': tarefa.status,
+            'removidas': tarefa.removidas,
+            'total_estimado': tarefa.total_estimado,
+            'progresso': tarefa.progresso,
+            'data_criacao': tarefa.data_criacao,
+            'data_conclusao': tarefa.data_conclusao
+        }, status=status.HTTP_200_OK)
 
-        total_operacoes = Operacao.objects.filter(usuario=usuario).count()
-        operacoes_hoje = Operacao.objects.filter(
-            usuario=usuario,
-            data_inclusao__date=hoje
-        ).count()
-        operacoes_semana = Operacao.objects.filter(
-            usuario=usuario,
-            data_inclusao__date__gte=semana_passada
-        ).count()
-        
 
-        operacoes_por_tipo = Operacao.objects.filter(usuario=usuario).values(
-            'tipo_operacao'
-        ).annotate(count=Count('id'))
+class EstatisticasAPIView(RespostaCondicionalMixin, LeituraReplicaMixin, APIView):
+    """API para obter estatísticas do usuário (com GET condicional, como o histórico)."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request: HttpRequest) -> Response:
+        return self.resposta_condicional(
+            request, lambda: Response(estatisticas.obter(request.user), status=status.HTTP_200_OK)
+        )
+    
+    def partes_etag(self, request: HttpRequest) -> tuple:
+        # "Hoje" e "semana" mudam à meia-noite sem nenhuma escrita.
+        return (request.accepted_media_type, timezone.localdate())
+    
+    def datas_modificacao(self, request: HttpRequest) -> tuple:
+        return (timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time())),)
+
+
+class EstatisticasPeriodoAPIView(LeituraReplicaMixin, APIView):
+    """API para obter a quantidade de operações por hora ou por dia em um intervalo."""
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def get(self, request: HttpRequest) -> Response:
+        serializer = EstatisticasPeriodoSerializer(data=request.query_params)
+        
+        if not serializer.is_valid():
+            return Response({
+                'erro': 'Parâmetros inválidos',
+                'detalhes': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        dados = serializer.validated_data
+        periodos = contagens.consultar(
+            request.user.pk, dados['inicio'], dados['fim'], dados['granularidade']
+        )
         
         return Response({
-            'total_operacoes': total_operacoes,
-            'operacoes_hoje': operacoes_hoje,
-            'operacoes_semana': operacoes_semana,
-            'operacoes_por_tipo': list(operacoes_por_tipo),
-            'membro_desde': usuario.data_cadastro.strftime('%B %Y')
+            'granularidade': dados['granularidade'],
+            'inicio': dados['inicio'],
+            'fim': dados['fim'],
+            'total': sum(periodo['total'] for periodo in periodos),
+            'periodos': periodos
         }, status=status.HTTP_200_OK)
 
 
@@ -257,14 +643,17 @@ class DeletarContaAPIView(APIView):
         
         try:
 
-            Operacao.objects.filter(usuario=usuario).delete()
+            # A conta é desativada na hora; operações e usuário são removidos
+            # pela tarefa de expurgo.
+            with transaction.atomic():
+                Usuario.objects.filter(pk=usuario.pk).update(is_active=False)
+                tokens.revogar(usuario.pk)
+                limite_id, total = expurgo.ocultar_historico(usuario)
+                expurgo.agendar(usuario, 'conta', limite_id, total)
             
 
             logout(request)
             
-
-            usuario.delete()
-            
             return Response({
                 'message': 'Conta deletada com sucesso!',
                 'authenticated': False
@@ -275,3 +664,19 @@ class DeletarContaAPIView(APIView):
                 'erro': 'Erro ao deletar conta',
                 'detalhes': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class MetricasAPIView(APIView):
+    """API com métricas internas de desempenho (somente administradores)."""
+    permission_classes = [permissions.IsAdminUser]
+    
+    def get(self, request: HttpRequest) -> Response:
+        return Response({
+            'cache_resultados': cache_resultados.metricas(),
+            'cache_usuarios': cache_usuarios.metricas(),
+            'avaliador': avaliador.info_cache(),
+            'fila_escrita': fila_escrita.metricas(),
+            'replica': roteador.metricas(),
+            'aquecimento': aquecimento.duracoes,
+            'eventos': eventos.hub.metricas(),
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,203 @@
+"""
+Views assíncronas (ASGI) do cálculo, do histórico e das estatísticas.
+
+Sob ASGI as views DRF são síncronas e ocupam uma thread do pool durante toda
+a requisição. Estas são views Django nativas ``async def``: autenticam sem
+bloquear o loop (token assinado com ``aversao_atual`` ou sessão com
+``request.auser()``), leem com o ORM assíncrono (``aget``, ``acount``,
+iteração com ``async for``) e devolvem o mesmo JSON das versões DRF. Sob
+WSGI elas continuam funcionando; o Django as executa com ``async_to_sync``.
+
+Com sessão, métodos que alteram dados exigem o token CSRF, como no
+``SessionAuthentication`` do DRF. A paginação do histórico é por número de
+página (inclusive com ``?contar=false``); a paginação por cursor continua em
+``/api/operacoes/``.
+"""
+import json
+from functools import wraps
+from typing import Optional
+
+from django.http import HttpRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.authentication import CSRFCheck
+from rest_framework.exceptions import NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import avaliador, estatisticas, roteador, tokens
+from .cache_resultados import cache_resultados, expressao_candidata
+from .models import Operacao, Usuario
+from .paginacao import VALORES_FALSOS, OperacoesCursorPagination, OperacoesPageNumberPagination
+from .persistencia import FilaCheia, asalvar_operacao
+from .serializers import CAMPOS_OPERACAO, CalcularSerializer, serializar_operacoes
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def _resposta(dados, status: int = 200) -> JsonResponse:
+    """JSON no mesmo formato do ``JSONRenderer`` do DRF."""
+    return JsonResponse(
+        dados,
+        status=status,
+        safe=False,
+        encoder=JSONEncoder,
+        json_dumps_params={'ensure_ascii': False, 'separators': (',', ':')}
+    )
+
+
+def falha_csrf(request: HttpRequest) -> Optional[str]:
+    """Motivo da falha de CSRF, como no ``SessionAuthentication`` do DRF, ou ``None``."""
+    def sem_resposta(request):
+        return None
+
+    verificacao = CSRFCheck(sem_resposta)
+    verificacao.process_request(request)
+    return verificacao.process_view(request, None, (), {})
+
+
+def autenticado(view):
+    """
+    Exige usuário autenticado e o passa para a view como segundo argumento.
+
+    Aceita ``Authorization: Bearer`` (401 se inválido) ou a sessão (403 sem
+    login), na mesma ordem de respostas das views DRF.
+    """
+    @csrf_exempt
+    @wraps(view)
+    async def envoltorio(request: HttpRequest, *args, **kwargs):
+        try:
+            dados = tokens.ler_cabecalho(request)
+            if dados is not None and await tokens.aversao_atual(dados['u']) != dados['v']:
+                raise tokens.TokenRejeitado('Token revogado.')
+        except tokens.TokenRejeitado as erro:
+            resposta = _resposta({'detail': erro.detail}, status=erro.status_code)
+            resposta['WWW-Authenticate'] = erro.auth_header
+            return resposta
+
+        if dados is not None:
+            usuario = tokens.usuario_do_token(dados)
+        else:
+            usuario = await request.auser()
+            if not usuario.is_authenticated:
+                return _resposta({'detail': NotAuthenticated.default_detail}, status=403)
+            if request.method not in METODOS_SEGUROS:
+                motivo = falha_csrf(request)
+                if motivo:
+                    return _resposta({'detail': f'CSRF Failed: {motivo}'}, status=403)
+
+        request.user = usuario
+        return await view(request, usuario, *args, **kwargs)
+
+    return envoltorio
+
+
+async def _carregar_campos(usuario: Usuario, *campos: str) -> None:
+    """Carrega de uma vez os campos adiados do usuário do token (sem consulta síncrona)."""
+    adiados = [campo for campo in campos if campo in usuario.get_deferred_fields()]
+    if adiados:
+        valores = await Usuario.objects.filter(pk=usuario.pk).values(*adiados).aget()
+        for campo, valor in valores.items():
+            setattr(usuario, campo, valor)
+
+
+@require_POST
+@autenticado
+async def calcular(request: HttpRequest, usuario: Usuario) -> JsonResponse:
+    """Versão assíncrona de ``CalcularAPIView``."""
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        return _resposta({'detail': 'JSON inválido.'}, status=400)
+
+    operacao = expressao_candidata(dados)
+    if operacao is None:
+        serializer = CalcularSerializer(data=dados)
+        if not serializer.is_valid():
+            return _resposta({'erro': 'Dados inválidos', 'detalhes': serializer.errors}, status=400)
+        operacao = serializer.validated_data['operacao']
+    resultado = await cache_resultados.aobter(operacao)
+
+    try:
+        if resultado is None:
+            resultado = avaliador.avaliar(operacao)
+            await cache_resultados.aguardar(operacao, resultado)
+
+        nova = await asalvar_operacao(usuario, operacao, str(resultado))
+    except FilaCheia as e:
+        return _resposta({'erro': 'Serviço sobrecarregado', 'detalhes': str(e)}, status=503)
+    except Exception as e:
+        return _resposta({'erro': 'Erro no cálculo', 'detalhes': str(e)}, status=400)
+
+    return _resposta({
+        'operacao': operacao,
+        'resultado': resultado,
+        'id': nova.id,
+        'uuid': nova.uuid,
+        'data_inclusao': nova.data_inclusao
+    })
+
+
+def _link(request: HttpRequest, parametro: str, numero: int) -> str:
+    url = request.build_absolute_uri()
+    if numero == 1:
+        return remove_query_param(url, parametro)
+    return replace_query_param(url, parametro, numero)
+
+
+@require_GET
+@autenticado
+async def operacoes(request: HttpRequest, usuario: Usuario) -> JsonResponse:
+    """Versão assíncrona de ``OperacoesListAPIView`` (paginação por número de página)."""
+    if request.GET.get('paginacao') == 'cursor' or OperacoesCursorPagination.cursor_query_param in request.GET:
+        return _resposta({'erro': 'A paginação por cursor está disponível em /api/operacoes/.'}, status=400)
+
+    paginacao = OperacoesPageNumberPagination
+    tamanho = paginacao.page_size
+    try:
+        numero = int(request.GET.get(paginacao.page_query_param, 1))
+    except ValueError:
+        numero = 0
+    contar = request.GET.get('contar', '').lower() not in VALORES_FALSOS
+    if numero < 1 and contar:
+        return _resposta({'detail': paginacao.invalid_page_message}, status=404)
+    numero = max(numero, 1)
+
+    token = roteador.ativar_replica(usuario)
+    try:
+        await _carregar_campos(usuario, 'operacoes_ocultas_ate', 'nome')
+        queryset = Operacao.objects.do_usuario(usuario).values(*CAMPOS_OPERACAO)
+        inicio = (numero - 1) * tamanho
+
+        if contar:
+            total = await queryset.acount()
+            if inicio and inicio >= total:
+                return _resposta({'detail': paginacao.invalid_page_message}, status=404)
+            linhas = [linha async for linha in queryset[inicio:inicio + tamanho]]
+            tem_proxima = inicio + tamanho < total
+        else:
+            # Uma linha a mais indica se existe próxima página sem precisar contar.
+            linhas = [linha async for linha in queryset[inicio:inicio + tamanho + 1]]
+            tem_proxima = len(linhas) > tamanho
+            linhas = linhas[:tamanho]
+    finally:
+        roteador.desativar_replica(token)
+
+    corpo = {'count': total} if contar else {}
+    corpo.update({
+        'next': _link(request, paginacao.page_query_param, numero + 1) if tem_proxima else None,
+        'previous': _link(request, paginacao.page_query_param, numero - 1) if numero > 1 else None,
+        'results': serializar_operacoes(linhas, usuario),
+    })
+    return _resposta(corpo)
+
+
+@require_GET
+@autenticado
+async def estatisticas_usuario(request: HttpRequest, usuario: Usuario) -> JsonResponse:
+    """Versão assíncrona de ``EstatisticasAPIView``."""
+    token = roteador.ativar_replica(usuario)
+    try:
+        return _resposta(await estatisticas.aobter(usuario))
+    finally:
+        roteador.desativar_replica(token)
@@ -0,0 +1,83 @@
+"""
+Stream SSE do histórico (``text/event-stream``).
+
+A view autentica e escolhe o gerador conforme o servidor: sob ASGI a conexão
+espera eventos no loop, sem ocupar thread; sob WSGI (``runserver``) ela
+ocupa uma thread por no máximo ``DURACAO_MAXIMA`` segundos, e o navegador
+reconecta. As páginas só abrem o stream sob ASGI (``stream_disponivel``).
+O protocolo e os eventos estão descritos em ``eventos.py``.
+"""
+from typing import List, Optional
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+
+from . import eventos
+from .models import Operacao, Usuario
+from .serializers import CAMPOS_OPERACAO
+from .views_rapidas import metodo_nao_permitido, usuario_autenticado
+
+
+def stream_disponivel(request: HttpRequest) -> bool:
+    """
+    Se as páginas devem abrir o stream.
+
+    Sob WSGI cada aba conectada prende uma thread ou worker síncrono, e o
+    navegador reconecta ao fim de ``DURACAO_MAXIMA``; poucas abas esgotariam
+    o pool. Por isso as páginas só assinam quando servidas por ASGI.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def _ultimo_id(request: HttpRequest) -> Optional[int]:
+    """
+    Maior id que a aba já tem.
+
+    Na reconexão vem no ``Last-Event-ID``; na primeira conexão a página passa
+    ``?desde=`` com o maior id do histórico que acabou de carregar.
+    """
+    valor = request.headers.get('Last-Event-ID') or request.GET.get('desde', '')
+    try:
+        return int(valor)
+    except ValueError:
+        return None
+
+
+def _perdidas(usuario: Usuario, ultimo_id: Optional[int]) -> List[str]:
+    """Eventos das operações gravadas enquanto a aba estava desconectada."""
+    if ultimo_id is None:
+        return []
+
+    limite = eventos.config('LIMITE_LOTE')
+    linhas = list(
+        Operacao.objects.do_usuario(usuario).filter(id__gt=ultimo_id)
+        .order_by('id').values(*CAMPOS_OPERACAO)[:limite + 1]
+    )
+    if not linhas:
+        return []
+    if len(linhas) > limite:
+        return [eventos.RECARREGAR]
+    return [eventos.quadro_operacoes(linhas, usuario)]
+
+
+def eventos_operacoes(request: HttpRequest) -> HttpResponse:
+    """Envia as operações novas e as limpezas do histórico para todas as abas do usuário."""
+    if request.method != 'GET':
+        return metodo_nao_permitido(request, 'GET')
+
+    usuario, erro = usuario_autenticado(request)
+    if erro is not None:
+        return erro
+
+    ultimo_id = _ultimo_id(request)
+    if isinstance(request, ASGIRequest):
+        conteudo = eventos.afluxo(usuario.pk, lambda: sync_to_async(_perdidas)(usuario, ultimo_id))
+    else:
+        conteudo = eventos.fluxo(usuario.pk, lambda: _perdidas(usuario, ultimo_id))
+
+    resposta = StreamingHttpResponse(conteudo, content_type='text/event-stream')
+    resposta['Cache-Control'] = 'no-cache'
+    # Proxies como o nginx não devem acumular o stream.
+    resposta['X-Accel-Buffering'] = 'no'
+    return resposta
@@ -0,0 +1,132 @@
+"""
+Endpoint de cálculo de caminho rápido.
+
+``CalcularAPIView`` paga, a cada requisição, a maquinaria do DRF: ``Request``
+envolvendo o ``HttpRequest``, negociação de conteúdo, parsers, checagem de
+permissões e de throttling, o ``Response`` e o ``JSONRenderer``. Para o
+cálculo esse custo é maior que o da própria avaliação. Aqui uma view Django
+simples lê o JSON direto do corpo, valida com as mesmas regras do
+``CalcularSerializer`` (``validar_operacao``), avalia com o mesmo avaliador e
+escreve a resposta com um encoder pré-montado.
+
+O contrato de resposta é o de ``/api/operacoes/calcular/``: mesmas chaves, mesmo
+formato de datas e UUIDs, mesmos erros. Só os casos fora do caminho feliz
+(``operacao`` que não é texto, expressão inválida) passam pelo
+``CalcularSerializer``, para que as mensagens de erro sejam idênticas.
+Autentica por ``Authorization: Bearer`` ou pela sessão (com CSRF).
+"""
+import json
+from typing import Any, Optional
+
+from django.http import HttpRequest, HttpResponse
+from django.utils.encoding import force_str
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import MethodNotAllowed, NotAuthenticated
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import avaliador, tokens
+from .cache_resultados import cache_resultados, expressao_candidata
+from .persistencia import FilaCheia, salvar_operacao
+from .serializers import CalcularSerializer
+from .views_async import falha_csrf
+
+# Montado uma vez; com as mesmas opções do JSONRenderer do DRF (STRICT_JSON, COMPACT_JSON).
+ENCODER = JSONEncoder(ensure_ascii=False, separators=(',', ':'), allow_nan=False)
+
+
+def resposta_json(dados: Any, status: int = 200) -> HttpResponse:
+    return HttpResponse(ENCODER.encode(dados), status=status, content_type='application/json')
+
+
+def metodo_nao_permitido(request: HttpRequest, permitidos: str) -> HttpResponse:
+    """405 com a mensagem do DRF."""
+    resposta = resposta_json(
+        {'detail': force_str(MethodNotAllowed.default_detail).format(method=request.method)},
+        status=405
+    )
+    resposta['Allow'] = permitidos
+    return resposta
+
+
+def _validar(dados: Any) -> tuple:
+    """
+    Retorna ``(operacao, None)`` ou ``(None, erros)``.
+
+    O caminho feliz dispensa o serializer; nos demais casos ele produz os
+    mesmos erros de ``CalcularAPIView``.
+    """
+    operacao = expressao_candidata(dados)
+    if operacao is not None:
+        return operacao, None
+
+    serializer = CalcularSerializer(data=dados)
+    if serializer.is_valid():
+        return serializer.validated_data['operacao'], None
+    return None, serializer.errors
+
+
+def usuario_autenticado(request: HttpRequest) -> tuple:
+    """
+    Retorna ``(usuario, None)`` ou ``(None, resposta de erro)``.
+
+    Token ``Bearer`` (401 se inválido) ou sessão (403 sem login ou sem CSRF).
+    """
+    try:
+        dados = tokens.ler_cabecalho(request)
+        if dados is not None and tokens.versao_atual(dados['u']) != dados['v']:
+            raise tokens.TokenRejeitado('Token revogado.')
+    except tokens.TokenRejeitado as erro:
+        resposta = resposta_json({'detail': force_str(erro.detail)}, status=erro.status_code)
+        resposta['WWW-Authenticate'] = erro.auth_header
+        return None, resposta
+
+    if dados is not None:
+        return tokens.usuario_do_token(dados), None
+
+    if not request.user.is_authenticated:
+        return None, resposta_json({'detail': force_str(NotAuthenticated.default_detail)}, status=403)
+
+    motivo = falha_csrf(request)
+    if motivo:
+        return None, resposta_json({'detail': f'CSRF Failed: {motivo}'}, status=403)
+    return request.user, None
+
+
+@csrf_exempt
+def calcular_rapido(request: HttpRequest) -> HttpResponse:
+    """Versão sem DRF de ``CalcularAPIView``."""
+    if request.method != 'POST':
+        return metodo_nao_permitido(request, 'POST, OPTIONS')
+
+    usuario, erro = usuario_autenticado(request)
+    if erro is not None:
+        return erro
+
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        return resposta_json({'detail': 'JSON inválido.'}, status=400)
+
+    operacao, erros = _validar(dados)
+    if erros is not None:
+        return resposta_json({'erro': 'Dados inválidos', 'detalhes': erros}, status=400)
+    resultado: Optional[float] = cache_resultados.obter(operacao)
+
+    try:
+        if resultado is None:
+            resultado = avaliador.avaliar(operacao)
+            cache_resultados.guardar(operacao, resultado)
+
+        nova = salvar_operacao(usuario, operacao, str(resultado))
+    except FilaCheia as e:
+        return resposta_json({'erro': 'Serviço sobrecarregado', 'detalhes': str(e)}, status=503)
+    except Exception as e:
+        return resposta_json({'erro': 'Erro no cálculo', 'detalhes': str(e)}, status=400)
+
+    return resposta_json({
+        'operacao': operacao,
+        'resultado': resultado,
+        'id': nova.id,
+        'uuid': nova.uuid,
+        'data_inclusao': nova.data_inclusao
+    })
@@ -0,0 +1,50 @@
+"""
+Backend SQLite ajustado para produção.
+
+Igual ao ``django.db.backends.sqlite3``, mas cada conexão nova recebe os
+PRAGMAs de ``PRAGMAS_PADRAO`` (WAL, ``synchronous=NORMAL``, ``busy_timeout``,
+mmap e cache maiores). Com WAL, leituras não esperam pelas escritas e uma
+escrita não bloqueia o histórico. As transações começam com ``BEGIN
+IMMEDIATE``: o lock de escrita é obtido no início, respeitando o
+``busy_timeout``, em vez de falhar com "database is locked" ao promover uma
+transação de leitura.
+
+Os PRAGMAs podem ser sobrescritos em ``OPTIONS['pragmas']`` e o modo
+imediato desligado com ``OPTIONS['escrita_imediata'] = False``. Conexões
+persistentes usam o ``CONN_MAX_AGE`` padrão do Django.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS_PADRAO = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # milissegundos
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -20000,           # negativo = KiB (~20 MB)
+    'temp_store': 'MEMORY',
+}
+
+
+def aplicar_pragmas(conexao, pragmas: dict) -> None:
+    for nome, valor in pragmas.items():
+        conexao.execute(f'PRAGMA {nome} = {valor}')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self) -> dict:
+        params = super().get_connection_params()
+        self.pragmas = {**PRAGMAS_PADRAO, **params.pop('pragmas', {})}
+        self.escrita_imediata = params.pop('escrita_imediata', True)
+        return params
+
+    def get_new_connection(self, conn_params: dict):
+        conexao = super().get_new_connection(conn_params)
+        aplicar_pragmas(conexao, self.pragmas)
+        return conexao
+
+    def _start_transaction_under_autocommit(self) -> None:
+        if self.escrita_imediata:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
@@ -78,11 +78,125 @@ WSGI_APPLICATION = 'kogui_calculator.wsgi.application'
 
 
 
+# SQLite com WAL, busy_timeout e BEGIN IMMEDIATE (kogui_calculator/backends/sqlite_wal).
+# As conexões são reaproveitadas entre requisições por DB_CONN_MAX_AGE segundos.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'kogui_calculator.backends.sqlite_wal',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'busy_timeout': int(os.environ.get('DB_BUSY_TIMEOUT', '5000')),
+            },
+        },
+    }
+}
+
+# Réplica somente leitura para o histórico e as estatísticas (calculadora/roteador.py).
+# Sem DB_REPLICA_NAME ela aponta para o próprio arquivo do primário.
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'NAME': os.environ.get('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+    'TEST': {'MIRROR': 'default'},
+}
+
+# Shards do histórico (calculadora/shards.py). DB_SHARDS=N usa o primário e mais N-1
+# arquivos; crie as tabelas com "manage.py migrate --database shard_<n>" e, ao mudar
+# N, rode "manage.py rebalancear_shards".
+CALCULADORA_SHARDS = ['default']
+for _indice in range(1, int(os.environ.get('DB_SHARDS', '1'))):
+    DATABASES[f'shard_{_indice}'] = {
+        **DATABASES['default'],
+        'NAME': BASE_DIR / f'db_shard_{_indice}.sqlite3',
     }
+    CALCULADORA_SHARDS.append(f'shard_{_indice}')
+
+DATABASE_ROUTERS = ['calculadora.shards.RoteadorShards', 'calculadora.roteador.RoteadorLeituraEscrita']
+CALCULADORA_REPLICA = {
+    'ALIAS': 'replica',
+    'JANELA_ESCRITA': 5,  # segundos em que as leituras do usuário ficam no primário após uma escrita
+}
+
+
+
+# Cache
+# O alias 'calculos' guarda resultados de expressões. Por padrão é local ao
+# processo; defina CALCULOS_CACHE_BACKEND/CALCULOS_CACHE_LOCATION (ex: Redis)
+# para compartilhar os resultados entre workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'calculos': {
+        'BACKEND': os.environ.get(
+            'CALCULOS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CALCULOS_CACHE_LOCATION', 'calculadora-resultados'),
+        'TIMEOUT': int(os.environ.get('CALCULOS_CACHE_TIMEOUT', 3600)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('CALCULOS_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
+# Alias de cache usado para memorizar resultados (None desativa)
+CALCULADORA_CACHE_RESULTADOS = 'calculos'
+
+# Escrita adiada das operações: os cálculos entram em uma fila do processo e
+# são gravados em lote por uma thread dedicada.
+CALCULADORA_ESCRITA_ASSINCRONA = os.environ.get('CALCULADORA_ESCRITA_ASSINCRONA', 'False') == 'True'
+CALCULADORA_FILA_ESCRITA = {
+    'TAMANHO_MAXIMO': 10000,  # operações aguardando gravação
+    'TAMANHO_LOTE': 500,      # operações por bulk_create
+    'INTERVALO': 0.5,         # segundos máximos até gravar um lote incompleto
+    'TIMEOUT': 2.0,           # espera máxima por espaço na fila antes de responder 503
+}
+
+# Limpeza de histórico e exclusão de conta removem as operações em segundo plano
+CALCULADORA_EXPURGO_ASSINCRONO = os.environ.get('CALCULADORA_EXPURGO_ASSINCRONO', 'True') == 'True'
+
+# Backend de autenticação: o usuário da sessão é lido de um cache em duas camadas
+# (processo + alias CACHE) em vez de uma consulta por requisição. A camada
+# compartilhada só é usada se o alias for compartilhado entre os workers (ex:
+# Redis); com o LocMemCache do alias default fica só a cópia de cada processo.
+AUTHENTICATION_BACKENDS = ['calculadora.backends.BackendUsuario']
+CALCULADORA_CACHE_USUARIOS = {
+    'CACHE': 'default',
+    'TIMEOUT': 300,       # segundos no cache compartilhado
+    'JANELA_LOCAL': 2,    # segundos que cada processo reaproveita sua cópia (janela de desatualização)
+    'MAXIMO_LOCAL': 10000,
+}
+
+# Pré-carrega validadores de senha, URLs, serializers e o avaliador ao iniciar o
+# processo (calculadora/aquecimento.py), antes da primeira requisição.
+CALCULADORA_AQUECIMENTO = os.environ.get('CALCULADORA_AQUECIMENTO', 'True') == 'True'
+
+# Tokens assinados para clientes de API (Authorization: Bearer), sem sessão no banco.
+# Com vários processos use um cache compartilhado para a revogação valer em todos.
+CALCULADORA_TOKENS = {
+    'VALIDADE_ACESSO': int(os.environ.get('TOKEN_VALIDADE_ACESSO', 15 * 60)),        # segundos
+    'VALIDADE_RENOVACAO': int(os.environ.get('TOKEN_VALIDADE_RENOVACAO', 7 * 86400)),  # segundos
+    'CACHE': 'default',
+}
+
+# Histórico em tempo real (SSE em /api/operacoes/eventos/). O transporte local só
+# alcança as abas conectadas ao mesmo processo; com vários workers configure um
+# transporte com broker (ver calculadora/eventos.py).
+CALCULADORA_EVENTOS = {
+    'TRANSPORTE': 'calculadora.eventos.TransporteLocal',
+    'KEEPALIVE': 15,        # segundos
+    'DURACAO_MAXIMA': 300,  # segundos por conexão; o navegador reconecta
+    'TAMANHO_FILA': 100,    # eventos pendentes por conexão
+    'LIMITE_LOTE': 50,      # acima disso as abas recarregam o histórico
+}
+
+# Retenção: operações mais antigas que o prazo vão para o arquivo frio (manage.py arquivar_operacoes)
+CALCULADORA_RETENCAO = {
+    'DIRETORIO': os.environ.get('CALCULADORA_ARQUIVO_DIR', BASE_DIR / 'arquivo_operacoes'),
+    'DIAS': {'padrao': 365, 'staff': None},  # dias por nível; None nunca arquiva
+    'TAMANHO_LOTE': 5000,                    # operações movidas por transação
 }
 
 
@@ -131,6 +245,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.SessionAuthentication',
+        'calculadora.tokens.AutenticacaoToken',
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [